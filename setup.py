@@ -41,13 +41,21 @@ if __name__ == "__main__":
         install_requires=[
             'libsoundannotator',
         ],
+        extras_require={
+            # columnar output, cochleogram cache and soundannotator-replay-ptne
+            'columnar': ['h5py'],
+        },
         packages=find_packages(),
         ext_modules = None,
         ext_package = None,
         entry_points={
             'console_scripts': [
-                'soundAnnotator =  soundannotatordemo.projects.simple.soundAnnotator:run',
-                'inputtohdf =  soundannotatordemo.projects.input.inputtohdf:run'
+                'soundannotator-files =  soundannotatordemo.usecases.processingfiles:main',
+                'soundannotator-microphone =  soundannotatordemo.usecases.microphone:main',
+                'soundannotator-remote =  soundannotatordemo.usecases.microphoneatadistance:main',
+                'soundannotator-replay-ptne =  soundannotatordemo.usecases.replayptne:main',
+                'calibrate-grid =  soundannotatordemo.calibration.grid:run',
+                'soundannotator-benchmark =  soundannotatordemo.benchmark.run:run'
             ],
         },
         test_suite='nose.collector',
@@ -0,0 +1,183 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Annotation aligned PTNE features.
+
+    The DARES-G1 annotations are csv-files with 'start,stop,class' rows next
+    to the recordings. An AnnotationIndex holds, per recording and per class,
+    the annotated intervals as sorted, merged arrays, so labelling a whole
+    vector of time stamps costs one searchsorted per class.
+
+    extractFeatures joins the index with PTNE output written in the columnar
+    format (args['outputformat']='columnar' in UseCase-ProcessingFiles) and
+    produces per class one matrix with a row for every PTNE block inside an
+    annotation of that class and as columns pulse, tone, noise and energy
+    per band.
+
+        python -m soundannotatordemo.analysis.annotationindex <annotationdir> <ptnedir> <features.npz>
+'''
+import csv, glob, os, sys
+import numpy as np
+
+from soundannotatordemo.storage.columnar import ColumnarReader
+
+featureNames = ['pulse', 'tone', 'noise', 'energy']
+
+
+def recordingName(path):
+    ''' Recordings and annotations are matched on their basename without extension. '''
+    return os.path.splitext(os.path.basename(str(path)))[0]
+
+
+def readAnnotations(csvfile):
+    ''' Arrays with starts, stops and class labels of the rows in csvfile. '''
+    starts, stops, labels = [], [], []
+    with open(csvfile) as f:
+        for row in csv.DictReader(f):
+            starts.append(float(row['start']))
+            stops.append(float(row['stop']))
+            labels.append(row['class'].strip())
+    return np.array(starts, dtype=np.float64), np.array(stops, dtype=np.float64), np.array(labels, dtype=object)
+
+
+def mergeIntervals(starts, stops):
+    ''' Sorted, non overlapping intervals covering the same times as the given ones. '''
+    if len(starts) == 0:
+        return starts, stops
+    order = np.argsort(starts, kind='mergesort')
+    starts, stops = starts[order], stops[order]
+    reach = np.maximum.accumulate(stops)
+    newInterval = np.ones(len(starts), dtype=bool)
+    newInterval[1:] = starts[1:] > reach[:-1]
+    groups = np.cumsum(newInterval) - 1
+    mergedStops = np.zeros(groups[-1] + 1)
+    np.maximum.at(mergedStops, groups, stops)
+    return starts[newInterval], mergedStops
+
+
+class AnnotationIndex(object):
+    '''
+        annotations:    dict from recording name to (starts, stops, labels)
+    '''
+    def __init__(self, annotations):
+        self.classes = sorted(set(label for _, _, labels in annotations.values() for label in labels))
+        self.intervals = dict()
+        for recording, (starts, stops, labels) in annotations.items():
+            self.intervals[recording] = [mergeIntervals(starts[labels == label], stops[labels == label]) for label in self.classes]
+
+    @classmethod
+    def fromFolder(cls, folder):
+        ''' Index over all csv-files in folder. '''
+        csvfiles = sorted(glob.glob(os.path.join(folder, '*.csv')))
+        return cls(dict((recordingName(csvfile), readAnnotations(csvfile)) for csvfile in csvfiles))
+
+    def recordings(self):
+        return sorted(self.intervals)
+
+    def classMask(self, recording, times):
+        '''
+            Boolean array (classes x times): True where times falls inside an
+            annotation of the class. Recordings without annotations give an
+            all False mask.
+        '''
+        times = np.asarray(times, dtype=np.float64)
+        mask = np.zeros((len(self.classes), times.size), dtype=bool)
+        for row, (starts, stops) in enumerate(self.intervals.get(recording, [])):
+            if len(starts) == 0:
+                continue
+            interval = np.searchsorted(starts, times, side='right') - 1
+            inside = interval >= 0
+            mask[row, inside] = times[inside] < stops[interval[inside]]
+        return mask
+
+
+def readPTNE(filename):
+    '''
+        PTNE blocks from a columnar file as (recording, block center times,
+        features) with features an array (blocks x features*bands).
+    '''
+    with ColumnarReader(filename) as reader:
+        recording = recordingName(reader.h5.attrs['source_id'])
+        times = reader.times(featureNames[0]) + 0.5 / reader.SampleRate
+        features = np.concatenate([np.atleast_2d(reader.read(name)) for name in featureNames], axis=0).T
+    return recording, times, features
+
+
+def extractFeatures(index, ptnedir):
+    '''
+        Per class the PTNE blocks inside annotations of that class:
+        dict class -> (features, times, recordings) with one row per block.
+        Blocks inside annotations of several classes end up in each of them.
+    '''
+    collected = dict((label, ([], [], [])) for label in index.classes)
+
+    for filename in sorted(glob.glob(os.path.join(ptnedir, '*.h5'))):
+        recording, times, features = readPTNE(filename)
+        mask = index.classMask(recording, times)
+        for row, label in enumerate(index.classes):
+            selected = mask[row]
+            if selected.any():
+                collected[label][0].append(features[selected])
+                collected[label][1].append(times[selected])
+                collected[label][2].append(np.repeat(np.array([recording], dtype=object), selected.sum()))
+
+    result = dict()
+    for label, (features, times, recordings) in collected.items():
+        if len(features) > 0:
+            result[label] = (np.concatenate(features), np.concatenate(times), np.concatenate(recordings))
+    return result
+
+
+def columnNames(noofbands):
+    return ['{0}_band{1}'.format(name, band) for name in featureNames for band in range(noofbands)]
+
+
+def saveFeatures(result, filename):
+    ''' Store the matrices of extractFeatures in one npz-file, three arrays per class. '''
+    arrays = dict()
+    for label, (features, times, recordings) in result.items():
+        arrays['{0}/features'.format(label)] = features
+        arrays['{0}/times'.format(label)] = times
+        arrays['{0}/recordings'.format(label)] = recordings.astype(str)
+    if len(result) > 0:
+        noofbands = next(iter(result.values()))[0].shape[1] // len(featureNames)
+        arrays['columns'] = np.array(columnNames(noofbands))
+    np.savez(filename, **arrays)
+
+
+def run(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 3:
+        sys.exit('Usage: annotationindex <annotationdir> <ptnedir> <features.npz>')
+    annotationdir, ptnedir, filename = argv
+
+    index = AnnotationIndex.fromFolder(annotationdir)
+    result = extractFeatures(index, ptnedir)
+    saveFeatures(result, filename)
+
+    for label in sorted(result):
+        print('{0:<30} {1:>8} blocks'.format(label, result[label][0].shape[0]))
+
+
+if __name__ == '__main__':
+    run()
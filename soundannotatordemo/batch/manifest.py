@@ -0,0 +1,111 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Manifest of processed files for incremental processing of wav folders.
+
+    For every processed file the manifest keeps its size, modification time
+    and content hash, plus a fingerprint of the pipeline parameters it was
+    processed with. A file needs processing when it is not in the manifest,
+    when the parameters changed, or when its content changed. Size and
+    modification time are checked first; the content is only hashed when
+    the size is unchanged but the modification time is not, so a rerun over
+    a large folder costs a stat per file plus the work on the new files.
+'''
+import json, os
+
+from soundannotatordemo.config.fingerprint import parameterFingerprint, fileFingerprint
+
+
+# Parameters which change the output of the processing-files pipeline
+pipelineParameters = ['inputrate', 'decimation', 'noofscales', 'samplesperframe', 'resampler', 'batchedtf',
+                      'ptnsplit', 'ptnblockwidth', 'ptnreferencevalue', 'ptneengine', 'ptneconfigs',
+                      'ptnepyramid', 'ptnepyramidfactor', 'outputformat']
+
+
+def manifestParameters(args):
+    ''' The pipelineParameters in args, resampler and batchedtf with the defaults of cochleogramcache.tfParameters. '''
+    parameters = dict((key, args[key]) for key in pipelineParameters if key in args)
+    parameters['batchedtf'] = bool(args.get('batchedtf'))
+    parameters['resampler'] = args.get('resampler') or 'library'
+    return parameters
+
+
+class Manifest(object):
+    '''
+        filename:   json-file in which the manifest is kept
+        args:       pipeline parameters, see pipelineParameters
+    '''
+    version = 1
+
+    def __init__(self, filename, args):
+        self.filename = filename
+        parameters = manifestParameters(args)
+        self.parameters = parameterFingerprint(parameters, sorted(parameters))
+        self.files = dict()
+        if os.path.isfile(filename):
+            with open(filename) as f:
+                content = json.load(f)
+            if content.get('version') == self.version:
+                self.files = content['files']
+
+    def isProcessed(self, wavfile):
+        entry = self.files.get(os.path.abspath(wavfile))
+        if entry is None or entry['parameters'] != self.parameters:
+            return False
+
+        status = os.stat(wavfile)
+        if entry['size'] != status.st_size:
+            return False
+        if entry['mtime'] == status.st_mtime:
+            return True
+
+        # ... touched, but possibly unchanged
+        if fileFingerprint(wavfile) == entry['sha1']:
+            entry['mtime'] = status.st_mtime
+            return True
+        return False
+
+    def pending(self, wavfiles):
+        ''' The wavfiles which are new or changed since they were processed. '''
+        return [wavfile for wavfile in wavfiles if not self.isProcessed(wavfile)]
+
+    def record(self, wavfiles):
+        ''' Mark wavfiles as processed with the current parameters. '''
+        for wavfile in wavfiles:
+            status = os.stat(wavfile)
+            self.files[os.path.abspath(wavfile)] = {
+                'size': status.st_size,
+                'mtime': status.st_mtime,
+                'sha1': fileFingerprint(wavfile),
+                'parameters': self.parameters,
+            }
+
+    def save(self):
+        ''' Write the manifest, replacing the previous version atomically. '''
+        directory = os.path.dirname(self.filename)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        temporary = self.filename + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({'version': self.version, 'files': self.files}, f, indent=1, sort_keys=True)
+        os.rename(temporary, self.filename)
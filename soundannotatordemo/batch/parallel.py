@@ -0,0 +1,79 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Helpers for running independent Boards side by side.
+
+    A Board spawns a process per processor, so it can not live inside a
+    multiprocessing.Pool worker (pool workers are daemonic and are not allowed
+    to have children). The functions below therefore start one plain,
+    non-daemonic multiprocessing.Process per job and keep at most
+    'noofworkers' of them alive at the same time.
+'''
+import multiprocessing, time
+
+
+def runInParallel(target, jobs, noofworkers, logger=None, polltime=0.5):
+    '''
+        Run target(*jobargs) for every jobargs tuple in jobs, with at most
+        noofworkers jobs running concurrently. Returns the list of exit codes
+        in the order of jobs.
+    '''
+    if noofworkers < 1:
+        raise ValueError('noofworkers should be at least 1, got {0}'.format(noofworkers))
+
+    pending = list(enumerate(jobs))
+    running = dict()
+    exitcodes = [None] * len(jobs)
+
+    while pending or running:
+        # ... top up the number of running jobs
+        while pending and len(running) < noofworkers:
+            index, jobargs = pending.pop(0)
+            process = multiprocessing.Process(target=target, args=tuple(jobargs), name='job-{0}'.format(index))
+            process.daemon = False
+            process.start()
+            running[index] = process
+            if logger is not None:
+                logger.info('Started job {0} of {1} (pid {2})'.format(index + 1, len(jobs), process.pid))
+
+        # ... and collect the ones that finished
+        for index, process in list(running.items()):
+            process.join(polltime / max(len(running), 1))
+            if not process.is_alive():
+                exitcodes[index] = process.exitcode
+                del running[index]
+                if logger is not None:
+                    if process.exitcode == 0:
+                        logger.info('Job {0} finished'.format(index + 1))
+                    else:
+                        logger.error('Job {0} failed with exit code {1}'.format(index + 1, process.exitcode))
+
+    return exitcodes
+
+
+def defaultNoOfWorkers():
+    ''' One worker per core, but always at least one. '''
+    try:
+        return max(multiprocessing.cpu_count(), 1)
+    except NotImplementedError:
+        return 1
@@ -0,0 +1,98 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Splitting a list of wav-files in shards which can be processed by
+    independent Boards, and reporting the throughput of such a batch run.
+'''
+import os
+
+from soundannotatordemo.storage.wavheader import WavHeader
+
+
+def wavDuration(wavfile):
+    '''
+        Duration of a wav-file in seconds as read from its RIFF header, None
+        if the header can not be read.
+    '''
+    try:
+        return WavHeader(wavfile).duration()
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def shardFiles(wavfiles, noofshards):
+    '''
+        Divide wavfiles over at most noofshards shards with roughly equal
+        amounts of audio. Files are assigned largest first to the shard with
+        the least bytes so far, which keeps shards balanced when file lengths
+        differ a lot. Within a shard the original order is kept. Empty shards
+        are dropped.
+    '''
+    if noofshards < 1:
+        raise ValueError('noofshards should be at least 1, got {0}'.format(noofshards))
+
+    order = dict((wavfile, index) for index, wavfile in enumerate(wavfiles))
+    sizes = dict((wavfile, os.path.getsize(wavfile)) for wavfile in wavfiles)
+
+    shards = [[] for _ in range(noofshards)]
+    load = [0] * noofshards
+    for wavfile in sorted(wavfiles, key=lambda f: sizes[f], reverse=True):
+        lightest = load.index(min(load))
+        shards[lightest].append(wavfile)
+        load[lightest] += sizes[wavfile]
+
+    return [sorted(shard, key=lambda f: order[f]) for shard in shards if len(shard) > 0]
+
+
+class BatchSummary(object):
+    '''
+        Collects the amount of audio processed in a batch run and reports the
+        throughput as files per second and realtime factor (seconds of audio
+        processed per second of wall-clock time). Files of which the duration
+        can not be read are left out of the realtime factor and reported.
+    '''
+    def __init__(self, wavfiles, wallclocktime):
+        self.nooffiles = len(wavfiles)
+        durations = [wavDuration(wavfile) for wavfile in wavfiles]
+        self.audioduration = sum(duration for duration in durations if duration is not None)
+        self.noofunknown = sum(1 for duration in durations if duration is None)
+        self.wallclocktime = wallclocktime
+
+    def filesPerSecond(self):
+        if self.wallclocktime <= 0:
+            return float('inf')
+        return self.nooffiles / self.wallclocktime
+
+    def realtimeFactor(self):
+        if self.wallclocktime <= 0:
+            return float('inf')
+        return self.audioduration / self.wallclocktime
+
+    def __str__(self):
+        summary = ('Processed {0} files ({1:.1f} s of audio) in {2:.1f} s: '
+                   '{3:.2f} files/s, realtime factor {4:.1f}').format(
+                       self.nooffiles, self.audioduration, self.wallclocktime,
+                       self.filesPerSecond(), self.realtimeFactor())
+        if self.noofunknown > 0:
+            summary += ' ({0} files of unreadable duration left out of the realtime factor)'.format(self.noofunknown)
+        return summary
@@ -0,0 +1,237 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Microbenchmark of the batched gammachirp filterbank for several sources,
+    checking that every source agrees with its whole signal convolved on its
+    own within gammachirp.tolerance.
+
+        python -m soundannotatordemo.benchmark.batchedtf --seconds 60 --sources 4
+
+    With --reference the sources are also filtered on a board, once by a
+    GCFBProcessor of libsoundannotator per source and once by a single
+    BatchedGCFBProcessor, each fed white noise by a NoiseChunkGenerator per
+    source. A DrainMonitor records the input chunks and E of every source.
+    Per source, E is compared with the batched filterbank run on the
+    recorded input in the same chunks within gammachirp.referenceTolerance
+    dB, and the time from the first input chunk until the last TF-processor
+    drained is compared with that of the GCFBProcessors.
+'''
+import argparse, json, logging, multiprocessing, os, shutil, sys, tempfile
+
+import numpy as np
+
+from libsoundannotator.streamboard.board                            import Board
+from libsoundannotator.streamboard.subscription                     import SubscriptionOrder
+from libsoundannotator.streamboard.processors.input                 import noise
+from libsoundannotator.cpsp                                         import tfprocessor
+
+from soundannotatordemo.config                                      import runtimeMetaData
+from soundannotatordemo.cpsp                                        import gammachirp
+from soundannotatordemo.cpsp.batchedtf                              import BatchedGCFBProcessor
+from soundannotatordemo.streamboard                                 import drain
+
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the batched gammachirp filterbank.')
+    parser.add_argument('--seconds', type=float, default=30.0,
+        help='Duration of the white noise of every source in seconds')
+    parser.add_argument('--sources', type=int, default=4,
+        help='Number of sources filtered as one batch')
+    parser.add_argument('--samplerate', type=float, default=8820.0,
+        help='Sample rate of the TF-processor, inputrate/decimation')
+    parser.add_argument('--noofscales', type=int, default=133)
+    parser.add_argument('--samplesperframe', type=int, default=50)
+    parser.add_argument('--frequency', type=int, default=5,
+        help='Chunks per second, the chunksize is samplerate/frequency')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--reference', action='store_true',
+        help='Also run a GCFBProcessor of libsoundannotator per source and one BatchedGCFBProcessor on a board, check them per source against the batched filterbank and time them against the library')
+    parser.add_argument('--loglevel', type=int, default=logging.WARNING)
+    parser.add_argument('--logdir', type=str, default=os.path.join(os.path.expanduser('~'), '.libsoundannotator', 'log'))
+    parser.add_argument('--timeout', type=float, default=600,
+        help='Maximum duration of a board run in seconds')
+    parser.add_argument('--json', type=str, default=None,
+        help='File to write the report to')
+    return parser.parse_args(argv)
+
+
+def filterbankFor(args, noofsources):
+    return gammachirp.BatchedGammachirpFilterbank(args.samplerate, 40, args.samplerate / 2, args.noofscales,
+        args.samplesperframe, noofsources)
+
+
+def benchmark(args, chunksize):
+    ''' The best wall clock time, realtime factor and deviation per source of the batch. '''
+    signals = np.random.RandomState(0).randn(args.sources, int(args.seconds * args.samplerate)).astype(np.complex64)
+    elapsed = gammachirp.timeFilterbank(filterbankFor(args, args.sources), signals, chunksize, args.repeats)
+    return {
+        'seconds': elapsed,
+        'realtime_factor': args.seconds * args.sources / elapsed,
+        'deviation': gammachirp.checkEquivalence(signals, chunksize, args.samplerate, 40, args.samplerate / 2,
+            args.noofscales, args.samplesperframe),
+    }
+
+
+def boardRun(name, chunksize, args, logger, outdir):
+    '''
+        Filter seconds of white noise of every source on a board, with a
+        GCFBProcessor per source for name 'library', with one
+        BatchedGCFBProcessor for name 'batched'. Returns per source the input
+        chunks and E, and the seconds from the first input chunk until the
+        last TF-processor drained, None if they did not drain.
+    '''
+    b = Board(loglevel=args.loglevel, logdir=args.logdir, logfile='soundAnnotator-batchedtf-{0}'.format(name))
+    suffixes = ['-{0}'.format(source) for source in range(args.sources)]
+    for suffix in suffixes:
+        b.startProcessor('S2S_SoundInput'+suffix, noise.NoiseChunkGenerator,
+            SampleRate=args.samplerate,
+            ChunkSize=chunksize,
+            noofchunks=int(np.ceil(args.seconds * args.samplerate / chunksize)),
+        )
+
+    if name == 'library':
+        tfProcessors = dict((suffix, ('S2S_TFProcessor'+suffix, 'E')) for suffix in suffixes)
+        for suffix in suffixes:
+            b.startProcessor('S2S_TFProcessor'+suffix, tfprocessor.GCFBProcessor,
+                SubscriptionOrder('S2S_SoundInput'+suffix,'S2S_TFProcessor'+suffix,'sound','timeseries'),
+                SampleRate=args.samplerate,
+                fmin=40,
+                fmax=args.samplerate/2,
+                nseg=args.noofscales,
+                samplesPerFrame=args.samplesperframe,
+                scale='ERBScale',
+                baseOutputDir=outdir,
+                globalOutputPathModifier=runtimeMetaData.outputPathModifier,
+                dTypeIn=np.complex64,
+                dTypeOut=np.complex64,
+            )
+    else:
+        tfProcessors = dict((suffix, ('S2S_TFProcessor-batched', 'E'+suffix)) for suffix in suffixes)
+        b.startProcessor('S2S_TFProcessor-batched', BatchedGCFBProcessor,
+            *[SubscriptionOrder('S2S_SoundInput'+suffix,'S2S_TFProcessor-batched','sound','timeseries'+suffix) for suffix in suffixes],
+            sources=suffixes,
+            SampleRate=args.samplerate,
+            fmin=40,
+            fmax=args.samplerate/2,
+            nseg=args.noofscales,
+            samplesPerFrame=args.samplesperframe
+        )
+
+    monitor = drain.DrainMonitor(b, logger)
+    inputs = dict((suffix, []) for suffix in suffixes)
+    E = dict((suffix, []) for suffix in suffixes)
+    receivedAt = []
+    for suffix in suffixes:
+        monitor.watch('S2S_SoundInput'+suffix, 'sound',
+            listener=lambda processorName, chunk, at, suffix=suffix: (inputs[suffix].append(np.ravel(chunk.data)), receivedAt.append(at)))
+    for suffix in suffixes:
+        processorName, key = tfProcessors[suffix]
+        monitor.watch(processorName, key,
+            listener=lambda processorName, chunk, at, suffix=suffix: E[suffix].append(np.asarray(chunk.data)))
+
+    completed = monitor.wait(timeout=args.timeout)
+    b.stopallprocessors()
+
+    elapsed = max(stage.drainedAt for stage in monitor.stages[len(suffixes):]) - min(receivedAt) if completed else None
+    return [inputs[suffix] for suffix in suffixes], [E[suffix] for suffix in suffixes], elapsed
+
+
+def referenceBenchmark(chunksize, args, logger):
+    '''
+        For the GCFBProcessors of the library and the BatchedGCFBProcessor,
+        the time on a board, the speedup over the library and per source the
+        deviation in dB from the batched filterbank on the same input.
+    '''
+    results = dict()
+    outdir = tempfile.mkdtemp(prefix='batchedtf-benchmark-')
+    try:
+        for name in ['library', 'batched']:
+            inputs, outputs, elapsed = boardRun(name, chunksize, args, logger, outdir)
+            if elapsed is None:
+                results[name] = {'completed': False, 'equivalent': False}
+                continue
+            filterbank = filterbankFor(args, 1)
+            deviations = []
+            for chunks, Echunks in zip(inputs, outputs):
+                filterbank.reset([0])
+                expected = np.concatenate([np.abs(filterbank.process(chunk)[0]) ** 2 for chunk in chunks], axis=1)
+                output = np.concatenate([np.reshape(chunk, (args.noofscales, -1)) for chunk in Echunks], axis=1)
+                try:
+                    deviations.append(gammachirp.deviationdB(output, expected))
+                except AssertionError:
+                    deviations.append(float('nan'))
+            results[name] = {
+                'completed': True,
+                'seconds': elapsed,
+                'realtime_factor': args.seconds * args.sources / elapsed,
+                'deviations': deviations,
+                # ... nan, for a different number of frames, is not equivalent
+                'equivalent': all(deviation <= gammachirp.referenceTolerance for deviation in deviations),
+            }
+    finally:
+        shutil.rmtree(outdir)
+    if results['library']['completed']:
+        for result in results.values():
+            if result['completed']:
+                result['speedup'] = results['library']['seconds'] / result['seconds']
+    return results
+
+
+def run(argv=None):
+    args = parseArguments(sys.argv[1:] if argv is None else argv)
+    chunksize = int(args.samplerate // args.frequency)
+
+    result = benchmark(args, chunksize)
+    print('{0:>7} {1:>6} {2:>10} {3:>10}'.format('sources', 'scales', 'realtime', 'deviation'))
+    print('{0:>7} {1:>6} {2:>10.1f} {3:>10.1e}'.format(args.sources, args.noofscales, result['realtime_factor'], result['deviation']))
+
+    references = dict()
+    if args.reference:
+        logger = multiprocessing.log_to_stderr()
+        logger.setLevel(args.loglevel)
+        if not os.path.isdir(args.logdir):
+            os.makedirs(args.logdir)
+
+        print('')
+        print('{0:<8} {1:>10} {2:>8} {3:>14} {4:>10}'.format('board', 'realtime', 'speedup', 'max dB/source', 'equivalent'))
+        references = referenceBenchmark(chunksize, args, logger)
+        for name, reference in sorted(references.items()):
+            if not reference['completed']:
+                print('{0:<8} did not drain within {1} s'.format(name, args.timeout))
+                continue
+            print('{0:<8} {1:>10.1f} {2:>8.2f} {3:>14.2f} {4:>10}'.format(name, reference['realtime_factor'],
+                reference.get('speedup', float('nan')), max(reference['deviations']), 'yes' if reference['equivalent'] else 'NO'))
+
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump({'tolerance': gammachirp.tolerance, 'referenceTolerance': gammachirp.referenceTolerance,
+                'dynamicRange': gammachirp.dynamicRange, 'sources': args.sources, 'noofscales': args.noofscales,
+                'samplerate': args.samplerate, 'samplesperframe': args.samplesperframe, 'chunksize': chunksize,
+                'batch': result, 'reference': references}, f, indent=2, sort_keys=True)
+
+    if any(not reference['equivalent'] for reference in references.values()):
+        sys.exit('Cochleograms deviate more than {0} dB from the batched filterbank'.format(gammachirp.referenceTolerance))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,70 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Compare two benchmark reports written by soundannotatordemo.benchmark.run,
+    e.g. of two commits or two parameter sets.
+
+        python -m soundannotatordemo.benchmark.compare before.json after.json
+'''
+import json, sys
+
+
+def loadReport(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+def ratio(after, before):
+    if after is None or before is None or before == 0:
+        return float('nan')
+    return float(after) / before
+
+def compareReports(before, after):
+    ''' Rows of (stage, chunks/s before, after, ratio, p50 latency before, after, ratio). '''
+    rows = []
+    for name in sorted(set(before['stages']) | set(after['stages'])):
+        b = before['stages'].get(name, {})
+        a = after['stages'].get(name, {})
+        bLatency = (b.get('stage_latency_ms') or {}).get('p50')
+        aLatency = (a.get('stage_latency_ms') or {}).get('p50')
+        rows.append((name, b.get('chunks_per_s'), a.get('chunks_per_s'), ratio(a.get('chunks_per_s'), b.get('chunks_per_s')),
+                     bLatency, aLatency, ratio(aLatency, bLatency)))
+    return rows
+
+def formatValue(value):
+    return 'nan' if value is None else '{0:.2f}'.format(value)
+
+def run(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        sys.exit('Usage: compare <before.json> <after.json>')
+    before, after = loadReport(argv[0]), loadReport(argv[1])
+
+    print('before: commit {0} {1}'.format(before['commit'], json.dumps(before['parameters'], sort_keys=True)))
+    print('after:  commit {0} {1}'.format(after['commit'], json.dumps(after['parameters'], sort_keys=True)))
+    print('{0:<28} {1:>10} {2:>10} {3:>7} {4:>10} {5:>10} {6:>7}'.format('stage', 'chunks/s', 'chunks/s', 'ratio', 'p50 ms', 'p50 ms', 'ratio'))
+    for row in compareReports(before, after):
+        print('{0:<28} {1:>10} {2:>10} {3:>7} {4:>10} {5:>10} {6:>7}'.format(row[0], *[formatValue(value) for value in row[1:]]))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,123 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Measurements taken while a benchmarked board is running. Both classes are
+    DrainMonitor listeners: they are called for every chunk a watched stage
+    publishes.
+'''
+import resource, sys
+
+from soundannotatordemo.streamboard.tracing import latencyPercentiles
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class StageTimer(object):
+    '''
+        Records for every stage when each chunk number was published. From
+        these stamps it derives per stage throughput, the latency added by the
+        stage (relative to the latest of its upstream stages) and the latency
+        relative to the input stage.
+
+            stages:     list of pipeline.Stage, the first one is the input
+            chunksize:  input samples per chunk
+            inputrate:  input sampling rate
+    '''
+    def __init__(self, stages, chunksize, inputrate):
+        self.stages = stages
+        self.chunksize = chunksize
+        self.inputrate = inputrate
+        self.stamps = dict((stage.name, dict()) for stage in stages)
+
+    def __call__(self, processorName, chunk, receivedAt):
+        self.stamps[processorName].setdefault(chunk.number, receivedAt)
+
+    def stageReport(self, stage):
+        stamps = self.stamps[stage.name]
+        times = sorted(stamps.values())
+        report = {'chunks': len(times)}
+
+        if len(times) > 1 and times[-1] > times[0]:
+            chunksPerSecond = (len(times) - 1) / (times[-1] - times[0])
+            report['chunks_per_s'] = chunksPerSecond
+            report['input_samples_per_s'] = chunksPerSecond * self.chunksize
+            report['realtime_factor'] = chunksPerSecond * self.chunksize / float(self.inputrate)
+
+        stageLatencies = []
+        for number, stamp in stamps.items():
+            upstreamStamps = [self.stamps[upstream][number] for upstream in stage.upstreams if number in self.stamps[upstream]]
+            if len(upstreamStamps) > 0:
+                stageLatencies.append(stamp - max(upstreamStamps))
+        report['stage_latency_ms'] = latencyPercentiles(stageLatencies)
+
+        inputStamps = self.stamps[self.stages[0].name]
+        report['end_to_end_latency_ms'] = latencyPercentiles(
+            [stamp - inputStamps[number] for number, stamp in stamps.items() if number in inputStamps])
+
+        return report
+
+    def report(self):
+        return dict((stage.name, self.stageReport(stage)) for stage in self.stages)
+
+
+class PeakMemory(object):
+    '''
+        Peak resident set size of the processes started by the board. With
+        psutil available the children of this process are sampled at most
+        every interval seconds; the peak of their summed and of their largest
+        RSS is reported. Without psutil only the largest RSS of the finished
+        children as reported by getrusage is available.
+    '''
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.lastSample = 0
+        self.peakTotal = 0
+        self.peakProcess = 0
+
+    def __call__(self, processorName, chunk, receivedAt):
+        if psutil is None or receivedAt - self.lastSample < self.interval:
+            return
+        self.lastSample = receivedAt
+
+        rss = []
+        for child in psutil.Process().children(recursive=True):
+            try:
+                rss.append(child.memory_info().rss)
+            except psutil.Error:
+                pass
+        if len(rss) > 0:
+            self.peakTotal = max(self.peakTotal, sum(rss))
+            self.peakProcess = max(self.peakProcess, max(rss))
+
+    def report(self):
+        # ru_maxrss is in kilobytes on Linux and in bytes on OS X
+        maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        if sys.platform != 'darwin':
+            maxrss *= 1024
+        report = {'peak_rss_largest_process_bytes': max(self.peakProcess, maxrss)}
+        if psutil is not None:
+            report['peak_rss_all_processes_bytes'] = self.peakTotal
+        return report
@@ -0,0 +1,109 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    The processor chain of soundannotator-files, started on a Board for
+    benchmarking. Input is either synthetic noise of a given duration or a
+    folder with wav-files, read without realtime pacing.
+'''
+import glob, math, os
+
+from libsoundannotator.streamboard.processors.input                 import noise
+
+from soundannotatordemo.usecases                                    import common, processingfiles
+
+
+def daresFolder():
+    ''' Location of the DARES-G1 demo data shipped with this package. '''
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'demodata', 'dares_g1')
+
+
+class Stage(object):
+    '''
+        A processor in the benchmarked chain.
+            name:       name of the processor on the board
+            upstreams:  names of the stages it takes its input from
+            key:        key on which the processor is watched, chunks
+                        published under this key are timed
+    '''
+    def __init__(self, name, upstreams, key='technicalkey'):
+        self.name = name
+        self.upstreams = upstreams
+        self.key = key
+
+
+def startPipeline(b, args, logger):
+    '''
+        Start the chain of soundannotator-files on board b with the stage
+        helpers of usecases.processingfiles, so the TF backend, PTNE
+        configurations and pyramid, output format and transport are those of
+        the use case. Returns the list of stages in processing order. args
+        holds the same parameters as the use case plus:
+            source:     'synthetic' or a folder or file with wav-files
+            seconds:    duration of the synthetic input
+    '''
+    stages = [Stage('S2S_SoundInput', [])]
+
+    if args['source'] == 'synthetic':
+        noofchunks = int(math.ceil(float(args['seconds']) * args['inputrate'] / args['chunksize']))
+        b.startProcessor('S2S_SoundInput', noise.NoiseChunkGenerator,
+            SampleRate=args['inputrate'],
+            ChunkSize=args['chunksize'],
+            noofchunks=noofchunks,
+        )
+    else:
+        if os.path.isdir(args['source']):
+            wavfiles = sorted(glob.glob(os.path.join(args['source'], '*.wav')))
+        else:
+            wavfiles = [args['source']]
+        if len(wavfiles) == 0:
+            raise Exception('Found no wav files in {0}'.format(args['source']))
+        # timestep=0.0: read as fast as the pipeline accepts the data
+        processingfiles.startSoundInput(b, args, wavfiles, logger, timestep=0.0)
+
+    InternalRate=args['inputrate']/args['decimation']
+    InternalRate2=InternalRate/args['samplesperframe']
+
+    processingfiles.startCochleogram(b, args, InternalRate, args['samplesperframe'])
+    if args['decimation'] > 1:
+        stages.append(Stage('S2S_Resampler', ['S2S_SoundInput']))
+    stages.append(Stage('S2S_TFProcessor', [stages[-1].name]))
+
+    fExtractor, sExtractor = common.startStructureExtraction(b, args, InternalRate2)
+    extractors = sorted(set([fExtractor, sExtractor]))
+    for name in extractors:
+        stages.append(Stage(name, ['S2S_TFProcessor']))
+
+    FileWriter, fileWriterOptions = processingfiles.fileWriterFor(args)
+    ptneSuffixes, ptneUpstreams = processingfiles.startPTNE(b, args, InternalRate2, 'S2S_TFProcessor', fExtractor, sExtractor,
+        FileWriter, fileWriterOptions, args['outdir'], 'S2S_SoundInput')
+    # ... ptneSuffixes lists every pyramid level after the level it is computed from
+    for suffix in ptneSuffixes:
+        started = set(stage.name for stage in stages)
+        stages.append(Stage('S2S_PTNE'+suffix, [name for name in ptneUpstreams['S2S_PTNE'+suffix] if name in started]))
+        stages.append(Stage('S2S_FileWriter-PTNE'+suffix, ['S2S_PTNE'+suffix], 'drained'))
+
+    processingfiles.startTractWriter(b, args, InternalRate2, fExtractor, sExtractor, FileWriter, fileWriterOptions,
+        args['outdir'], 'S2S_SoundInput')
+    stages.append(Stage('S2S_FileWriter-Tracts', ['S2S_TFProcessor'] + extractors, 'drained'))
+
+    return stages
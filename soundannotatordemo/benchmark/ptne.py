@@ -0,0 +1,295 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Microbenchmark of the PTNE engines at 100 and 133 scales, checking they
+    agree with the loop engine within ptne.tolerance, and that a level of the
+    PTNE pyramid built by a BlockAggregator agrees with the vectorized engine
+    at the block width of the level.
+
+        python -m soundannotatordemo.benchmark.ptne --seconds 60
+
+    Reported is the cost per chunk of cochleogram frames and the speedup over
+    the loop engine.
+
+    With --reference the PartialPTN_Processor of libsoundannotator and
+    VectorizedPTN_Processor with every engine also run on a board, each on
+    the same random cochleogram and tracts, replayed from a columnar file by
+    a ColumnarReplayProcessor. A DrainMonitor records their features. These
+    are compared with the vectorized engine run on the whole input within
+    ptne.referenceTolerance, and the time from the first replayed chunk
+    until the PTNE processor drained is compared with that of the library
+    PartialPTN_Processor. Each PTNE processor feeds a PTNEAggregator, whose
+    pyramid level is compared with the vectorized engine at its block width.
+'''
+import argparse, json, logging, multiprocessing, os, shutil, sys, tempfile
+
+import numpy as np
+
+from libsoundannotator.streamboard.board                            import Board
+from libsoundannotator.streamboard.subscription                     import SubscriptionOrder
+
+from soundannotatordemo.cpsp                                        import ptne
+from soundannotatordemo.cpsp.vectorizedptn                          import ptneFor, PTNEAggregator
+from soundannotatordemo.storage.columnar                            import ColumnarWriter
+from soundannotatordemo.streamboard                                 import drain
+from soundannotatordemo.streamboard.processors.input.columnarreplay import ColumnarReplayProcessor
+
+
+# Band boundaries of the settings files (100 scales) and of the argparser default (133 scales)
+splits = {
+    100: [5, 20, 35, 50, 65, 80, 95],
+    133: list(range(10, 121, 5)),
+}
+
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the PTNE engines.')
+    parser.add_argument('--seconds', type=float, default=30.0,
+        help='Duration of the random cochleogram in seconds')
+    parser.add_argument('--scales', type=str, default='100,133',
+        help='Comma separated numbers of scales, each with its split from splits')
+    parser.add_argument('--framerate', type=float, default=176.4,
+        help='Cochleogram frames per second, inputrate/(decimation*samplesperframe)')
+    parser.add_argument('--frequency', type=int, default=5,
+        help='Chunks per second')
+    parser.add_argument('--blockwidth', type=float, default=0.1)
+    parser.add_argument('--pyramidfactor', type=int, default=10,
+        help='Blocks combined into one block of the checked pyramid level')
+    parser.add_argument('--ptnreferencevalue', type=float, default=None)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--reference', action='store_true',
+        help='Also run PartialPTN_Processor of libsoundannotator and VectorizedPTN_Processor on a board, check them against the vectorized engine and time them against the library')
+    parser.add_argument('--loglevel', type=int, default=logging.WARNING)
+    parser.add_argument('--logdir', type=str, default=os.path.join(os.path.expanduser('~'), '.libsoundannotator', 'log'))
+    parser.add_argument('--timeout', type=float, default=600,
+        help='Maximum duration of a board run in seconds')
+    parser.add_argument('--json', type=str, default=None,
+        help='File to write the report to')
+    return parser.parse_args(argv)
+
+
+def benchmark(noofscales, seconds, framerate, chunkframes, blockwidth, repeats):
+    '''
+        Per engine the best wall clock time, the cost per chunk, realtime
+        factor and deviation from the loop engine.
+    '''
+    E, f_tract, s_tract = ptne.testInput(noofscales, int(seconds * framerate))
+    framesPerBlock = blockwidth * framerate
+    noofchunks = -(-E.shape[-1] // chunkframes)
+    results = dict()
+    for name in sorted(ptne.engines):
+        engine = ptne.getEngine(name, noofscales, splits[noofscales], framesPerBlock)
+        elapsed = ptne.timeEngine(engine, E, f_tract, s_tract, chunkframes, 1 if name == 'loop' else repeats)
+        results[name] = {
+            'seconds': elapsed,
+            'ms_per_chunk': 1e3 * elapsed / noofchunks,
+            'realtime_factor': seconds / elapsed,
+            'deviation': ptne.checkEquivalence(name, E, f_tract, s_tract, chunkframes, splits[noofscales], framesPerBlock),
+        }
+    for name in results:
+        results[name]['speedup'] = results['loop']['seconds'] / results[name]['seconds']
+    return results
+
+
+def pyramid(noofscales, seconds, framerate, chunkframes, blockwidth, factor):
+    ''' Deviation of a pyramid level from the vectorized engine at its block width. '''
+    E, f_tract, s_tract = ptne.testInput(noofscales, int(seconds * framerate))
+    return ptne.checkPyramid(E, f_tract, s_tract, chunkframes, splits[noofscales], blockwidth * framerate, factor)
+
+
+def writeInput(filename, E, f_tract, s_tract, framerate):
+    ''' Write the cochleogram and tracts as a columnar file for ColumnarReplayProcessor. '''
+    writer = ColumnarWriter(filename, framerate, mode='w')
+    for key, frames in [('E', E), ('f_tract', f_tract), ('s_tract', s_tract)]:
+        writer.append(key, frames, 0.0, newSegment=True)
+    writer.close()
+
+
+def boardRun(name, filename, noofscales, framerate, chunkframes, blockwidth, args, logger):
+    '''
+        Compute the PTNE features of the columnar file on a board with the
+        PTNE processor selected by name as in the use cases, followed by a
+        PTNEAggregator for one pyramid level. Returns the features and those
+        of the level per chunk, and the seconds from the first replayed chunk
+        until the PTNE processor drained, None if it did not drain.
+    '''
+    b = Board(loglevel=args.loglevel, logdir=args.logdir, logfile='soundAnnotator-ptne-{0}'.format(name))
+    b.startProcessor('S2S_CochleogramReplay', ColumnarReplayProcessor,
+        Sources=[('benchmark', filename)],
+        keys=['E', 'f_tract', 's_tract'],
+        SampleRate=framerate,
+        ChunkFrames=chunkframes,
+    )
+    ptneClass, ptneOptions = ptneFor({'ptneengine': name})
+    b.startProcessor('S2S_PTNE', ptneClass,
+        SubscriptionOrder('S2S_CochleogramReplay','S2S_PTNE','E','E'),
+        SubscriptionOrder('S2S_CochleogramReplay','S2S_PTNE','f_tract','f_tract'),
+        SubscriptionOrder('S2S_CochleogramReplay','S2S_PTNE','s_tract','s_tract'),
+        featurenames=ptne.featureNames,
+        noofscales=noofscales,
+        split=splits[noofscales],
+        SampleRate=framerate,
+        blockwidth=blockwidth,
+        ptnreferencevalue=args.ptnreferencevalue,
+        **ptneOptions
+    )
+    b.startProcessor('S2S_PTNE-x{0}'.format(args.pyramidfactor), PTNEAggregator,
+        *[SubscriptionOrder('S2S_PTNE','S2S_PTNE-x{0}'.format(args.pyramidfactor),feature,feature) for feature in ptne.featureNames],
+        factor=args.pyramidfactor,
+        framesPerBlock=blockwidth*framerate
+    )
+
+    monitor = drain.DrainMonitor(b, logger)
+    receivedAt = []
+    monitor.watch('S2S_CochleogramReplay', 'E', listener=lambda processorName, chunk, at: receivedAt.append(at))
+    features = dict((processorName, dict((feature, []) for feature in ptne.featureNames))
+        for processorName in ['S2S_PTNE', 'S2S_PTNE-x{0}'.format(args.pyramidfactor)])
+    for processorName in sorted(features):
+        for feature in ptne.featureNames:
+            monitor.watch(processorName, feature,
+                listener=lambda processorName, chunk, at, feature=feature: features[processorName][feature].append(np.asarray(chunk.data)))
+
+    completed = monitor.wait(timeout=args.timeout)
+    b.stopallprocessors()
+
+    elapsed = max(stage.drainedAt for stage in monitor.stages if stage.processorName == 'S2S_PTNE') - min(receivedAt) if completed else None
+    return features['S2S_PTNE'], features['S2S_PTNE-x{0}'.format(args.pyramidfactor)], elapsed
+
+
+def joinChunks(chunks, noofbands):
+    ''' The features of the chunks as arrays (bands x blocks). '''
+    return dict((feature, np.concatenate([np.reshape(chunk, (noofbands, -1)) for chunk in featureChunks] + [np.zeros((noofbands, 0))], axis=-1))
+        for feature, featureChunks in chunks.items())
+
+
+def compare(output, expected):
+    ''' Deviation of output from expected in dB, nan if the number of blocks differs. '''
+    try:
+        return ptne.deviation(output, expected)
+    except AssertionError:
+        return float('nan')
+
+
+def referenceBenchmark(noofscales, seconds, framerate, chunkframes, blockwidth, args, logger):
+    '''
+        Per PTNE processor, the library one and VectorizedPTN_Processor with
+        every engine, its time on a board, speedup over the library
+        PartialPTN_Processor and deviation from the vectorized engine on the
+        same input, and the deviation of its pyramid level from the
+        vectorized engine at the block width of the level.
+    '''
+    E, f_tract, s_tract = ptne.testInput(noofscales, int(seconds * framerate))
+    noofbands = len(splits[noofscales]) - 1
+    expected = ptne.reduce(ptne.getEngine('vectorized', noofscales, splits[noofscales], blockwidth * framerate,
+        ptnreferencevalue=args.ptnreferencevalue), E, f_tract, s_tract, E.shape[-1])
+    expectedLevel = ptne.reduce(ptne.getEngine('vectorized', noofscales, splits[noofscales], blockwidth * args.pyramidfactor * framerate,
+        ptnreferencevalue=args.ptnreferencevalue), E, f_tract, s_tract, E.shape[-1])
+    directory = tempfile.mkdtemp(prefix='ptne-benchmark-')
+    try:
+        filename = os.path.join(directory, 'cochleogram.h5')
+        writeInput(filename, E, f_tract, s_tract, framerate)
+        results = dict()
+        for name in ['library'] + sorted(ptne.engines):
+            features, levelFeatures, elapsed = boardRun(name, filename, noofscales, framerate, chunkframes, blockwidth, args, logger)
+            if elapsed is None:
+                results[name] = {'completed': False, 'equivalent': False}
+                continue
+            output = joinChunks(features, noofbands)
+            level = joinChunks(levelFeatures, noofbands)
+            deviation = compare(output, expected)
+            levelDeviation = compare(level, expectedLevel)
+            results[name] = {
+                'completed': True,
+                'seconds': elapsed,
+                'ms_per_chunk': 1e3 * elapsed / -(-E.shape[-1] // chunkframes),
+                'blocks': output['energy'].shape[-1],
+                'expected_blocks': expected['energy'].shape[-1],
+                'deviation': deviation,
+                'pyramid_blocks': level['energy'].shape[-1],
+                'expected_pyramid_blocks': expectedLevel['energy'].shape[-1],
+                'pyramid_deviation': levelDeviation,
+                # ... nan, for a different number of blocks, is not equivalent
+                'equivalent': bool(deviation <= ptne.referenceTolerance and levelDeviation <= ptne.referenceTolerance),
+            }
+    finally:
+        shutil.rmtree(directory)
+    if results['library']['completed']:
+        for result in results.values():
+            if result['completed']:
+                result['speedup'] = results['library']['seconds'] / result['seconds']
+    return results
+
+
+def run(argv=None):
+    args = parseArguments(sys.argv[1:] if argv is None else argv)
+    chunkframes = int(round(args.framerate / args.frequency))
+    scales = [int(scales) for scales in args.scales.split(',')]
+    for noofscales in scales:
+        if noofscales not in splits:
+            sys.exit('No split for {0} scales, choose from {1}'.format(noofscales, sorted(splits)))
+
+    report = dict()
+    pyramids = dict()
+    print('{0:>6} {1:<11} {2:>12} {3:>10} {4:>8} {5:>10}'.format('scales', 'engine', 'ms/chunk', 'realtime', 'vs loop', 'deviation'))
+    for noofscales in scales:
+        results = benchmark(noofscales, args.seconds, args.framerate, chunkframes, args.blockwidth, args.repeats)
+        report[str(noofscales)] = results
+        for name, result in sorted(results.items()):
+            print('{0:>6} {1:<11} {2:>12.3f} {3:>10.1f} {4:>8.1f} {5:>10.1e}'.format(noofscales, name,
+                result['ms_per_chunk'], result['realtime_factor'], result['speedup'], result['deviation']))
+        pyramids[str(noofscales)] = pyramid(noofscales, args.seconds, args.framerate, chunkframes, args.blockwidth, args.pyramidfactor)
+        print('{0:>6} {1:<11} {2:>43.1e}'.format(noofscales, 'x{0}'.format(args.pyramidfactor), pyramids[str(noofscales)]))
+
+    references = dict()
+    if args.reference:
+        logger = multiprocessing.log_to_stderr()
+        logger.setLevel(args.loglevel)
+        if not os.path.isdir(args.logdir):
+            os.makedirs(args.logdir)
+
+        print('')
+        print('{0:>6} {1:<11} {2:>12} {3:>8} {4:>10} {5:>10} {6:>10}'.format('scales', 'board', 'ms/chunk', 'speedup', 'deviation', 'pyramid', 'equivalent'))
+        for noofscales in scales:
+            results = referenceBenchmark(noofscales, args.seconds, args.framerate, chunkframes, args.blockwidth, args, logger)
+            references[str(noofscales)] = results
+            for name, result in sorted(results.items()):
+                if not result['completed']:
+                    print('{0:>6} {1:<11} did not drain within {2} s'.format(noofscales, name, args.timeout))
+                    continue
+                print('{0:>6} {1:<11} {2:>12.3f} {3:>8.2f} {4:>10.1e} {5:>10.1e} {6:>10}'.format(noofscales, name,
+                    result['ms_per_chunk'], result.get('speedup', float('nan')), result['deviation'], result['pyramid_deviation'],
+                    'yes' if result['equivalent'] else 'NO ({0} of {1} blocks, {2} of {3} in the pyramid)'.format(
+                        result['blocks'], result['expected_blocks'], result['pyramid_blocks'], result['expected_pyramid_blocks'])))
+
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump({'tolerance': ptne.tolerance, 'referenceTolerance': ptne.referenceTolerance, 'framerate': args.framerate,
+                'chunkframes': chunkframes, 'blockwidth': args.blockwidth, 'splits': dict((str(key), value) for key, value in splits.items()),
+                'pyramidfactor': args.pyramidfactor, 'scales': report, 'pyramid': pyramids, 'reference': references}, f, indent=2, sort_keys=True)
+
+    if any(not result['equivalent'] for results in references.values() for result in results.values()):
+        sys.exit('PTNE features or their pyramid deviate more than {0:.0e} dB from the vectorized engine'.format(ptne.referenceTolerance))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,217 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Microbenchmark of the resampler engines at the input rates of our
+    microphones, checking they agree with the direct engine within
+    resampler.tolerance.
+
+        python -m soundannotatordemo.benchmark.resampler --seconds 60
+
+    With --reference the Resampler of libsoundannotator and FastResampler
+    with every engine also run on a board, each resampling white noise from
+    the NoiseChunkGenerator. A DrainMonitor records the input and output
+    chunks. The output of each is compared with the direct engine run on the
+    recorded input in the same chunks. For FastResampler it should agree
+    within resampler.tolerance. For the library Resampler the deviation is
+    reported: it measures how far kaiserLowpass is from the filter of the
+    library, which is not assumed to be the same. The time from the first
+    input chunk until the resampler drained is compared with that of the
+    library Resampler.
+'''
+import argparse, json, logging, multiprocessing, os, sys
+
+import numpy as np
+
+from libsoundannotator.streamboard.board                            import Board
+from libsoundannotator.streamboard.subscription                     import SubscriptionOrder
+from libsoundannotator.streamboard.processors.input                 import noise
+
+from soundannotatordemo.cpsp                                        import resampler
+from soundannotatordemo.cpsp.fastresampler                          import resamplerFor
+from soundannotatordemo.streamboard                                 import drain
+
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the resampler engines.')
+    parser.add_argument('--seconds', type=float, default=30.0,
+        help='Duration of the white noise input in seconds')
+    parser.add_argument('--inputrates', type=str, default='44100,48000',
+        help='Comma separated input rates (Hz)')
+    parser.add_argument('--frequency', type=int, default=5,
+        help='Chunks per second, the chunksize is inputrate/frequency')
+    parser.add_argument('--filterlength', type=int, default=1000)
+    parser.add_argument('--decimation', type=int, default=5)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--reference', action='store_true',
+        help='Also run the Resampler of libsoundannotator and FastResampler on a board, check FastResampler and measure the library against the direct engine, and time them against the library')
+    parser.add_argument('--loglevel', type=int, default=logging.WARNING)
+    parser.add_argument('--logdir', type=str, default=os.path.join(os.path.expanduser('~'), '.libsoundannotator', 'log'))
+    parser.add_argument('--timeout', type=float, default=600,
+        help='Maximum duration of a board run in seconds')
+    parser.add_argument('--json', type=str, default=None,
+        help='File to write the report to')
+    return parser.parse_args(argv)
+
+
+def benchmark(inputrate, seconds, chunksize, FilterLength, DecimateFactor, repeats):
+    ''' Per engine the best wall clock time, samples per second, realtime factor and deviation from the direct engine. '''
+    noise = np.random.RandomState(0).randn(int(seconds * inputrate)).astype(np.complex64)
+    results = dict()
+    for name in sorted(resampler.engines):
+        engine = resampler.getEngine(name, FilterLength, DecimateFactor)
+        elapsed = resampler.timeEngine(engine, noise, chunksize, repeats)
+        results[name] = {
+            'seconds': elapsed,
+            'samples_per_s': len(noise) / elapsed,
+            'realtime_factor': seconds / elapsed,
+            'deviation': resampler.checkEquivalence(name, noise, chunksize, FilterLength, DecimateFactor),
+        }
+    for name in results:
+        results[name]['speedup'] = results['direct']['seconds'] / results[name]['seconds']
+    return results
+
+
+def resampleChunks(engine, chunks):
+    ''' Output of engine fed the given chunks. '''
+    engine.reset()
+    return np.concatenate([engine.process(np.asarray(chunk).ravel()) for chunk in chunks])
+
+
+def boardRun(name, inputrate, seconds, chunksize, FilterLength, DecimateFactor, args, logger):
+    '''
+        Resample seconds of white noise on a board with the Resampler selected
+        by name as in the use cases. Returns the input and output chunks and
+        the seconds from the first input chunk until the resampler drained,
+        None if it did not drain.
+    '''
+    b = Board(loglevel=args.loglevel, logdir=args.logdir, logfile='soundAnnotator-resampler-{0}'.format(name))
+    b.startProcessor('S2S_SoundInput', noise.NoiseChunkGenerator,
+        SampleRate=inputrate,
+        ChunkSize=chunksize,
+        noofchunks=int(np.ceil(float(seconds) * inputrate / chunksize)),
+    )
+    resamplerClass, resamplerOptions = resamplerFor({'resampler': name})
+    b.startProcessor('S2S_Resampler', resamplerClass, SubscriptionOrder('S2S_SoundInput','S2S_Resampler','sound','timeseries'),
+        SampleRate=inputrate,
+        FilterLength=FilterLength,
+        DecimateFactor=DecimateFactor,
+        dTypeIn=np.complex64,
+        dTypeOut=np.complex64,
+        **resamplerOptions
+    )
+
+    monitor = drain.DrainMonitor(b, logger)
+    monitor.watch('S2S_SoundInput', 'sound')
+    monitor.watch('S2S_Resampler', 'timeseries')
+    chunks = {'S2S_SoundInput': [], 'S2S_Resampler': []}
+    receivedAt = []
+    def record(processorName, chunk, at):
+        chunks[processorName].append(np.asarray(chunk.data))
+        receivedAt.append(at)
+    monitor.addListener(record)
+
+    completed = monitor.wait(timeout=args.timeout)
+    b.stopallprocessors()
+
+    elapsed = monitor.stages[1].drainedAt - min(receivedAt) if completed else None
+    return chunks['S2S_SoundInput'], chunks['S2S_Resampler'], elapsed
+
+
+def referenceBenchmark(inputrate, seconds, chunksize, FilterLength, DecimateFactor, args, logger):
+    '''
+        Per resampler, the library one and FastResampler with every engine,
+        its time on a board, speedup over the library Resampler and deviation
+        from the direct engine on the same input. FastResampler is equivalent
+        when it deviates at most resampler.tolerance, for the library
+        Resampler equivalent is None: its deviation is only reported.
+    '''
+    results = dict()
+    for name in ['library'] + sorted(resampler.engines):
+        inputs, outputs, elapsed = boardRun(name, inputrate, seconds, chunksize, FilterLength, DecimateFactor, args, logger)
+        if elapsed is None:
+            results[name] = {'completed': False, 'equivalent': False}
+            continue
+        output = np.concatenate([np.asarray(chunk).ravel() for chunk in outputs])
+        expected = resampleChunks(resampler.getEngine('direct', FilterLength, DecimateFactor), inputs)
+        common = min(len(output), len(expected))
+        deviation = np.max(np.abs(output[:common] - expected[:common])) / max(np.max(np.abs(expected[:common])), np.finfo(np.float32).tiny)
+        results[name] = {
+            'completed': True,
+            'seconds': elapsed,
+            'samples_per_s': sum(len(np.asarray(chunk).ravel()) for chunk in inputs) / elapsed,
+            'outputs': len(output),
+            'expected_outputs': len(expected),
+            'deviation': float(deviation),
+            'equivalent': None if name == 'library' else bool(len(output) == len(expected) and deviation <= resampler.tolerance),
+        }
+    if results['library']['completed']:
+        for result in results.values():
+            if result['completed']:
+                result['speedup'] = results['library']['seconds'] / result['seconds']
+    return results
+
+
+def run(argv=None):
+    args = parseArguments(sys.argv[1:] if argv is None else argv)
+
+    report = dict()
+    print('{0:>9} {1:<10} {2:>12} {3:>10} {4:>8} {5:>10}'.format('inputrate', 'engine', 'Msamples/s', 'realtime', 'speedup', 'deviation'))
+    for inputrate in [int(rate) for rate in args.inputrates.split(',')]:
+        results = benchmark(inputrate, args.seconds, inputrate // args.frequency, args.filterlength, args.decimation, args.repeats)
+        report[str(inputrate)] = results
+        for name, result in sorted(results.items()):
+            print('{0:>9} {1:<10} {2:>12.2f} {3:>10.1f} {4:>8.2f} {5:>10.1e}'.format(inputrate, name,
+                result['samples_per_s'] / 1e6, result['realtime_factor'], result['speedup'], result['deviation']))
+
+    references = dict()
+    if args.reference:
+        logger = multiprocessing.log_to_stderr()
+        logger.setLevel(args.loglevel)
+        if not os.path.isdir(args.logdir):
+            os.makedirs(args.logdir)
+
+        print('')
+        print('{0:>9} {1:<10} {2:>12} {3:>8} {4:>10} {5:>10}'.format('inputrate', 'board', 'Msamples/s', 'speedup', 'deviation', 'equivalent'))
+        for inputrate in [int(rate) for rate in args.inputrates.split(',')]:
+            results = referenceBenchmark(inputrate, args.seconds, inputrate // args.frequency, args.filterlength, args.decimation, args, logger)
+            references[str(inputrate)] = results
+            for name, result in sorted(results.items()):
+                if not result['completed']:
+                    print('{0:>9} {1:<10} did not drain within {2} s'.format(inputrate, name, args.timeout))
+                    continue
+                print('{0:>9} {1:<10} {2:>12.2f} {3:>8.2f} {4:>10.1e} {5:>10}'.format(inputrate, name,
+                    result['samples_per_s'] / 1e6, result.get('speedup', float('nan')), result['deviation'],
+                    '-' if result['equivalent'] is None else 'yes' if result['equivalent'] else 'NO ({0} of {1} samples)'.format(result['outputs'], result['expected_outputs'])))
+
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump({'tolerance': resampler.tolerance,
+                'filterlength': args.filterlength, 'decimation': args.decimation, 'rates': report,
+                'reference': references}, f, indent=2, sort_keys=True)
+
+    if any(result['equivalent'] is False for results in references.values() for result in results.values()):
+        sys.exit('FastResampler output deviates more than {0:.0e} from the direct engine'.format(resampler.tolerance))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,202 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Benchmark of the processing-files chain, reporting per stage throughput,
+    latency percentiles and peak RSS as JSON.
+
+    Examples:
+        python -m soundannotatordemo.benchmark.run --source synthetic --seconds 120 --json synthetic.json
+        python -m soundannotatordemo.benchmark.run --source dares --noofscales 133 --json dares-133.json
+
+    Reports of different commits or parameter sets are compared with
+    soundannotatordemo.benchmark.compare.
+'''
+import argparse, json, logging, multiprocessing, os, platform, shutil, sys, tempfile, time
+
+from libsoundannotator.streamboard.board                            import Board
+
+from soundannotatordemo.benchmark                                   import pipeline
+from soundannotatordemo.benchmark.measurements                      import StageTimer, PeakMemory
+from soundannotatordemo.calibration                                 import cache as calibrationcache
+from soundannotatordemo.calibration                                 import calibrator
+from soundannotatordemo.streamboard                                 import drain
+from soundannotatordemo.streamboard.sharedmemory                    import SharedMemoryBoard
+from soundannotatordemo.usecases                                    import common
+
+# Version info generated for this build
+from  soundannotatordemo.config import runtimeMetaData
+
+
+def parseArguments(argv):
+    basedir = os.path.join(os.path.expanduser('~'), '.libsoundannotator')
+
+    parser = argparse.ArgumentParser(description='Benchmark the stages of the processing-files pipeline.')
+    inputgroup = parser.add_argument_group('input')
+    inputgroup.add_argument('--source', type=str, default='synthetic',
+        help="'synthetic' for white noise, 'dares' for demodata/dares_g1, or a wav file or folder")
+    inputgroup.add_argument('--seconds', type=float, default=60.0,
+        help='Duration of the synthetic input in seconds')
+    inputgroup.add_argument('--inputrate', type=int, default=44100,
+        help='Integer sampling rate (Hz) of the input')
+    inputgroup.add_argument('--chunksize', type=int, default=8820,
+        help='Number of input samples per chunk')
+    inputgroup.add_argument('--mmapwav', action='store_true',
+        help='Read wav input with the MmapWavProcessor')
+    inputgroup.add_argument('--offline', action='store_true',
+        help='Read wav input with the OfflineWavProcessor in blocks of --offlineblock seconds instead of --chunksize')
+    inputgroup.add_argument('--offlineblock', type=float, default=30.0)
+
+    signalprocessinggroup = parser.add_argument_group('signal processing')
+    signalprocessinggroup.add_argument('--noofscales', type=int, default=100)
+    signalprocessinggroup.add_argument('--decimation', type=int, default=5)
+    signalprocessinggroup.add_argument('--samplesperframe', type=int, default=5)
+    signalprocessinggroup.add_argument('--resampler', type=str, default='library',
+        choices=['library', 'direct', 'polyphase', 'fft'])
+    signalprocessinggroup.add_argument('--batchedtf', action='store_true')
+    signalprocessinggroup.add_argument('--fusedstructure', action='store_true')
+    signalprocessinggroup.add_argument('--ptnsplit', type=str, default='[5,20,35,50,65,80,95]')
+    signalprocessinggroup.add_argument('--ptnblockwidth', type=float, default=0.1)
+    signalprocessinggroup.add_argument('--ptneengine', type=str, default='library',
+        choices=['library', 'loop', 'vectorized'])
+    signalprocessinggroup.add_argument('--ptneconfigs', type=str, default=None,
+        help="PTNE configurations as for soundannotator-files, e.g. 'fine:0.01;coarse:1.0'")
+    signalprocessinggroup.add_argument('--ptnepyramid', type=int, default=0)
+    signalprocessinggroup.add_argument('--ptnepyramidfactor', type=int, default=10)
+
+    transportgroup = parser.add_argument_group('transport')
+    transportgroup.add_argument('--sharedmemory', action='store_true',
+        help='Move the large chunks between the processes through shared memory, the report then includes copies per chunk')
+
+    outputgroup = parser.add_argument_group('output')
+    outputgroup.add_argument('--outputformat', type=str, default='float32',
+        choices=['float32', 'columnar'])
+    outputgroup.add_argument('--json', type=str, default=None,
+        help='File to write the report to, defaults to benchmark-<commit>-<time>.json in the current directory')
+    outputgroup.add_argument('--keepoutput', action='store_true',
+        help='Keep the files written by the FileWriters')
+    outputgroup.add_argument('--loglevel', type=int, default=logging.WARNING)
+    outputgroup.add_argument('--logdir', type=str, default=os.path.join(basedir, 'log'))
+    outputgroup.add_argument('--timeout', type=float, default=3600,
+        help='Maximum duration of the benchmark in seconds')
+
+    return parser.parse_args(argv)
+
+
+def run(argv=None):
+    namespace = parseArguments(sys.argv[1:] if argv is None else argv)
+
+    args = vars(namespace).copy()
+    if args['source'] == 'dares':
+        args['source'] = pipeline.daresFolder()
+    args['wav'] = None if args['source'] == 'synthetic' else args['source']
+    args['ptnreferencevalue'] = None
+    args['tracing'] = False
+    args['maxFileSize'] = 104857600
+    args['draintimeout'] = args['timeout']
+    args['outdir'] = tempfile.mkdtemp(prefix='soundannotator-benchmark-')
+    if args['offline']:
+        args['chunksize'] = common.offlineChunkSize(args)
+    try:
+        common.checkPTNEArguments(args)
+    except ValueError as e:
+        sys.exit(str(e))
+    args['cachename'] = calibrationcache.cacheName(args)
+    if not os.path.isdir(args['logdir']):
+        os.makedirs(args['logdir'])
+
+    logger = multiprocessing.log_to_stderr()
+    logger.setLevel(args['loglevel'])
+
+    # Calibration is not part of the measurement
+    if not calibrationcache.isCalibrated(args):
+        print('Calibrating before benchmarking')
+        if not calibrator.calibrate(args):
+            sys.exit('Calibration failed')
+
+    b = Board(loglevel=args['loglevel'], logdir=args['logdir'], logfile='soundAnnotator-benchmark')
+    if args['sharedmemory']:
+        b = SharedMemoryBoard(b, common.sharedMemoryLayout(args), slotBytes=common.sharedMemorySlotBytes(args, args['chunksize']))
+    stages = pipeline.startPipeline(b, args, logger)
+
+    monitor = drain.DrainMonitor(b, logger)
+    for stage in stages:
+        monitor.watch(stage.name, stage.key)
+    timer = StageTimer(stages, args['chunksize'], args['inputrate'])
+    memory = PeakMemory()
+    monitor.addListener(timer)
+    monitor.addListener(memory)
+
+    started = time.time()
+    completed = monitor.wait(timeout=args['timeout'])
+    wallclocktime = time.time() - started
+    sharedMemoryReport = b.report() if args['sharedmemory'] else None
+    b.stopallprocessors()
+
+    report = {
+        'commit': runtimeMetaData.version,
+        'branch': runtimeMetaData.branch,
+        'started': time.strftime('%Y-%m-%d-%H-%M-%S', time.localtime(started)),
+        'host': platform.node(),
+        'cpus': multiprocessing.cpu_count(),
+        'completed': completed,
+        'wallclocktime_s': wallclocktime,
+        'parameters': dict((key, args[key]) for key in ['source', 'seconds', 'inputrate', 'chunksize', 'noofscales',
+                                                        'decimation', 'samplesperframe', 'resampler', 'batchedtf', 'fusedstructure', 'mmapwav', 'offline', 'sharedmemory', 'ptnsplit', 'ptnblockwidth',
+                                                        'ptneengine', 'ptneconfigs', 'ptnepyramid', 'ptnepyramidfactor', 'outputformat']),
+        'stages': timer.report(),
+        'memory': memory.report(),
+        'sharedmemory': sharedMemoryReport,
+        'drained_s': dict((stage.processorName, stage.drainedAt - started) for stage in monitor.stages if stage.drainedAt is not None),
+    }
+
+    filename = args['json']
+    if filename is None:
+        filename = 'benchmark-{0}-{1}.json'.format(runtimeMetaData.version[:8], report['started'])
+    with open(filename, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    printReport(report)
+    print('Report written to {0}'.format(filename))
+
+    if args['keepoutput']:
+        print('Output kept in {0}'.format(args['outdir']))
+    else:
+        shutil.rmtree(args['outdir'], ignore_errors=True)
+
+
+def printReport(report):
+    print('{0:<28} {1:>8} {2:>10} {3:>10} {4:>12} {5:>12}'.format('stage', 'chunks', 'chunks/s', 'realtime', 'p50 ms', 'p99 ms'))
+    for name, stage in sorted(report['stages'].items(), key=lambda item: report['drained_s'].get(item[0], float('inf'))):
+        latency = stage['stage_latency_ms'] or {}
+        print('{0:<28} {1:>8} {2:>10.2f} {3:>10.2f} {4:>12.1f} {5:>12.1f}'.format(
+            name, stage['chunks'], stage.get('chunks_per_s', float('nan')), stage.get('realtime_factor', float('nan')),
+            latency.get('p50', float('nan')), latency.get('p99', float('nan'))))
+    for key, value in sorted(report['memory'].items()):
+        print('{0}: {1:.1f} MB'.format(key, value / 1048576.0))
+    for ring, statistics in sorted((report.get('sharedmemory') or {}).items()):
+        print('shared memory {0}: {1:.2f} copies/chunk instead of {2}, {3:.1f} MB/s, {4} overruns'.format(
+            ring, statistics['copies_per_chunk'], statistics['pipe_copies_per_chunk'], statistics['MB_per_s'], statistics['overruns']))
+
+
+if __name__ == '__main__':
+    run()
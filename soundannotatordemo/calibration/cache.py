@@ -0,0 +1,81 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Persistent cache of structure extractor calibrations.
+
+    The structureProcessorCalibrator stores the correlation lengths measured
+    in white noise in '<cachename>.cache'. Those depend on the parameters of
+    the processors in front of the structure extractor, so the cachename is
+    derived from a fingerprint of these parameters. All use cases share the
+    cache directory, by default ~/.libsoundannotator/calibration, and only
+    calibrate when no cache exists for their parameters.
+'''
+import os, json, time
+
+from soundannotatordemo.config.fingerprint import parameterFingerprint
+
+
+# Parameters which change the TSRep seen by the structure extractor
+calibrationParameters = ['noofscales', 'inputrate', 'decimation', 'samplesperframe']
+
+cachePrefix = 'S2S_StructureExtractorCache'
+
+
+def defaultCalibrationDir():
+    return os.path.join(os.path.expanduser('~'), '.libsoundannotator', 'calibration')
+
+def calibrationDir(args):
+    ''' The calibration directory from args['calibrationdir'] if given, created if needed. '''
+    directory = args.get('calibrationdir') or defaultCalibrationDir()
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    return directory
+
+def cacheName(args):
+    ''' Cachename to pass to the structure extractors and their calibrator. '''
+    key = parameterFingerprint(args, calibrationParameters)
+    # ... the batched filterbank designs its own gammachirps, which benchmark.batchedtf --reference
+    #     compares with GCFBProcessor but are not assumed to be equal
+    if args.get('batchedtf'):
+        key += '-batched'
+    # ... and the resampler engines, which agree with each other, filter with resampler.kaiserLowpass,
+    #     which benchmark.resampler --reference compares with the library Resampler but is not assumed to be equal
+    if args.get('resampler') not in (None, 'library'):
+        key += '-kaiser'
+    return os.path.join(calibrationDir(args), '{0}-{1}'.format(cachePrefix, key))
+
+def isCalibrated(args):
+    ''' True if a calibration exists for the parameters in args. '''
+    return os.path.isfile(cacheName(args) + '.cache')
+
+def recordParameters(args):
+    '''
+        Write the parameters a calibration was made for next to the cache
+        file, so cache entries can be identified by humans.
+    '''
+    description = dict((key, args[key]) for key in calibrationParameters)
+    description['batchedtf'] = bool(args.get('batchedtf'))
+    description['resampler'] = args.get('resampler') or 'library'
+    description['created'] = time.strftime('%Y-%m-%d-%H-%M')
+    with open(cacheName(args) + '.json', 'w') as f:
+        json.dump(description, f, sort_keys=True, indent=4)
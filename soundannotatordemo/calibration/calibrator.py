@@ -0,0 +1,133 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Calibration of the structure extractor for one parameter set.
+
+    This is the args['calibrate']=True path of the use cases packaged as a
+    function: white noise from the NoiseChunkGenerator goes through the
+    Resampler and the GCFBProcessor into the structureProcessorCalibrator,
+    which writes the calibration to calibrationcache.cacheName(args).
+'''
+import multiprocessing, os
+import numpy as np
+
+# Streamboard architecture
+from libsoundannotator.streamboard.board                            import Board
+from libsoundannotator.streamboard.continuity                       import Continuity
+from libsoundannotator.streamboard.subscription                     import SubscriptionOrder
+
+# Streamboard processors
+from libsoundannotator.streamboard.processors.input                 import noise
+from libsoundannotator.cpsp                                         import tfprocessor
+from libsoundannotator.cpsp                                         import structureProcessor
+
+from soundannotatordemo.cpsp.batchedtf                              import BatchedGCFBProcessor
+from soundannotatordemo.cpsp.fastresampler                          import resamplerFor
+from soundannotatordemo.calibration                                 import cache as calibrationcache
+from soundannotatordemo.streamboard                                 import drain
+
+# Version info generated for this build
+from  soundannotatordemo.config import runtimeMetaData
+
+
+def calibrate(args, logfile=None):
+    '''
+        Run the calibration board for the parameters in args and wait until
+        the calibration cache has been written. Required keys in args:
+        loglevel, logdir, outdir, inputrate, decimation, noofscales,
+        samplesperframe and draintimeout. Returns True on success.
+    '''
+    logger = multiprocessing.log_to_stderr()
+    logger.setLevel(args['loglevel'])
+
+    cachename = calibrationcache.cacheName(args)
+    if logfile is None:
+        logfile = 'calibration-{0}'.format(os.path.basename(cachename))
+
+    b = Board(loglevel=args['loglevel'], logdir=args['logdir'], logfile=logfile)
+
+    # Calibration noise, one large chunk of 11 seconds
+    b.startProcessor('S2S_SoundInput', noise.NoiseChunkGenerator,
+        SampleRate=args['inputrate'],
+        ChunkSize=11*args['inputrate'],
+        noofchunks=1,
+        calibration=True,
+    )
+
+    if args['decimation'] > 1:
+        resamplerClass, resamplerOptions=resamplerFor(args)
+        b.startProcessor('S2S_Resampler', resamplerClass, SubscriptionOrder('S2S_SoundInput','S2S_Resampler','sound','timeseries'),
+            SampleRate=args['inputrate'],
+            FilterLength=1000,
+            DecimateFactor=args['decimation'],
+            dTypeIn=np.complex64,
+            dTypeOut=np.complex64,
+            **resamplerOptions
+        )
+        myTFProcessorSubscriptionOrder=SubscriptionOrder('S2S_Resampler','S2S_TFProcessor','timeseries','timeseries')
+    else:
+        myTFProcessorSubscriptionOrder=SubscriptionOrder('S2S_SoundInput','S2S_TFProcessor','sound','timeseries')
+
+    InternalRate=args['inputrate']/args['decimation']
+    InternalRate2=InternalRate/args['samplesperframe']
+
+    # Calibrations for the batched filterbank are made with that filterbank
+    if args.get('batchedtf'):
+        b.startProcessor('S2S_TFProcessor', BatchedGCFBProcessor, myTFProcessorSubscriptionOrder,
+            sources=[''],
+            SampleRate=InternalRate,
+            fmin=40,
+            fmax=InternalRate/2,
+            nseg=args['noofscales'],
+            samplesPerFrame=args['samplesperframe'],
+        )
+    else:
+        b.startProcessor('S2S_TFProcessor', tfprocessor.GCFBProcessor, myTFProcessorSubscriptionOrder,
+            SampleRate=InternalRate,
+            fmin=40,
+            fmax=InternalRate/2,
+            nseg=args['noofscales'],
+            samplesPerFrame=args['samplesperframe'],
+            scale='ERBScale',
+            baseOutputDir=args['outdir'],
+            globalOutputPathModifier=runtimeMetaData.outputPathModifier,
+            dTypeIn=np.complex64,
+            dTypeOut=np.complex64,
+        )
+
+    b.startProcessor('S2S_StructureExtractor',
+                      structureProcessor.structureProcessorCalibrator,
+                      SubscriptionOrder('S2S_TFProcessor','S2S_StructureExtractor','EdB','TSRep'),
+                      noofscales=args['noofscales'],
+                      cachename=cachename,
+                      SampleRate=InternalRate2)
+
+    monitor = drain.DrainMonitor(b, logger)
+    monitor.watch('S2S_StructureExtractor', 'cacheCreated', Continuity.calibrationChunk)
+    succeeded = monitor.wait(timeout=args['draintimeout'])
+    b.stopallprocessors()
+
+    if succeeded:
+        calibrationcache.recordParameters(args)
+
+    return succeeded
@@ -0,0 +1,135 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    calibrate-grid: precompute calibration caches for a grid of parameters.
+
+    Every combination of the given noofscales, samplesperframe, decimation,
+    inputrate and resampler values needs its own calibration run through a
+    full Board.
+    The combinations are calibrated in parallel, each in its own process, and
+    each writes its own cache file in the shared calibration directory.
+    Combinations which are already calibrated are skipped unless --force is
+    given.
+
+    Example:
+        calibrate-grid --noofscales 100 133 --samplesperframe 5 10 --decimation 5 --workers 4
+'''
+import argparse, itertools, logging, os, sys
+
+from soundannotatordemo.batch           import parallel
+from soundannotatordemo.calibration     import cache as calibrationcache
+from soundannotatordemo.calibration     import calibrator
+
+
+def parseGrid(argv):
+    basedir = os.path.join(os.path.expanduser('~'), '.libsoundannotator')
+
+    parser = argparse.ArgumentParser(description='Precompute structure extractor calibrations for a grid of parameters.')
+    gridgroup = parser.add_argument_group('parameter grid')
+    gridgroup.add_argument('--noofscales', type=int, nargs='+', default=[100],
+        help='Numbers of scales used in timescale analysis')
+    gridgroup.add_argument('--samplesperframe', type=int, nargs='+', default=[5],
+        help='Samples per frame left over after downsampling')
+    gridgroup.add_argument('--decimation', type=int, nargs='+', default=[5],
+        help='Integer down sampling factors')
+    gridgroup.add_argument('--inputrate', type=int, nargs='+', default=[44100],
+        help='Integer sampling rates (Hz) of the input')
+    gridgroup.add_argument('--resampler', type=str, nargs='+', default=['library'],
+        choices=['library', 'direct', 'polyphase', 'fft'],
+        help="Resampler engines, the engines of soundannotatordemo.cpsp.resampler share one cache which differs from that of 'library'")
+    gridgroup.add_argument('--batchedtf', action='store_true',
+        help='Calibrate for the cochleograms of the batched gammachirp filterbank, which have their own caches')
+
+    behaviourgroup = parser.add_argument_group('behaviour')
+    behaviourgroup.add_argument('--workers', type=int, default=parallel.defaultNoOfWorkers(),
+        help='Number of calibrations running in parallel')
+    behaviourgroup.add_argument('--force', action='store_true',
+        help='Recalibrate combinations which already have a cache')
+    behaviourgroup.add_argument('--calibrationdir', type=str, default=calibrationcache.defaultCalibrationDir(),
+        help='Directory in which the calibration caches are stored')
+    behaviourgroup.add_argument('--outdir', type=str, default=os.path.join(basedir, 'results'),
+        help='Output directory for GCFBProcessor parameters')
+    behaviourgroup.add_argument('--loglevel', type=int, default=logging.INFO,
+        help='Loglevels as supported by multiprocessing module')
+    behaviourgroup.add_argument('--logdir', type=str, default=os.path.join(basedir, 'log'),
+        help='Directory for the board log files')
+    behaviourgroup.add_argument('--draintimeout', type=float, default=600,
+        help='Maximum time in seconds to wait for a single calibration')
+
+    return parser.parse_args(argv)
+
+
+def gridArguments(namespace):
+    ''' One args dict per combination of the parameter grid. '''
+    common = dict((key, getattr(namespace, key)) for key in ['calibrationdir', 'outdir', 'loglevel', 'logdir', 'draintimeout', 'batchedtf'])
+
+    combinations = []
+    caches = set()
+    for noofscales, samplesperframe, decimation, inputrate, resampler in itertools.product(
+            namespace.noofscales, namespace.samplesperframe, namespace.decimation, namespace.inputrate, namespace.resampler):
+        args = dict(common)
+        args.update(noofscales=noofscales, samplesperframe=samplesperframe, decimation=decimation, inputrate=inputrate,
+            resampler=resampler)
+        # ... engines sharing a cache are calibrated once
+        if calibrationcache.cacheName(args) not in caches:
+            caches.add(calibrationcache.cacheName(args))
+            combinations.append(args)
+
+    return combinations
+
+
+def calibrateCombination(args):
+    # Runs in its own process, the exit code tells the parent whether the calibration succeeded.
+    if not calibrator.calibrate(args):
+        sys.exit(1)
+
+
+def run(argv=None):
+    namespace = parseGrid(sys.argv[1:] if argv is None else argv)
+
+    for directory in [namespace.calibrationdir, namespace.outdir, namespace.logdir]:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    combinations = gridArguments(namespace)
+    if namespace.force:
+        todo = combinations
+    else:
+        todo = [args for args in combinations if not calibrationcache.isCalibrated(args)]
+
+    print('Calibrating {0} of {1} combinations with {2} workers'.format(len(todo), len(combinations), namespace.workers))
+
+    exitcodes = parallel.runInParallel(calibrateCombination, [(args,) for args in todo], namespace.workers)
+
+    for args, exitcode in zip(todo, exitcodes):
+        status = 'ok' if exitcode == 0 else 'FAILED'
+        print('{0:>6} noofscales={1} samplesperframe={2} decimation={3} inputrate={4} resampler={5} batchedtf={6} -> {7}.cache'.format(
+            status, args['noofscales'], args['samplesperframe'], args['decimation'], args['inputrate'], args['resampler'],
+            args['batchedtf'], calibrationcache.cacheName(args)))
+
+    if any(exitcode != 0 for exitcode in exitcodes):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    run()
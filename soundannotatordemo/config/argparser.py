@@ -60,6 +60,22 @@ def settingsParse(parser, settings):
         type=int,
         help='Samples per frame that will be left over after downsampling',
         default=getArgument(settings, 'samplesperframe', 50))
+    signalprocessinggroup.add_argument('--chunksize',
+        type=int,
+        help='Number of samples per chunk read from the input, by default inputrate/frequency',
+        default=getArgument(settings, 'chunksize', None))
+    signalprocessinggroup.add_argument('--resampler',
+        help="Resampler engine: 'library' for the Resampler of libsoundannotator, or 'direct', 'polyphase' or 'fft', see soundannotatordemo.cpsp.resampler",
+        choices=['library', 'direct', 'polyphase', 'fft'],
+        default=getArgument(settings, 'resampler', 'library'))
+    signalprocessinggroup.add_argument('--batchedtf',
+        help='Calculate the cochleograms of several sources with one batched gammachirp filterbank, see soundannotatordemo.cpsp.batchedtf',
+        action='store_true',
+        default=getArgument(settings, 'batchedtf', False))
+    signalprocessinggroup.add_argument('--fusedstructure',
+        help='Compute the pulse and tone tracts in one structure extractor, which receives and preprocesses every cochleogram chunk once',
+        action='store_true',
+        default=getArgument(settings, 'fusedstructure', False))
     signalprocessinggroup.add_argument('--whiten', type=float,
         help='Specify whether whitenoise needs to be added and at which intensity.',
         default=None)
@@ -93,12 +109,145 @@ def settingsParse(parser, settings):
         help='Feed sinusoidal signal into system and show response.',
         action='store_true')
 
+    # ... microphone arguments
+    microphonegroup=parser.add_argument_group('microphone')
+    microphonegroup.add_argument('--microphone',
+        type=str,
+        help='Name (or part of the name) of the microphone to record from, see democode/listMicrophones.py',
+        default=getArgument(settings, 'microphone', 'default'))
+    microphonegroup.add_argument('--location',
+        type=str,
+        help='Recording location, used as source_id of the microphone',
+        default=getArgument(settings, 'location', 'undetermined_recording_location'))
+    microphonegroup.add_argument('--adaptivechunks',
+        help='Adapt the chunk size to the measured latency, see soundannotatordemo.streamboard.adaptive',
+        action='store_true',
+        default=getArgument(settings, 'adaptivechunks', False))
+    microphonegroup.add_argument('--latencytarget',
+        type=float,
+        help='Latency target in seconds for adaptive chunk sizing',
+        default=getArgument(settings, 'latencytarget', 1.0))
+    microphonegroup.add_argument('--minchunksize',
+        type=int,
+        help='Smallest chunk size in samples for adaptive chunk sizing, by default 0.05 seconds',
+        default=getArgument(settings, 'minchunksize', None))
+    microphonegroup.add_argument('--maxchunksize',
+        type=int,
+        help='Largest chunk size in samples for adaptive chunk sizing, by default 2 seconds',
+        default=getArgument(settings, 'maxchunksize', None))
+
+    # ... network arguments
+    networkgroup=parser.add_argument_group('network')
+    networkgroup.add_argument('--server',
+        type=str,
+        help='IP address and port (address:port) of the processing non-microphone machine',
+        default=getArgument(settings, 'server', None))
+    networkgroup.add_argument('--role',
+        choices=['microphone','server','fanin'],
+        help='Run the microphone or the server side of a microphone at a distance, or a server for many microphones',
+        default=getArgument(settings, 'role', None))
+    networkgroup.add_argument('--sources',
+        type=str,
+        help='Comma separated locations of the microphones a fan-in server expects, needed for --batchedtf',
+        default=getArgument(settings, 'sources', None))
+    networkgroup.add_argument('--maxsources',
+        type=int,
+        help='Maximum number of microphones a fan-in server processes',
+        default=getArgument(settings, 'maxsources', 12))
+    networkgroup.add_argument('--sendbuffer',
+        type=int,
+        help='Maximum number of bytes the microphone machine queues for sending',
+        default=getArgument(settings, 'sendbuffer', 4194304))
+    networkgroup.add_argument('--sendpolicy',
+        choices=['block','dropoldest','downsample'],
+        help='What the microphone machine gives up when its send queue is full',
+        default=getArgument(settings, 'sendpolicy', 'dropoldest'))
+    networkgroup.add_argument('--codec',
+        choices=['raw','int16','int16-lz4','int16-delta-zlib'],
+        help='Preferred codec for the sound sent by the microphone machine, the server falls back to raw if it lacks it',
+        default=getArgument(settings, 'codec', 'raw'))
+    networkgroup.add_argument('--receivebuffer',
+        type=int,
+        help='Maximum number of bytes the server queues ahead of processing',
+        default=getArgument(settings, 'receivebuffer', 16777216))
+
     # ... output arguments
     outputgroup=parser.add_argument_group('output modalities')
     outputgroup.add_argument('--outdir',
         help='Output directory for audio data',
         type=str,
-        default=os.path.join(os.path.expanduser("~"), ".libsoundannotator"))
+        default=getArgument(settings, 'outdir', os.path.join(os.path.expanduser("~"), ".libsoundannotator")))
+    outputgroup.add_argument('--runname',
+        help='Name of the results directory within outdir, by default the time the script started',
+        type=str,
+        default=getArgument(settings, 'runname', None))
+    outputgroup.add_argument('--outputformat',
+        choices=['float32','columnar'],
+        help='float32 files rolled over at maxFileSize or one columnar HDF5 file per source',
+        default=getArgument(settings, 'outputformat', 'float32'))
+    outputgroup.add_argument('--maxFileSize',
+        type=int,
+        help='Size in bytes at which float32 output files are rolled over',
+        default=getArgument(settings, 'maxFileSize', 104857600))
+    outputgroup.add_argument('--draintimeout',
+        type=float,
+        help='Maximum time in seconds to wait for the writers to flush after the last chunk',
+        default=getArgument(settings, 'draintimeout', 600))
+    outputgroup.add_argument('--calibrationdir',
+        type=str,
+        help='Directory in which the calibration caches are stored',
+        default=getArgument(settings, 'calibrationdir', None))
+
+    # ... batch processing arguments
+    batchgroup=parser.add_argument_group('batch processing')
+    batchgroup.add_argument('--noofshards',
+        type=int,
+        help='Number of independent boards processing a share of the wav-files in parallel',
+        default=getArgument(settings, 'noofshards', 1))
+    batchgroup.add_argument('--incremental',
+        help='Only process wav-files which are new or changed since the last run with the same parameters',
+        action='store_true',
+        default=getArgument(settings, 'incremental', False))
+    batchgroup.add_argument('--offline',
+        help='Read the wav-files memory-mapped in large blocks as fast as the pipeline accepts them, instead of paced like live sound',
+        action='store_true',
+        default=getArgument(settings, 'offline', False))
+    batchgroup.add_argument('--mmapwav',
+        help='Read the wav-files memory-mapped, converting the samples into a reused buffer, see soundannotatordemo.streamboard.processors.input.mmapwav',
+        action='store_true',
+        default=getArgument(settings, 'mmapwav', False))
+    batchgroup.add_argument('--offlineblock',
+        type=float,
+        help='Duration in seconds of the blocks read with --offline',
+        default=getArgument(settings, 'offlineblock', 30.0))
+    batchgroup.add_argument('--cochleogramcache',
+        help='Replay the cochleograms of wav-files processed before with the same TF parameters from a cache, and cache those of the others, see soundannotatordemo.storage.cochleogramcache',
+        action='store_true',
+        default=getArgument(settings, 'cochleogramcache', False))
+    batchgroup.add_argument('--cochleogramcachedir',
+        help='Directory of the cochleogram cache, by default ~/.libsoundannotator/cochleograms',
+        default=getArgument(settings, 'cochleogramcachedir', None))
+    batchgroup.add_argument('--cochleogramcachesize', type=float,
+        help='Size of the cochleogram cache in MB, above which the least recently used cochleograms are removed',
+        default=getArgument(settings, 'cochleogramcachesize', 10240))
+    batchgroup.add_argument('--tracts',
+        help='Tracts folder of an earlier run in the columnar output format, replayed by soundannotator-replay-ptne',
+        default=getArgument(settings, 'tracts', None))
+    batchgroup.add_argument('--sharedmemory',
+        help='Move the large chunks between the processes of the board through shared memory instead of pipes, see soundannotatordemo.streamboard.sharedmemory',
+        action='store_true',
+        default=getArgument(settings, 'sharedmemory', False))
+
+    # ... tracing arguments
+    tracinggroup=parser.add_argument_group('tracing')
+    tracinggroup.add_argument('--tracing',
+        help='Stamp chunks at every stage and export them as Chrome trace-event JSON',
+        action='store_true',
+        default=getArgument(settings, 'tracing', False))
+    tracinggroup.add_argument('--tracefile',
+        type=str,
+        help='File the trace is exported to, by default trace-<script_started>.json in logdir',
+        default=getArgument(settings, 'tracefile', None))
 
     # ... output arguments
     testgroup=parser.add_argument_group('Test and developement options')
@@ -123,6 +272,19 @@ def settingsParse(parser, settings):
     ptnprocessorgroup.add_argument('--ptnreferencevalue', type=float,
         help='The ptnreference value is substracted from the rangecompressed E before publication.',
         default=getArgument(settings, 'ptnreferencevalue', None) )
+    ptnprocessorgroup.add_argument('--ptneengine',
+        help="PTNE engine: 'library' for the PartialPTN_Processor of libsoundannotator, or 'loop' or 'vectorized', see soundannotatordemo.cpsp.ptne",
+        choices=['library', 'loop', 'vectorized'],
+        default=getArgument(settings, 'ptneengine', 'library'))
+    ptnprocessorgroup.add_argument('--ptneconfigs',
+        help="PTNE configurations computed in one pass from the same cochleogram, separated by ';', each as name:blockwidth or name:blockwidth:split, e.g. 'fine:0.01;coarse:1.0:[5,50,95]'. Each is written to ptne-<name>, by default the single configuration of --ptnblockwidth and --ptnsplit is written to ptne",
+        default=getArgument(settings, 'ptneconfigs', None))
+    ptnprocessorgroup.add_argument('--ptnepyramid', type=int,
+        help="Number of coarser PTNE levels built incrementally from the published blocks, written next to ptne as ptne-x<factor>, ptne-x<factor^2>, ...",
+        default=getArgument(settings, 'ptnepyramid', 0))
+    ptnprocessorgroup.add_argument('--ptnepyramidfactor', type=int,
+        help='Ratio between the blockwidths of successive levels of the PTNE pyramid',
+        default=getArgument(settings, 'ptnepyramidfactor', 10))
 
 '''
     This function is called as the default hook callback after argparse has parsed the settings.
@@ -141,6 +303,14 @@ def defaultInternalArgs(namespace):
     ChunkSize at an InputRate of 48000 would be 24000
     """
     namespace.ChunkSize = namespace.inputrate / namespace.frequency
+    if namespace.chunksize is None:
+        namespace.chunksize = namespace.ChunkSize
+
+    # The network address is given as address:port
+    if namespace.server is not None:
+        ip, port = namespace.server.split(':')
+        setattr(namespace, 'network-connection-ip', ip)
+        setattr(namespace, 'network-connection-port', int(port))
 
     return namespace
 
@@ -267,3 +437,23 @@ def getArguments(commandlinestring, pypath=None, afterParseHook=defaultInternalA
     exact location of the module'''
 def abspathFromMethod(method):
     return os.path.abspath(inspect.getsourcefile(method))
+
+
+''' Return the parsed arguments as the flat args dict used by the use cases.
+    Values given on the command line take precedence over the settings file,
+    script_started is taken over from the metadata and runname and tracefile
+    default to names derived from it.
+'''
+def getArgumentDict(commandlinestring, pypath=None, afterParseHook=defaultInternalArgs):
+    namespace = getArguments(commandlinestring, pypath=pypath, afterParseHook=afterParseHook)
+
+    args = dict(vars(namespace))
+    metadata = args.pop('metadata')
+    args['script_started'] = metadata['script_started']
+
+    if args['runname'] is None:
+        args['runname'] = 'incremental' if args['incremental'] else args['script_started']
+    if args['tracefile'] is None:
+        args['tracefile'] = os.path.join(args['logdir'], 'trace-{0}.json'.format(args['script_started']))
+
+    return args
@@ -0,0 +1,49 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Fingerprints identifying parameter sets and file contents, used to key
+    caches and manifests on everything their content depends on.
+'''
+import hashlib, json
+
+
+def parameterFingerprint(args, keys, length=16):
+    '''
+        Hex digest over the values of the given keys in args. The digest only
+        changes if one of these values changes, other entries in args are
+        ignored.
+    '''
+    selection = dict((key, args[key]) for key in keys)
+    description = json.dumps(selection, sort_keys=True)
+    return hashlib.sha1(description.encode('utf-8')).hexdigest()[:length]
+
+
+def fileFingerprint(filename, blocksize=1 << 20):
+    ''' Hex digest over the content of a file, read in blocks of blocksize bytes. '''
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        block = f.read(blocksize)
+        while len(block) > 0:
+            digest.update(block)
+            block = f.read(blocksize)
+    return digest.hexdigest()
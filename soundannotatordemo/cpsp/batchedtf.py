@@ -0,0 +1,83 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Time-frequency processor filtering the sound of several sources at once.
+'''
+import numpy as np
+
+from libsoundannotator.streamboard                                  import processor
+from libsoundannotator.streamboard.continuity                       import Continuity
+
+from soundannotatordemo.cpsp.gammachirp                             import BatchedGammachirpFilterbank
+
+
+class BatchedGCFBProcessor(processor.Processor):
+    '''
+        Gammachirp filterbank for several sources with the same sample rate
+        and filterbank parameters. Source i is received under the key
+        'timeseries'+sources[i] and its cochleogram is published under
+        'E'+sources[i] and 'EdB'+sources[i]. Sources whose chunks have the
+        same length are filtered as one batch, see gammachirp.
+
+        The source_id of every source stays attached to its chunks, so
+        processors downstream find it under their own source processor.
+
+            sources:            key suffixes of the sources, [''] for a single
+                                source with the keys of GCFBProcessor
+            SampleRate:         sample rate of the incoming signals
+            fmin, fmax:         range of the centre frequencies, fmax defaults to SampleRate/2
+            nseg:               number of filters
+            samplesPerFrame:    decimation of the cochleogram
+    '''
+    def __init__(self, *args, **kwargs):
+        super(BatchedGCFBProcessor, self).__init__(*args, **kwargs)
+        self.requiredParameters('sources', 'SampleRate', 'nseg', 'samplesPerFrame')
+        self.requiredParametersWithDefault(fmin=40, fmax=None)
+
+    def prerun(self):
+        super(BatchedGCFBProcessor, self).prerun()
+        fmax = self.config['fmax'] or self.config['SampleRate'] / 2
+        self.filterbank = BatchedGammachirpFilterbank(self.config['SampleRate'], self.config['fmin'], fmax,
+            self.config['nseg'], self.config['samplesPerFrame'], noofsources=len(self.config['sources']))
+
+    def processData(self, smartChunk):
+        batches = dict()
+        for index, suffix in enumerate(self.config['sources']):
+            chunk = smartChunk.received.get('timeseries' + suffix)
+            if chunk is None:
+                continue
+            if chunk.continuity in (Continuity.newfile, Continuity.discontinuous):
+                self.filterbank.reset([index])
+            data = np.ravel(chunk.data)
+            batches.setdefault(len(data), []).append((index, suffix, data))
+
+        result = dict()
+        for batch in batches.values():
+            amplitudes = self.filterbank.process(np.vstack([data for index, suffix, data in batch]),
+                [index for index, suffix, data in batch])
+            for (index, suffix, data), amplitude in zip(batch, amplitudes):
+                E = (amplitude.real ** 2 + amplitude.imag ** 2).astype(np.float32)
+                result['E' + suffix] = E
+                result['EdB' + suffix] = 10 * np.log10(E + np.finfo(np.float32).tiny)
+
+        return result
@@ -0,0 +1,76 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Resampler processor with a selectable engine, see resampler.
+'''
+import numpy as np
+
+from libsoundannotator.streamboard                                  import processor
+from libsoundannotator.streamboard.continuity                       import Continuity
+from libsoundannotator.cpsp                                         import oafilterbank_numpy as oafilterbank
+
+from soundannotatordemo.cpsp.resampler                              import getEngine
+
+
+class FastResampler(processor.Processor):
+    '''
+        Replacement of oafilterbank.Resampler with the same parameters and
+        keys, receiving 'timeseries' and publishing the decimated
+        'timeseries'. Its filter is resampler.kaiserLowpass, not that of the
+        library, see resampler.
+
+            SampleRate:         sample rate of the incoming sound
+            FilterLength:       length of the lowpass filter
+            DecimateFactor:     decimation factor
+            KaiserBeta:         Kaiser window beta
+            dTypeIn, dTypeOut:  numerical format of incoming and outgoing samples
+            engine:             'direct', 'polyphase' or 'fft'
+    '''
+    def __init__(self, *args, **kwargs):
+        super(FastResampler, self).__init__(*args, **kwargs)
+        self.requiredParameters('SampleRate', 'FilterLength', 'DecimateFactor')
+        self.requiredParametersWithDefault(KaiserBeta=5, dTypeIn=np.complex64, dTypeOut=np.complex64, engine='fft')
+
+    def prerun(self):
+        super(FastResampler, self).prerun()
+        self.engine = getEngine(self.config['engine'], self.config['FilterLength'], self.config['DecimateFactor'],
+            self.config['KaiserBeta'], self.config['dTypeOut'])
+
+    def processData(self, smartChunk):
+        chunk = smartChunk.received['timeseries']
+        if chunk.continuity in (Continuity.newfile, Continuity.discontinuous):
+            self.engine.reset()
+        samples = np.asarray(chunk.data, dtype=self.config['dTypeIn']).ravel()
+        return {'timeseries': self.engine.process(samples)}
+
+
+def resamplerFor(args):
+    '''
+        The Resampler class for args['resampler'] and the parameters it needs
+        besides those of oafilterbank.Resampler: 'library' selects the
+        Resampler of libsoundannotator, the others an engine of FastResampler.
+    '''
+    engine = args.get('resampler') or 'library'
+    if engine == 'library':
+        return oafilterbank.Resampler, dict()
+    return FastResampler, dict(engine=engine)
@@ -0,0 +1,212 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Gammachirp filterbank for a batch of signals.
+
+    The filters are complex gammachirps
+        g(t) = t^(order-1) exp(-2 pi b ERB(f) t) exp(i (2 pi f t + c ln t))
+    whose peak frequencies are equally spaced on the ERB-rate scale between
+    fmin and fmax, each normalized to a peak gain of one. The K signals of a
+    batch are stacked into a K x N array and filtered by all nseg filters
+    with overlap-save: blocks of hop new samples, preceded by the last
+    length-1 samples, are transformed with an FFT of fixed size nfft, so the
+    spectra of the filters are computed once and a step never holds more
+    than K x nseg x nfft values, whatever the chunk size. The complex
+    amplitudes are kept every samplesPerFrame samples.
+
+    The filterbank keeps per source the tail of its signal and its position,
+    so successive chunks of a source are filtered as one continuous signal.
+    Filtering a source in a batch or on its own, in any chunks, agrees with
+    the convolution of the whole signal within tolerance, see
+    checkEquivalence. Against GCFBProcessor of libsoundannotator the
+    cochleograms are compared per source, on a board, by
+    benchmark.batchedtf --reference within referenceTolerance.
+'''
+import time
+
+import numpy as np
+
+
+# Maximum difference of the complex amplitudes from the convolution of the
+# whole signal, relative to the largest amplitude of the filter
+tolerance = 1e-4
+
+# Maximum difference in dB from the E of GCFBProcessor of libsoundannotator,
+# over the cells within dynamicRange dB of the largest E of their scale
+referenceTolerance = 1.0
+dynamicRange = 60.0
+
+
+def erbRate(f):
+    return 21.4 * np.log10(1 + 0.00437 * np.asarray(f, dtype=np.float64))
+
+def erbRateToFrequency(e):
+    return (10 ** (np.asarray(e, dtype=np.float64) / 21.4) - 1) / 0.00437
+
+def erbBandwidth(f):
+    return 24.7 + 0.108 * np.asarray(f, dtype=np.float64)
+
+def erbSpacedFrequencies(fmin, fmax, nseg):
+    return erbRateToFrequency(np.linspace(erbRate(fmin), erbRate(fmax), nseg))
+
+def nextPowerOfTwo(n):
+    return 1 << int(np.ceil(np.log2(max(n, 1))))
+
+def gammachirpKernels(SampleRate, frequencies, order=4, b=1.81, c=-2.96, decay=18.0):
+    '''
+        Impulse responses (nseg x length) of the gammachirp filters peaking
+        at the given frequencies, truncated where the envelope of the widest
+        filter has decayed to about 1e-4 of its peak.
+    '''
+    bandwidths = b * erbBandwidth(frequencies)
+    # The chirp moves the peak of the response c*bandwidth/order away from the carrier
+    carriers = np.asarray(frequencies, dtype=np.float64) - c * bandwidths / order
+    length = int(np.ceil(decay / (2 * np.pi * bandwidths.min()) * SampleRate))
+    t = np.arange(1, length + 1) / float(SampleRate)
+
+    f = carriers[:, np.newaxis]
+    bw = bandwidths[:, np.newaxis]
+    kernels = t ** (order - 1) * np.exp(-2 * np.pi * bw * t) * np.exp(1j * (2 * np.pi * f * t + c * np.log(t)))
+
+    gains = np.abs(np.fft.fft(kernels, nextPowerOfTwo(4 * length), axis=1)).max(axis=1)
+    return (kernels / gains[:, np.newaxis]).astype(np.complex64)
+
+
+class BatchedGammachirpFilterbank(object):
+    '''
+        SampleRate:         sample rate of the signals
+        fmin, fmax:         range of the centre frequencies
+        nseg:               number of filters
+        samplesPerFrame:    decimation of the complex amplitudes
+        noofsources:        number of sources the filterbank keeps state for
+        nfft:               FFT size of an overlap-save step, by default the
+                            power of two of at least four filter lengths
+    '''
+    def __init__(self, SampleRate, fmin, fmax, nseg, samplesPerFrame, noofsources=1, nfft=None):
+        self.samplesPerFrame = samplesPerFrame
+        self.frequencies = erbSpacedFrequencies(fmin, fmax, nseg)
+        self.kernels = gammachirpKernels(SampleRate, self.frequencies)
+        self.overlap = self.kernels.shape[1] - 1
+        self.nfft = nextPowerOfTwo(4 * self.kernels.shape[1]) if nfft is None else int(nfft)
+        if self.nfft <= self.overlap:
+            raise ValueError('nfft {0} should exceed the filter length {1}'.format(self.nfft, self.kernels.shape[1]))
+        # ... new samples per overlap-save step
+        self.hop = self.nfft - self.overlap
+        self.spectra = np.fft.fft(self.kernels, self.nfft, axis=1).astype(np.complex64)
+
+        self.tails = np.zeros((noofsources, self.overlap), dtype=np.complex64)
+        self.positions = np.zeros(noofsources, dtype=np.int64)
+
+    def reset(self, sources):
+        ''' Start the given sources anew, e.g. at the start of a new file. '''
+        self.tails[sources] = 0
+        self.positions[sources] = 0
+
+    def process(self, signals, sources=None):
+        '''
+            Filter a K x N array holding the next N samples of the given K
+            sources (by default sources 0..K-1). Returns per source the
+            nseg x M array of decimated complex amplitudes.
+        '''
+        signals = np.atleast_2d(signals)
+        sources = np.arange(signals.shape[0]) if sources is None else np.asarray(sources)
+        N = signals.shape[1]
+
+        extended = np.concatenate([self.tails[sources], signals.astype(np.complex64)], axis=1)
+        # Keep the samples at multiples of samplesPerFrame counted from the start of every source
+        offsets = (-self.positions[sources]) % self.samplesPerFrame
+        amplitudes = [[np.zeros((len(self.frequencies), 0), dtype=np.complex64)] for source in sources]
+        for start in range(0, N, self.hop):
+            stop = min(start + self.hop, N)
+            spectrum = np.fft.fft(extended[:, start:stop + self.overlap], self.nfft, axis=1)
+            filtered = np.fft.ifft(spectrum[:, np.newaxis, :] * self.spectra[np.newaxis, :, :], axis=2)
+            for k, offset in enumerate(offsets):
+                first = self.overlap + (offset - start) % self.samplesPerFrame
+                amplitudes[k].append(filtered[k, :, first:self.overlap + stop - start:self.samplesPerFrame].astype(np.complex64))
+
+        if self.overlap > 0:
+            self.tails[sources] = extended[:, -self.overlap:]
+        self.positions[sources] += N
+        return [np.concatenate(amplitude, axis=1) for amplitude in amplitudes]
+
+
+def filterChunks(filterbank, signals, chunksize):
+    ''' Decimated amplitudes per source of the K x N signals filtered as one batch in chunks of chunksize samples. '''
+    filterbank.reset(np.arange(signals.shape[0]))
+    outputs = [filterbank.process(signals[:, start:start + chunksize]) for start in range(0, signals.shape[1], chunksize)]
+    return [np.concatenate([output[k] for output in outputs], axis=1) for k in range(signals.shape[0])]
+
+
+def convolve(kernels, signal, samplesPerFrame):
+    ''' Decimated amplitudes of the whole signal convolved with every kernel at once, the reference. '''
+    nfft = nextPowerOfTwo(len(signal) + kernels.shape[1] - 1)
+    filtered = np.fft.ifft(np.fft.fft(signal, nfft)[np.newaxis, :] * np.fft.fft(kernels, nfft, axis=1), axis=1)
+    return filtered[:, :len(signal):samplesPerFrame]
+
+
+def checkEquivalence(signals, chunksize, SampleRate, fmin, fmax, nseg, samplesPerFrame, nfft=None):
+    '''
+        Raises AssertionError when a source of the K x N signals, filtered
+        as a batch in chunks of chunksize samples, deviates more than
+        tolerance from its whole signal convolved on its own. Returns the
+        largest deviation.
+    '''
+    filterbank = BatchedGammachirpFilterbank(SampleRate, fmin, fmax, nseg, samplesPerFrame, signals.shape[0], nfft)
+    largest = 0.0
+    for k, output in enumerate(filterChunks(filterbank, signals, chunksize)):
+        expected = convolve(filterbank.kernels.astype(np.complex128), signals[k].astype(np.complex128), samplesPerFrame)
+        if output.shape != expected.shape:
+            raise AssertionError('Source {0} has {1} frames, expected {2}'.format(k, output.shape[-1], expected.shape[-1]))
+        # ... relative to the largest amplitude of every filter, the filters differ in gain by orders of magnitude
+        scales = np.maximum(np.max(np.abs(expected), axis=1, keepdims=True), np.finfo(np.float32).tiny)
+        largest = max(largest, float(np.max(np.abs(output - expected) / scales)))
+    if not largest <= tolerance:
+        raise AssertionError('Batched filterbank deviates {0:.2e} from the convolution per source, tolerance is {1:.0e}'.format(
+            largest, tolerance))
+    return largest
+
+
+def deviationdB(E, expected):
+    '''
+        Maximum difference in dB between the E (nseg x frames) of a source
+        and the expected E, over the cells within dynamicRange dB of the
+        largest expected E of their scale. Raises AssertionError on a
+        different shape.
+    '''
+    if np.shape(E) != np.shape(expected):
+        raise AssertionError('E has shape {0}, expected {1}'.format(np.shape(E), np.shape(expected)))
+    tiny = np.finfo(np.float32).tiny
+    EdB = 10 * np.log10(np.asarray(E, dtype=np.float64) + tiny)
+    expecteddB = 10 * np.log10(np.asarray(expected, dtype=np.float64) + tiny)
+    cells = expecteddB >= np.max(expecteddB, axis=1, keepdims=True) - dynamicRange
+    return float(np.max(np.abs(EdB - expecteddB)[cells])) if np.any(cells) else 0.0
+
+
+def timeFilterbank(filterbank, signals, chunksize, repeats=3):
+    ''' Best time over repeats of filtering the signals as one batch in chunks of chunksize samples. '''
+    best = float('inf')
+    for repeat in range(repeats):
+        started = time.time()
+        filterChunks(filterbank, signals, chunksize)
+        best = min(best, time.time() - started)
+    return best
@@ -0,0 +1,391 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    PTNE block reduction engines for the features of
+    PTN_Processor.PartialPTN_Processor of libsoundannotator.
+
+    PTNE summarizes the cochleogram in blocks of blockwidth seconds and the
+    frequency bands between successive scales in split. Per band and block,
+    the mean over all its cells of
+
+        pulse:      E in the cells of a pulse tract (f_tract > 0), 0 elsewhere
+        tone:       E in the cells of a tone tract (s_tract > 0), 0 elsewhere
+        noise:      E in the cells of neither, 0 elsewhere
+        energy:     E
+
+    range compressed to dB, minus ptnreferencevalue if given. A mean of 0
+    is published as floordB.
+
+    Blocks start at frame round(k*blockwidth*SampleRate) after the last reset,
+    so blocks of a non integer number of frames alternate in length and the
+    output does not depend on the chunk boundaries. The engines:
+
+        loop:       per band and block the sums of slices of E; the reference
+        vectorized: the masked E of all features are stacked once per chunk
+                    into preallocated buffers and reduced over bands, with
+                    band indices computed once, and over blocks with
+                    np.add.reduceat; the sums of a partial block at the end
+                    of a chunk are carried over to the next chunk in a
+                    preallocated buffer
+
+    Both are streaming and agree within tolerance. checkEquivalence compares
+    them, 'python -m soundannotatordemo.benchmark.ptne --reference' compares
+    them on a board with PartialPTN_Processor within referenceTolerance.
+
+    A BlockAggregator combines every factor successive blocks into one block
+    of a coarser level, so a pyramid of block widths is built incrementally
+    from the published features instead of from the cochleogram. The band
+    means of the blocks are averaged weighted by their number of frames,
+    which gives the band means of the coarse block, so a level equals the
+    engines run at its block width. The reference value cancels.
+'''
+import time
+
+import numpy as np
+
+
+# Maximum absolute difference between the engines, and the pyramid and the engines, in dB
+tolerance = 1e-4
+
+# Maximum absolute difference with PartialPTN_Processor in dB, its float32 sums run in another order
+referenceTolerance = 1e-3
+
+featureNames = ['pulse', 'tone', 'noise', 'energy']
+
+# Band means below floor are published as floordB
+floor = 1e-30
+floordB = -300.0
+
+
+def bandBoundaries(split, noofscales):
+    ''' The scales in split as a sorted integer array, checked against noofscales. '''
+    boundaries = np.asarray(sorted(split), dtype=np.intp)
+    if len(boundaries) < 2 or boundaries[0] < 0 or boundaries[-1] > noofscales or np.any(np.diff(boundaries) == 0):
+        raise ValueError('split {0} does not define bands within {1} scales'.format(list(split), noofscales))
+    return boundaries
+
+
+def rangeCompress(means, ptnreferencevalue):
+    ''' Band means in dB, minus ptnreferencevalue if not None. '''
+    values = 10 * np.log10(np.maximum(means, floor))
+    if ptnreferencevalue is not None:
+        values -= ptnreferencevalue
+    return values
+
+
+def blockStarts(first, last, framesPerBlock):
+    ''' Start frames of the blocks first up to and including last. '''
+    return np.floor(np.arange(first, last + 1) * framesPerBlock + 0.5).astype(np.intp)
+
+
+class LoopReducer(object):
+    '''
+        noofscales:         number of scales of the incoming cochleogram
+        split:              scales dividing the cochleogram into bands
+        framesPerBlock:     blockwidth*SampleRate, need not be integer
+        featurenames:       subset of featureNames to publish
+        ptnreferencevalue:  subtracted from the features, if not None
+    '''
+    def __init__(self, noofscales, split, framesPerBlock, featurenames=featureNames, ptnreferencevalue=None):
+        self.boundaries = bandBoundaries(split, noofscales)
+        self.noofbands = len(self.boundaries) - 1
+        self.framesPerBlock = float(framesPerBlock)
+        if self.framesPerBlock < 1:
+            raise ValueError('A block should span at least one frame, not {0}'.format(framesPerBlock))
+        unknown = set(featurenames) - set(featureNames)
+        if unknown:
+            raise ValueError('Unknown PTNE features {0}'.format(sorted(unknown)))
+        self.featurenames = list(featurenames)
+        self.ptnreferencevalue = ptnreferencevalue
+        # ... sums of the features in featureNames order of the partial block
+        self.carry = np.zeros((len(featureNames), self.noofbands), dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        ''' Forget the partial block, the next frame starts block 0. '''
+        self.frame = 0
+        self.block = 0
+        self.carry[...] = 0
+
+    def blockStart(self, block):
+        return int(np.floor(block * self.framesPerBlock + 0.5))
+
+    def process(self, E, f_tract, s_tract):
+        ''' Features of the blocks completed by this chunk, arrays (bands x blocks). '''
+        E = np.asarray(E, dtype=np.float64)
+        pulse = np.asarray(f_tract) > 0
+        tone = np.asarray(s_tract) > 0
+        noise = ~(pulse | tone)
+        noofframes = E.shape[-1]
+        sums = []
+        frame = 0
+        while self.blockStart(self.block + 1) - self.frame <= noofframes - frame:
+            stop = frame + self.blockStart(self.block + 1) - self.frame
+            sums.append(self.carry + self.sum(E, (pulse, tone, noise), frame, stop))
+            self.carry[...] = 0
+            self.frame += stop - frame
+            self.block += 1
+            frame = stop
+        self.carry += self.sum(E, (pulse, tone, noise), frame, noofframes)
+        self.frame += noofframes - frame
+
+        blocks = [self.blockStart(block + 1) - self.blockStart(block) for block in range(self.block - len(sums), self.block)]
+        sums = np.zeros((len(featureNames), self.noofbands, 0)) if len(sums) == 0 else np.stack(sums, axis=-1)
+        return self.features(sums, np.asarray(blocks, dtype=np.float64))
+
+    def sum(self, E, masks, start, stop):
+        sums = np.zeros((len(featureNames), self.noofbands), dtype=np.float64)
+        for band in range(self.noofbands):
+            rows = slice(self.boundaries[band], self.boundaries[band + 1])
+            cells = E[rows, start:stop]
+            for feature, mask in enumerate(masks):
+                sums[feature, band] = np.sum(cells[mask[rows, start:stop]])
+            sums[-1, band] = np.sum(cells)
+        return sums
+
+    def features(self, sums, blockLengths):
+        ''' Features from the per band and block sums, in featureNames order. '''
+        cells = np.diff(self.boundaries)[:, np.newaxis] * blockLengths[np.newaxis, :]
+        values = rangeCompress(sums / np.maximum(cells, 1), self.ptnreferencevalue)
+        return dict((name, values[featureNames.index(name)].astype(np.float32)) for name in self.featurenames)
+
+
+class VectorizedReducer(LoopReducer):
+    def __init__(self, *args, **kwargs):
+        super(VectorizedReducer, self).__init__(*args, **kwargs)
+        # ... band segments relative to the first row of the first band
+        self.rows = slice(self.boundaries[0], self.boundaries[-1])
+        self.bandStarts = self.boundaries[:-1] - self.boundaries[0]
+        self.carry = np.zeros((len(featureNames), self.noofbands, 1), dtype=np.float64)
+        self.allocate(0)
+
+    def allocate(self, noofframes):
+        ''' Buffers for chunks of up to noofframes frames. '''
+        noofrows = self.boundaries[-1] - self.boundaries[0]
+        self.stacked = np.empty((len(featureNames), noofrows, noofframes), dtype=np.float64)
+        self.masks = np.empty((3, noofrows, noofframes), dtype=bool)
+
+    def process(self, E, f_tract, s_tract):
+        E = np.asarray(E)
+        noofframes = E.shape[-1]
+        if self.stacked.shape[-1] < noofframes:
+            self.allocate(noofframes)
+        stacked = self.stacked[..., :noofframes]
+        pulse, tone, noise = self.masks[..., :noofframes]
+
+        # Masked E of the cells in the bands, in featureNames order
+        E = E[self.rows]
+        np.greater(np.asarray(f_tract)[self.rows], 0, out=pulse)
+        np.greater(np.asarray(s_tract)[self.rows], 0, out=tone)
+        np.logical_or(pulse, tone, out=noise)
+        np.logical_not(noise, out=noise)
+        stacked[-1] = E
+        for feature, mask in enumerate((pulse, tone, noise)):
+            np.multiply(stacked[-1], mask, out=stacked[feature])
+
+        # Block starts within this chunk, the frames after the last one are carried over
+        first = self.block + 1
+        last = int((self.frame + noofframes) / self.framesPerBlock) + 1
+        starts = blockStarts(first, last, self.framesPerBlock)
+        starts = starts[starts - self.frame <= noofframes] - self.frame
+        noofblocks = len(starts)
+
+        bandSums = np.add.reduceat(stacked, self.bandStarts, axis=1)
+        if noofblocks == 0:
+            self.carry += np.sum(bandSums, axis=-1, keepdims=True)
+            self.frame += noofframes
+            return self.features(np.zeros((len(featureNames), self.noofbands, 0)), np.zeros(0))
+
+        # ... segments [0, starts[0]), [starts[0], starts[1]), ..., [starts[-1], noofframes)
+        segments = np.concatenate(([0], starts[:-1]))
+        if starts[-1] < noofframes:
+            segments = np.concatenate((segments, starts[-1:]))
+        sums = np.add.reduceat(bandSums, segments, axis=-1)
+        sums[..., :1] += self.carry
+        if starts[-1] < noofframes:
+            self.carry[...] = sums[..., -1:]
+            sums = sums[..., :-1]
+        else:
+            self.carry[...] = 0
+
+        blockLengths = np.diff(blockStarts(self.block, self.block + noofblocks, self.framesPerBlock)).astype(np.float64)
+        self.block += noofblocks
+        self.frame += noofframes
+        return self.features(sums, blockLengths)
+
+
+class BlockAggregator(object):
+    '''
+        factor:             number of blocks combined into one
+        framesPerBlock:     blockwidth*SampleRate of the incoming blocks
+        featurenames:       features to publish, all four are needed as input
+    '''
+    def __init__(self, factor, framesPerBlock, featurenames=featureNames):
+        if factor < 2:
+            raise ValueError('A coarser level combines at least two blocks, not {0}'.format(factor))
+        self.factor = int(factor)
+        self.framesPerBlock = float(framesPerBlock)
+        self.featurenames = list(featurenames)
+        # ... allocated with the first blocks, when the number of bands is known
+        self.carry = None
+        self.reset()
+
+    def reset(self):
+        ''' Forget the blocks of the partial coarse block. '''
+        self.block = 0
+        self.carriedFrames = 0.0
+        if self.carry is not None:
+            self.carry[...] = 0
+
+    def process(self, pulse, tone, noise, energy):
+        ''' Features of the coarse blocks completed by these blocks, arrays (bands x blocks). '''
+        values = np.stack([pulse, tone, noise, energy]).astype(np.float64)
+        noofblocks = values.shape[-1]
+        if self.carry is None:
+            self.carry = np.zeros(values.shape[:2] + (1,), dtype=np.float64)
+        if noofblocks == 0:
+            return self.features(np.zeros(values.shape[:2] + (0,)), np.zeros(0))
+
+        # Band means weighted by the frames of their block, relative to the reference value which cancels
+        frames = np.diff(blockStarts(self.block, self.block + noofblocks, self.framesPerBlock)).astype(np.float64)
+        weighted = np.power(10.0, values / 10) * frames
+
+        # ... segments starting at the incoming blocks which start a coarse block, the first continues the carry
+        segments = np.arange((-self.block) % self.factor, noofblocks, self.factor)
+        if len(segments) == 0 or segments[0] != 0:
+            segments = np.concatenate(([0], segments))
+        sums = np.add.reduceat(weighted, segments, axis=-1)
+        sumFrames = np.add.reduceat(frames, segments)
+        sums[..., :1] += self.carry
+        sumFrames[:1] += self.carriedFrames
+
+        self.block += noofblocks
+        if self.block % self.factor != 0:
+            self.carry[...] = sums[..., -1:]
+            self.carriedFrames = sumFrames[-1]
+            sums, sumFrames = sums[..., :-1], sumFrames[:-1]
+        else:
+            self.carry[...] = 0
+            self.carriedFrames = 0.0
+        return self.features(sums, sumFrames)
+
+    def features(self, sums, frames):
+        values = rangeCompress(sums / np.maximum(frames, 1), None)
+        return dict((name, values[featureNames.index(name)].astype(np.float32)) for name in self.featurenames)
+
+
+engines = {
+    'loop':       LoopReducer,
+    'vectorized': VectorizedReducer,
+}
+
+
+def getEngine(name, noofscales, split, framesPerBlock, featurenames=featureNames, ptnreferencevalue=None):
+    if name not in engines:
+        raise ValueError('Unknown PTNE engine {0}, choose from {1}'.format(name, sorted(engines)))
+    return engines[name](noofscales, split, framesPerBlock, featurenames, ptnreferencevalue)
+
+
+def testInput(noofscales, noofframes, seed=0):
+    ''' Random E with pulse and tone tracts covering about a third of the cells each. '''
+    random = np.random.RandomState(seed)
+    E = random.gamma(1.0, size=(noofscales, noofframes)).astype(np.float32)
+    f_tract = (random.rand(noofscales, noofframes) < 0.3).astype(np.int32)
+    s_tract = (random.rand(noofscales, noofframes) < 0.3).astype(np.int32)
+    return E, f_tract, s_tract
+
+
+def reduce(engine, E, f_tract, s_tract, chunkframes):
+    ''' Features of engine for the input fed in chunks of chunkframes frames. '''
+    engine.reset()
+    outputs = [engine.process(E[:, start:start + chunkframes], f_tract[:, start:start + chunkframes], s_tract[:, start:start + chunkframes])
+        for start in range(0, E.shape[-1], chunkframes)]
+    return dict((name, np.concatenate([output[name] for output in outputs], axis=-1)) for name in engine.featurenames)
+
+
+def aggregate(aggregator, features, chunkblocks):
+    ''' Features of aggregator for the features fed in chunks of chunkblocks blocks. '''
+    aggregator.reset()
+    noofblocks = features[featureNames[0]].shape[-1]
+    outputs = [aggregator.process(*[features[name][:, start:start + chunkblocks] for name in featureNames])
+        for start in range(0, max(noofblocks, 1), chunkblocks)]
+    return dict((name, np.concatenate([output[name] for output in outputs], axis=-1)) for name in aggregator.featurenames)
+
+
+def deviation(output, expected, names=featureNames):
+    '''
+        Maximum absolute difference of the features in dB, values at or
+        below floordB count as floordB. Raises AssertionError on a different
+        number of blocks.
+    '''
+    largest = 0.0
+    for name in names:
+        if np.shape(output[name]) != np.shape(expected[name]):
+            raise AssertionError('{0} has {1} blocks, expected {2}'.format(name, np.shape(output[name]), np.shape(expected[name])))
+        if np.size(output[name]) > 0:
+            difference = np.maximum(np.asarray(output[name], dtype=np.float64), floordB) - np.maximum(np.asarray(expected[name], dtype=np.float64), floordB)
+            largest = max(largest, float(np.max(np.abs(difference))))
+    return largest
+
+
+def checkEquivalence(name, E, f_tract, s_tract, chunkframes, split, framesPerBlock):
+    '''
+        Raises AssertionError when engine name, fed in chunks, deviates more
+        than tolerance from the loop engine fed the whole input at once.
+    '''
+    noofscales = E.shape[0]
+    output = reduce(getEngine(name, noofscales, split, framesPerBlock), E, f_tract, s_tract, chunkframes)
+    expected = reduce(getEngine('loop', noofscales, split, framesPerBlock), E, f_tract, s_tract, E.shape[-1])
+    largest = deviation(output, expected)
+    if not largest <= tolerance:
+        raise AssertionError('PTNE engine {0} deviates {1:.2e} dB from the loop engine, tolerance is {2:.0e}'.format(
+            name, largest, tolerance))
+    return largest
+
+
+def checkPyramid(E, f_tract, s_tract, chunkframes, split, framesPerBlock, factor, ptnreferencevalue=None):
+    '''
+        Raises AssertionError when a level built by a BlockAggregator from
+        the blocks of the vectorized engine deviates more than tolerance from
+        the vectorized engine run at the block width of the level.
+    '''
+    noofscales = E.shape[0]
+    fine = reduce(getEngine('vectorized', noofscales, split, framesPerBlock, ptnreferencevalue=ptnreferencevalue), E, f_tract, s_tract, chunkframes)
+    chunkblocks = max(1, int(chunkframes / framesPerBlock))
+    output = aggregate(BlockAggregator(factor, framesPerBlock), fine, chunkblocks)
+    expected = reduce(getEngine('vectorized', noofscales, split, framesPerBlock * factor, ptnreferencevalue=ptnreferencevalue), E, f_tract, s_tract, chunkframes)
+    largest = deviation(output, expected)
+    if not largest <= tolerance:
+        raise AssertionError('PTNE pyramid level deviates {0:.2e} dB from the engine at its block width, tolerance is {1:.0e}'.format(
+            largest, tolerance))
+    return largest
+
+
+def timeEngine(engine, E, f_tract, s_tract, chunkframes, repeats=3):
+    ''' Best time over repeats of reducing the input in chunks of chunkframes frames. '''
+    best = float('inf')
+    for repeat in range(repeats):
+        started = time.time()
+        reduce(engine, E, f_tract, s_tract, chunkframes)
+        best = min(best, time.time() - started)
+    return best
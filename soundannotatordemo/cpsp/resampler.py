@@ -0,0 +1,201 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Decimating FIR resampler engines.
+
+    The Resampler of the use cases low-pass filters the sound with a Kaiser
+    windowed sinc of FilterLength taps and keeps every DecimateFactor-th
+    sample. Filtering every input sample and discarding most of the results
+    costs FilterLength multiplications per input sample. The engines below
+    compute the same output:
+
+        direct:     full rate convolution, then keep every DecimateFactor-th
+                    sample; the reference
+        polyphase:  the filter is split in DecimateFactor subfilters running on
+                    the decimated branches of the input, only the retained
+                    output samples are computed
+        fft:        overlap-save FFT convolution, then keep every
+                    DecimateFactor-th sample
+
+    All engines are streaming: they keep the last taps-1 input samples and the
+    phase of the next retained sample between chunks, so the output does not
+    depend on the chunk boundaries. Engines agree within tolerance (relative
+    to the largest output magnitude), the rounding of float32 arithmetic.
+
+    The filter is kaiserLowpass, a design of this module. The taps of the
+    Resampler of libsoundannotator are not visible from this repository, so
+    the engines are not claimed to reproduce its output and their
+    calibrations are cached apart from those of the library. How far they
+    deviate is measured on a board by benchmark.resampler --reference.
+'''
+import time
+
+import numpy as np
+
+from soundannotatordemo.cpsp.gammachirp                             import nextPowerOfTwo
+
+
+# Maximum difference between the engines relative to the largest output magnitude
+tolerance = 1e-5
+
+
+def kaiserLowpass(FilterLength, DecimateFactor, KaiserBeta=5.0):
+    '''
+        Kaiser windowed sinc of FilterLength taps with cutoff at the Nyquist
+        frequency after decimation and unit DC gain, equal to
+        scipy.signal.firwin(FilterLength, 1.0/DecimateFactor, window=('kaiser', KaiserBeta)).
+    '''
+    n = np.arange(FilterLength) - (FilterLength - 1) / 2.0
+    taps = np.sinc(n / float(DecimateFactor)) * np.kaiser(FilterLength, KaiserBeta)
+    return taps / np.sum(taps)
+
+
+class DirectDecimator(object):
+    '''
+        Streaming decimating FIR filter. Subclasses only replace filter, which
+        computes the retained outputs of the buffered samples.
+
+            taps:           filter coefficients
+            DecimateFactor: every DecimateFactor-th filtered sample is kept
+            dtype:          numerical format of the output
+    '''
+    def __init__(self, taps, DecimateFactor, dtype=np.complex64):
+        self.DecimateFactor = DecimateFactor
+        self.dtype = np.dtype(dtype)
+        # ... padded to whole subfilters, the extra taps are zero
+        noofphases = -(-len(taps) // DecimateFactor)
+        self.taps = np.zeros(noofphases * DecimateFactor)
+        self.taps[:len(taps)] = taps
+        self.reset()
+
+    def reset(self):
+        ''' Forget the history, as at the start of a new file. '''
+        self.history = np.zeros(len(self.taps) - 1, dtype=self.dtype)
+        self.phase = 0
+
+    def process(self, samples):
+        buffered = np.concatenate((self.history, np.asarray(samples, dtype=self.dtype)))
+        noofoutputs = max(0, (len(buffered) - len(self.taps) - self.phase) // self.DecimateFactor + 1)
+        output = self.filter(buffered, noofoutputs).astype(self.dtype)
+
+        self.phase += noofoutputs * self.DecimateFactor - (len(buffered) - len(self.history))
+        self.history = buffered[len(buffered) - len(self.history):]
+        return output
+
+    def filter(self, buffered, noofoutputs):
+        filtered = np.convolve(buffered, self.taps, mode='valid')
+        return filtered[self.phase::self.DecimateFactor][:noofoutputs]
+
+
+class PolyphaseDecimator(DirectDecimator):
+    def __init__(self, taps, DecimateFactor, dtype=np.complex64):
+        super(PolyphaseDecimator, self).__init__(taps, DecimateFactor, dtype)
+        # ... subfilter p holds taps p, p+D, p+2D, ...
+        self.subfilters = [self.taps[p::DecimateFactor] for p in range(DecimateFactor)]
+
+    def filter(self, buffered, noofoutputs):
+        output = np.zeros(noofoutputs, dtype=np.result_type(self.dtype, self.taps.dtype))
+        if noofoutputs == 0:
+            return output
+        D = self.DecimateFactor
+        for p, subfilter in enumerate(self.subfilters):
+            # ... branch p holds the input samples multiplied with subfilter p
+            start = self.phase + D - 1 - p
+            branch = buffered[start::D][:noofoutputs + len(subfilter) - 1]
+            output += np.convolve(branch, subfilter, mode='valid')
+        return output
+
+
+class FFTDecimator(DirectDecimator):
+    '''
+        Overlap-save convolution with FFTs of nfft samples, by default the
+        power of two of at least four times the filter length.
+    '''
+    def __init__(self, taps, DecimateFactor, dtype=np.complex64, nfft=None):
+        super(FFTDecimator, self).__init__(taps, DecimateFactor, dtype)
+        self.nfft = nfft or nextPowerOfTwo(4 * len(self.taps))
+        self.spectrum = np.fft.fft(self.taps, self.nfft)
+
+    def filter(self, buffered, noofoutputs):
+        if noofoutputs == 0:
+            return np.zeros(0, dtype=self.dtype)
+        overlap = len(self.taps) - 1
+        step = self.nfft - overlap
+        novalid = len(buffered) - overlap
+        noofblocks = -(-novalid // step)
+
+        padded = np.zeros(noofblocks * step + overlap, dtype=buffered.dtype)
+        padded[:len(buffered)] = buffered
+        blocks = np.lib.stride_tricks.as_strided(padded, shape=(noofblocks, self.nfft),
+            strides=(step * padded.strides[0], padded.strides[0]))
+        filtered = np.fft.ifft(np.fft.fft(blocks, axis=1) * self.spectrum, axis=1)[:, overlap:]
+        return filtered.ravel()[self.phase::self.DecimateFactor][:noofoutputs]
+
+
+engines = {
+    'direct':       DirectDecimator,
+    'polyphase':    PolyphaseDecimator,
+    'fft':          FFTDecimator,
+}
+
+
+def getEngine(name, FilterLength, DecimateFactor, KaiserBeta=5.0, dtype=np.complex64):
+    if name not in engines:
+        raise ValueError('Unknown resampler engine {0}, choose from {1}'.format(name, sorted(engines)))
+    return engines[name](kaiserLowpass(FilterLength, DecimateFactor, KaiserBeta), DecimateFactor, dtype)
+
+
+def resample(engine, signal, chunksize):
+    ''' Output of engine for signal fed in chunks of chunksize samples. '''
+    engine.reset()
+    return np.concatenate([engine.process(signal[start:start + chunksize])
+        for start in range(0, len(signal), chunksize)])
+
+
+def maximumDeviation(engine, reference, signal, chunksize):
+    ''' Largest difference between the outputs of engine and reference, relative to the largest reference output. '''
+    output = resample(engine, signal, chunksize)
+    expected = resample(reference, signal, chunksize)
+    if len(output) != len(expected):
+        raise ValueError('Engines returned {0} and {1} samples'.format(len(output), len(expected)))
+    return np.max(np.abs(output - expected)) / max(np.max(np.abs(expected)), np.finfo(np.float32).tiny)
+
+
+def checkEquivalence(name, signal, chunksize, FilterLength=1000, DecimateFactor=5, KaiserBeta=5.0):
+    ''' Raises AssertionError when engine name deviates more than tolerance from the direct engine. '''
+    deviation = maximumDeviation(getEngine(name, FilterLength, DecimateFactor, KaiserBeta),
+        getEngine('direct', FilterLength, DecimateFactor, KaiserBeta), signal, chunksize)
+    if not deviation <= tolerance:
+        raise AssertionError('Resampler engine {0} deviates {1:.2e} from the direct engine, tolerance is {2:.0e}'.format(
+            name, deviation, tolerance))
+    return deviation
+
+
+def timeEngine(engine, signal, chunksize, repeats=3):
+    ''' Best time over repeats of resampling signal in chunks of chunksize samples. '''
+    best = float('inf')
+    for repeat in range(repeats):
+        started = time.time()
+        resample(engine, signal, chunksize)
+        best = min(best, time.time() - started)
+    return best
@@ -0,0 +1,112 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    PTNE processor with a selectable engine, and the processor building a
+    coarser level of a PTNE pyramid, see ptne. Both publish the features of
+    PTN_Processor.PartialPTN_Processor under its names.
+'''
+from libsoundannotator.streamboard                                  import processor
+from libsoundannotator.streamboard.continuity                       import Continuity
+from libsoundannotator.cpsp                                         import PTN_Processor
+
+from soundannotatordemo.cpsp.ptne                                   import getEngine, featureNames, BlockAggregator
+
+
+class VectorizedPTN_Processor(processor.Processor):
+    '''
+        Replacement of PTN_Processor.PartialPTN_Processor, receiving 'E',
+        'f_tract' and 's_tract' and publishing the PTNE features of every
+        completed block.
+
+            featurenames:       subset of ['pulse','tone','noise','energy']
+            noofscales:         number of scales in the incoming cochleogram
+            split:              scales dividing the cochleogram into bands
+            SampleRate:         frames per second of the incoming cochleogram
+            blockwidth:         block duration in seconds
+            ptnreferencevalue:  subtracted from the features, if not None
+            engine:             'loop' or 'vectorized'
+
+        A partial block is dropped at a new file or a discontinuity.
+    '''
+    def __init__(self, *args, **kwargs):
+        super(VectorizedPTN_Processor, self).__init__(*args, **kwargs)
+        self.requiredParameters('noofscales', 'split', 'SampleRate', 'blockwidth')
+        self.requiredParametersWithDefault(featurenames=featureNames, ptnreferencevalue=None, engine='vectorized')
+
+    def prerun(self):
+        super(VectorizedPTN_Processor, self).prerun()
+        self.engine = getEngine(self.config['engine'], self.config['noofscales'], self.config['split'],
+            self.config['blockwidth'] * self.config['SampleRate'], self.config['featurenames'], self.config['ptnreferencevalue'])
+
+    def processData(self, smartChunk):
+        E = smartChunk.received['E']
+        if E.continuity in (Continuity.newfile, Continuity.discontinuous):
+            self.engine.reset()
+        features = self.engine.process(E.data, smartChunk.received['f_tract'].data, smartChunk.received['s_tract'].data)
+        if features[self.config['featurenames'][0]].shape[-1] == 0:
+            return None
+        return features
+
+
+class PTNEAggregator(processor.Processor):
+    '''
+        Receives the PTNE features 'pulse', 'tone', 'noise' and 'energy' and
+        publishes them for blocks factor times as wide.
+
+            factor:         number of incoming blocks combined into one
+            framesPerBlock: blockwidth*SampleRate of the incoming blocks, in cochleogram frames
+            featurenames:   subset of ['pulse','tone','noise','energy']
+
+        A partial block is dropped at a new file or a discontinuity.
+    '''
+    def __init__(self, *args, **kwargs):
+        super(PTNEAggregator, self).__init__(*args, **kwargs)
+        self.requiredParameters('factor', 'framesPerBlock')
+        self.requiredParametersWithDefault(featurenames=featureNames)
+
+    def prerun(self):
+        super(PTNEAggregator, self).prerun()
+        self.aggregator = BlockAggregator(self.config['factor'], self.config['framesPerBlock'], self.config['featurenames'])
+
+    def processData(self, smartChunk):
+        energy = smartChunk.received['energy']
+        if energy.continuity in (Continuity.newfile, Continuity.discontinuous):
+            self.aggregator.reset()
+        features = self.aggregator.process(smartChunk.received['pulse'].data, smartChunk.received['tone'].data,
+            smartChunk.received['noise'].data, energy.data)
+        if features[self.config['featurenames'][0]].shape[-1] == 0:
+            return None
+        return features
+
+
+def ptneFor(args):
+    '''
+        The PTNE processor class for args['ptneengine'] and the parameters it
+        needs besides those of PartialPTN_Processor: 'library' selects the
+        PartialPTN_Processor of libsoundannotator, the others an engine of
+        VectorizedPTN_Processor.
+    '''
+    engine = args.get('ptneengine') or 'library'
+    if engine == 'library':
+        return PTN_Processor.PartialPTN_Processor, dict()
+    return VectorizedPTN_Processor, dict(engine=engine)
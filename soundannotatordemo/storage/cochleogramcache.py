@@ -0,0 +1,158 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    On-disk cache of cochleograms.
+
+    The Resampler and TF-processor make up most of the cost of processing a
+    wav-file, and their output, the cochleogram E and EdB, only depends on
+    the content of the wav-file and the parameters in cochleogramParameters.
+    Every cached cochleogram is a columnar file (see columnar) named after a
+    fingerprint of both, so when structure extractor or PTNE settings change
+    a wav-file is replayed from the cache instead of filtered again.
+
+    Entries are written under a '.part' name and renamed once complete, so
+    interrupted runs leave no entries that seem valid. The cache is kept
+    below maxBytes by removing the least recently used entries; an entry is
+    used when it is written or found, which updates its modification time.
+    Committing an entry does not evict: the boards of other shards may still
+    replay the entries their partition found, so evict is called once all
+    shards are done and the cache may exceed maxBytes in the meantime.
+'''
+import glob, os, time
+
+from soundannotatordemo.config.fingerprint import parameterFingerprint, fileFingerprint
+
+
+# Parameters which change the cochleogram of a wav-file
+cochleogramParameters = ['inputrate', 'decimation', 'noofscales', 'samplesperframe', 'fmin', 'fmax', 'scale',
+                         'batchedtf', 'resampler']
+
+# Keys of the TF-processor stored in the cache
+cochleogramKeys = ['E', 'EdB']
+
+partSuffix = '.part'
+
+
+def defaultCacheDir():
+    return os.path.join(os.path.expanduser('~'), '.libsoundannotator', 'cochleograms')
+
+def tfParameters(args):
+    '''
+        The parameters in cochleogramParameters for args, including those the
+        processing-files use case fixes: fmin, fmax and scale.
+    '''
+    parameters = dict((key, args[key]) for key in ['inputrate', 'decimation', 'noofscales', 'samplesperframe'])
+    parameters['fmin'] = 40
+    parameters['fmax'] = float(args['inputrate'])/args['decimation']/2
+    parameters['scale'] = 'ERBScale'
+    parameters['batchedtf'] = bool(args.get('batchedtf'))
+    parameters['resampler'] = args.get('resampler') or 'library'
+    return parameters
+
+def commitEntry(partPath):
+    ''' Turn the partial entry at partPath into an entry, returns its path. '''
+    path = partPath[:-len(partSuffix)]
+    os.rename(partPath, path)
+    return path
+
+def cacheFor(args):
+    ''' The cache in args['cochleogramcachedir'] limited to args['cochleogramcachesize'] MB. '''
+    return CochleogramCache(args.get('cochleogramcachedir') or defaultCacheDir(),
+        int(args['cochleogramcachesize'] * 1024 * 1024))
+
+
+class CochleogramCache(object):
+    '''
+        directory:  directory of the cache entries, created if needed
+        maxBytes:   size above which least recently used entries are removed
+    '''
+    def __init__(self, directory, maxBytes):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def entryPath(self, wavfile, parameters):
+        ''' Path of the entry for wavfile processed with parameters, whether it exists or not. '''
+        key = '{0}-{1}'.format(fileFingerprint(wavfile)[:16], parameterFingerprint(parameters, cochleogramParameters))
+        return os.path.join(self.directory, key + '.h5')
+
+    def lookup(self, wavfile, parameters):
+        ''' Path of the entry for wavfile, marked as used, or None if not cached. '''
+        path = self.entryPath(wavfile, parameters)
+        if not os.path.isfile(path):
+            return None
+        os.utime(path, None)
+        return path
+
+    def partition(self, wavfiles, parameters):
+        '''
+            Split wavfiles, keeping their order, in a list of (wavfile, entry)
+            pairs for the cached ones and one for the others, with the path
+            their entry should be written to.
+        '''
+        cached, uncached = [], []
+        for wavfile in wavfiles:
+            path = self.entryPath(wavfile, parameters)
+            if os.path.isfile(path):
+                os.utime(path, None)
+                cached.append((wavfile, path))
+            else:
+                uncached.append((wavfile, path))
+        return cached, uncached
+
+    def entries(self):
+        ''' (modification time, size, path) of all entries including partial ones, least recently used first. '''
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, '*.h5')) + glob.glob(os.path.join(self.directory, '*.h5' + partSuffix)):
+            try:
+                status = os.stat(path)
+            except OSError:
+                continue
+            entries.append((status.st_mtime, status.st_size, path))
+        return sorted(entries)
+
+    def size(self):
+        return sum(size for mtime, size, path in self.entries())
+
+    def evict(self, keep=()):
+        '''
+            Remove least recently used entries until the cache fits in
+            maxBytes, except those in keep and partial entries changed in the
+            last hour, which are probably being written. Returns the removed paths.
+        '''
+        entries = self.entries()
+        total = sum(size for mtime, size, path in entries)
+        removed = []
+        for mtime, size, path in entries:
+            if total <= self.maxBytes:
+                break
+            if path in keep or (path.endswith(partSuffix) and time.time() - mtime < 3600):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed.append(path)
+        return removed
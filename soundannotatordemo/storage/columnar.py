@@ -0,0 +1,217 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Columnar storage of streamed features.
+
+    Every source gets one HDF5 file, in which every key is a group holding
+        data:       array with time along the last axis, stored in chunks of
+                    chunkframes frames which are compressed individually
+        segments:   time index, one row (first frame, start time) for every
+                    stretch of continuous data
+    and the attributes SampleRate and length (number of valid frames).
+
+    Reading a time range of a key only decompresses the chunks overlapping
+    with it, so analysis jobs can slice long recordings without reading the
+    whole file. With compression=None the chunks are stored as is and
+    slicing has the access pattern of a memory map.
+
+    The writer collects frames in a buffer of exactly one chunk and writes
+    whole chunks, so every chunk is compressed once and the dataset is grown
+    geometrically instead of once per incoming chunk.
+'''
+import numpy as np
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+
+def requireH5py():
+    if h5py is None:
+        raise ImportError('The columnar output format requires h5py')
+
+
+class ColumnWriter(object):
+    ''' Appends frames of one key to its group in the HDF5 file. '''
+    def __init__(self, group, leadingShape, dtype, compression, chunkframes):
+        self.group = group
+        self.chunkframes = chunkframes
+
+        if 'data' in group:
+            self.data = group['data']
+            self.segments = group['segments']
+            self.length = int(group.attrs['length'])
+            if self.data.shape[:-1] != leadingShape:
+                raise ValueError('Can not append frames of shape {0} to {1} with shape {2}'.format(
+                    leadingShape, group.name, self.data.shape[:-1]))
+        else:
+            self.data = group.create_dataset('data',
+                shape=leadingShape + (0,),
+                maxshape=leadingShape + (None,),
+                chunks=leadingShape + (chunkframes,),
+                dtype=dtype,
+                compression=compression)
+            self.segments = group.create_dataset('segments', shape=(0, 2), maxshape=(None, 2), dtype=np.float64)
+            self.length = 0
+            group.attrs['length'] = 0
+
+        self.buffer = np.empty(leadingShape + (chunkframes,), dtype=self.data.dtype)
+        self.fill = 0
+
+    def append(self, frames, startTime, newSegment):
+        frames = np.asarray(frames)
+        noofframes = frames.shape[-1]
+
+        if newSegment or self.segments.shape[0] == 0:
+            row = self.segments.shape[0]
+            self.segments.resize(row + 1, axis=0)
+            self.segments[row] = (self.length + self.fill, startTime)
+
+        position = 0
+        while position < noofframes:
+            if self.fill == 0 and noofframes - position >= self.chunkframes:
+                # ... whole chunks go to the file without passing the buffer
+                wholeChunks = (noofframes - position) // self.chunkframes * self.chunkframes
+                self.write(frames[..., position:position + wholeChunks])
+                position += wholeChunks
+            else:
+                take = min(self.chunkframes - self.fill, noofframes - position)
+                self.buffer[..., self.fill:self.fill + take] = frames[..., position:position + take]
+                self.fill += take
+                position += take
+                if self.fill == self.chunkframes:
+                    self.flush()
+
+    def write(self, frames):
+        newLength = self.length + frames.shape[-1]
+        if self.data.shape[-1] < newLength:
+            self.data.resize(max(newLength, 2 * self.data.shape[-1]), axis=self.data.ndim - 1)
+        self.data[..., self.length:newLength] = frames
+        self.length = newLength
+        self.group.attrs['length'] = self.length
+
+    def flush(self):
+        if self.fill > 0:
+            self.write(self.buffer[..., :self.fill])
+            self.fill = 0
+
+    def close(self):
+        self.flush()
+        self.data.resize(self.length, axis=self.data.ndim - 1)
+
+
+class ColumnarWriter(object):
+    '''
+        filename:       HDF5 file
+        mode:           'a' appends to the file if it exists, 'w' replaces it
+        SampleRate:     frames per second of all keys written to the file
+        compression:    HDF5 compression filter: 'lzf' (fast), 'gzip' or None
+        chunkframes:    number of frames per stored chunk
+        datatype:       numerical format of the stored frames
+    '''
+    def __init__(self, filename, SampleRate, compression='lzf', chunkframes=1024, datatype='float32', attributes=None, mode='a'):
+        requireH5py()
+        self.h5 = h5py.File(filename, mode)
+        self.h5.attrs['SampleRate'] = SampleRate
+        for name, value in (attributes or dict()).items():
+            self.h5.attrs[name] = value
+
+        self.compression = compression
+        self.chunkframes = chunkframes
+        self.datatype = datatype
+        self.columns = dict()
+
+    def append(self, key, frames, startTime, newSegment=False):
+        ''' Append frames (time along the last axis) starting at startTime to key. '''
+        column = self.columns.get(key)
+        if column is None:
+            group = self.h5.require_group(key)
+            column = ColumnWriter(group, np.shape(frames)[:-1], self.datatype, self.compression, self.chunkframes)
+            self.columns[key] = column
+        column.append(frames, startTime, newSegment)
+
+    def close(self):
+        for column in self.columns.values():
+            column.close()
+        self.h5.close()
+
+
+class ColumnarReader(object):
+    '''
+        Random access to a file written by ColumnarWriter.
+
+            reader = ColumnarReader(filename)
+            E = reader.read('E', 10.0, 12.5)    # frames from 10 s up to 12.5 s
+    '''
+    def __init__(self, filename):
+        requireH5py()
+        self.h5 = h5py.File(filename, 'r')
+        self.SampleRate = float(self.h5.attrs['SampleRate'])
+
+    def keys(self):
+        return list(self.h5.keys())
+
+    def length(self, key):
+        return int(self.h5[key].attrs['length'])
+
+    def segments(self, key):
+        ''' Array with per segment its first frame and its start time. '''
+        return self.h5[key]['segments'][...]
+
+    def frameIndex(self, key, t):
+        ''' Index of the first frame at or after time t. '''
+        segments = self.segments(key)
+        length = self.length(key)
+        segment = max(np.searchsorted(segments[:, 1], t, side='right') - 1, 0)
+        firstFrame, startTime = segments[segment]
+        lastFrame = segments[segment + 1, 0] if segment + 1 < len(segments) else length
+        index = firstFrame + int(np.ceil((t - startTime) * self.SampleRate - 1e-9))
+        return int(min(max(index, firstFrame), lastFrame))
+
+    def times(self, key, start=0, stop=None):
+        ''' Time stamps of frames start up to stop. '''
+        stop = self.length(key) if stop is None else stop
+        frames = np.arange(start, stop)
+        segments = self.segments(key)
+        segment = np.searchsorted(segments[:, 0], frames, side='right') - 1
+        return segments[segment, 1] + (frames - segments[segment, 0]) / self.SampleRate
+
+    def read(self, key, tstart=None, tstop=None):
+        ''' Frames of key from time tstart up to tstop, by default all frames. '''
+        start = 0 if tstart is None else self.frameIndex(key, tstart)
+        stop = self.length(key) if tstop is None else self.frameIndex(key, tstop)
+        return self.h5[key]['data'][..., start:stop]
+
+    def __getitem__(self, key):
+        ''' The stored dataset, sliceable without reading the whole key. '''
+        return self.h5[key]['data']
+
+    def close(self):
+        self.h5.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
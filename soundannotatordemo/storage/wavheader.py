@@ -0,0 +1,89 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Header of RIFF/WAVE files, read without touching the samples.
+
+    The wave module of the standard library only understands integer PCM, so
+    it can neither give the duration of a float wav nor where its samples
+    start. WavHeader walks the chunks up to the data chunk itself.
+'''
+import os, struct
+
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavHeader(object):
+    '''
+        The fmt chunk and the position of the data chunk of filename:
+
+            formatTag:      WAVE_FORMAT_PCM or WAVE_FORMAT_IEEE_FLOAT, the
+                            subformat of WAVE_FORMAT_EXTENSIBLE files
+            channels, SampleRate, blockAlign, bits
+            dataOffset:     byte offset of the first sample
+            frames:         number of frames in the file, a data size beyond
+                            the end of the file is clipped to it
+
+        Raises ValueError if filename is not a RIFF/WAVE file with a fmt chunk
+        before its data chunk.
+    '''
+    def __init__(self, filename):
+        with open(filename, 'rb') as f:
+            header = f.read(12)
+            if len(header) < 12 or header[:4] != b'RIFF' or header[8:] != b'WAVE':
+                raise ValueError('{0} is not a RIFF/WAVE file'.format(filename))
+
+            formatChunk = None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError('{0} has no data chunk'.format(filename))
+                chunkId, chunkSize = struct.unpack('<4sI', header)
+                if chunkId == b'fmt ':
+                    formatChunk = f.read(chunkSize)
+                    f.seek(chunkSize % 2, 1)
+                elif chunkId == b'data':
+                    self.dataOffset = f.tell()
+                    break
+                else:
+                    # ... chunks are padded to an even number of bytes
+                    f.seek(chunkSize + chunkSize % 2, 1)
+
+        if formatChunk is None or len(formatChunk) < 16:
+            raise ValueError('{0} has no fmt chunk before its data chunk'.format(filename))
+        self.formatTag, self.channels, self.SampleRate, byteRate, self.blockAlign, self.bits = struct.unpack('<HHIIHH', formatChunk[:16])
+        if self.formatTag == WAVE_FORMAT_EXTENSIBLE and len(formatChunk) >= 26:
+            self.formatTag = struct.unpack('<H', formatChunk[24:26])[0]
+        if self.SampleRate == 0 or self.blockAlign == 0:
+            raise ValueError('{0} has a sample rate of {1} Hz and {2} bytes per frame'.format(
+                filename, self.SampleRate, self.blockAlign))
+
+        # ... a recorder killed mid-recording leaves a data size beyond the end of the file
+        dataSize = min(chunkSize, os.path.getsize(filename) - self.dataOffset)
+        self.frames = dataSize // self.blockAlign
+
+    def duration(self):
+        ''' Duration in seconds. '''
+        return float(self.frames) / self.SampleRate
@@ -0,0 +1,181 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Adaptive chunk sizing for the microphone pipeline.
+
+    Small chunks give low latency but cost overhead per chunk in every
+    processor, large chunks the opposite. In adaptive mode the microphone is
+    read in small chunks of a fixed size, and an AdaptiveRechunker joins
+    them into chunks of a size chosen by a ChunkSizeController:
+
+        - the latency of the oldest sample in a chunk is estimated as the lag
+          measured at the sinks plus the duration of the chunk
+        - below low*target the chunks grow, lowering the CPU cost
+        - above target the chunks shrink, unless the lag keeps rising: then
+          the pipeline falls behind on the overhead per chunk and the chunks
+          grow
+
+    Sizes stay within bounds and are a multiple of quantum, the input samples
+    of one cochleogram frame. Every change is logged with its reason.
+
+    The lag is measured in the main process by a LagProbe listening to the
+    DrainMonitor, and handed to the rechunker through a multiprocessing.Value.
+'''
+import time
+
+import numpy as np
+
+from libsoundannotator.streamboard                                  import processor
+from libsoundannotator.streamboard.continuity                       import Continuity
+
+
+class LagProbe(object):
+    '''
+        DrainMonitor listener writing the smoothed lag of the chunks of the
+        sink stages, the time between a chunk's startTime and its arrival, to
+        sharedLag.
+            stages:     names of the sink stages
+            sharedLag:  multiprocessing.Value('d') read by the rechunker
+            smoothing:  weight of a new measurement in the running average
+    '''
+    def __init__(self, stages, sharedLag, smoothing=0.2):
+        self.stages = set(stages)
+        self.sharedLag = sharedLag
+        self.smoothing = smoothing
+        self.lag = None
+
+    def __call__(self, processorName, chunk, receivedAt):
+        if processorName not in self.stages or getattr(chunk, 'startTime', None) is None:
+            return
+        lag = receivedAt - chunk.startTime
+        self.lag = lag if self.lag is None else (1 - self.smoothing) * self.lag + self.smoothing * lag
+        self.sharedLag.value = self.lag
+
+
+class ChunkSizeController(object):
+    '''
+            SampleRate:     input sample rate
+            target:         latency target in seconds
+            minimum:        smallest chunk size in samples
+            maximum:        largest chunk size in samples
+            quantum:        chunk sizes are a multiple of quantum samples
+            interval:       seconds between decisions, letting the lag settle
+            low:            fraction of target below which chunks grow
+            factor:         relative size of a step
+            rising:         ratio between successive lags regarded as rising
+    '''
+    def __init__(self, SampleRate, target, minimum, maximum, quantum, interval=5.0, low=0.6, factor=1.25, rising=1.2, logger=None):
+        self.SampleRate = float(SampleRate)
+        self.target = target
+        self.quantum = quantum
+        self.minimum = roundToQuantum(minimum, quantum)
+        self.maximum = max(roundToQuantum(maximum, quantum), self.minimum)
+        self.interval = interval
+        self.low = low
+        self.factor = factor
+        self.rising = rising
+        self.logger = logger
+        self.lastDecision = None
+        self.lastLag = None
+
+    def clip(self, size):
+        return min(max(roundToQuantum(size, self.quantum), self.minimum), self.maximum)
+
+    def decide(self, size, lag, now=None):
+        ''' The chunk size to use after chunks of size samples showed lag seconds of lag. '''
+        now = time.time() if now is None else now
+        if lag is None or lag <= 0:
+            return size
+        if self.lastDecision is not None and now - self.lastDecision < self.interval:
+            return size
+
+        duration = size / self.SampleRate
+        latency = lag + duration
+        if latency < self.low * self.target:
+            newSize, reason = self.clip(size * self.factor), 'latency below target'
+        elif latency > self.target and self.lastLag is not None and lag > self.rising * self.lastLag:
+            newSize, reason = self.clip(size * self.factor), 'latency above target and lag rising, the pipeline falls behind'
+        elif latency > self.target:
+            newSize, reason = self.clip(size / self.factor), 'latency above target'
+        else:
+            newSize, reason = size, None
+
+        self.lastDecision = now
+        self.lastLag = lag
+        if newSize != size and self.logger is not None:
+            self.logger.info('Chunk size {0} -> {1} samples: {2} (lag {3:.3f} s + chunk {4:.3f} s, target {5:.3f} s)'.format(
+                size, newSize, reason, lag, duration, self.target))
+        return newSize
+
+
+def roundToQuantum(size, quantum):
+    return max(1, int(round(float(size) / quantum))) * quantum
+
+
+class AdaptiveRechunker(processor.Processor):
+    '''
+        Receives 'sound' in small chunks and publishes it under 'sound' in
+        chunks of at least the size chosen by a ChunkSizeController from
+        sharedLag, always a whole number of quanta. A discontinuity drops the
+        samples collected before it, the last chunk is published at once.
+
+            SampleRate:         sample rate of the sound
+            ChunkSize:          initial chunk size
+            sharedLag:          multiprocessing.Value('d') written by a LagProbe
+            target, minimum, maximum, quantum, interval: see ChunkSizeController
+    '''
+    def __init__(self, *args, **kwargs):
+        super(AdaptiveRechunker, self).__init__(*args, **kwargs)
+        self.requiredParameters('SampleRate', 'ChunkSize', 'sharedLag', 'target', 'minimum', 'maximum', 'quantum')
+        self.requiredParametersWithDefault(interval=5.0)
+
+    def prerun(self):
+        super(AdaptiveRechunker, self).prerun()
+        self.controller = ChunkSizeController(self.config['SampleRate'], self.config['target'],
+            self.config['minimum'], self.config['maximum'], self.config['quantum'],
+            interval=self.config['interval'], logger=self.logger)
+        self.chunkSize = self.controller.clip(self.config['ChunkSize'])
+        self.pieces = []
+        self.collected = 0
+
+    def processData(self, smartChunk):
+        chunk = smartChunk.received['sound']
+        if chunk.continuity in (Continuity.discontinuous, Continuity.newfile) and self.collected > 0:
+            self.logger.warning('{0} drops {1} samples collected before a discontinuity'.format(self.name, self.collected))
+            self.pieces, self.collected = [], 0
+
+        self.pieces.append(np.ravel(chunk.data))
+        self.collected += len(self.pieces[-1])
+        if chunk.continuity == Continuity.last:
+            publish = self.collected
+        elif self.collected >= self.chunkSize:
+            # ... a whole number of frames, the remainder starts the next chunk
+            publish = self.collected // self.config['quantum'] * self.config['quantum']
+        else:
+            return None
+
+        collected = np.concatenate(self.pieces)
+        sound, remainder = collected[:publish], collected[publish:]
+        self.pieces, self.collected = [remainder], len(remainder)
+        self.chunkSize = self.controller.decide(self.chunkSize, self.config['sharedLag'].value)
+        return {'sound': sound}
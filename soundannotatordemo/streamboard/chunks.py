@@ -0,0 +1,42 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Helpers for inspecting chunks as they are received by processors.
+'''
+from libsoundannotator.streamboard.continuity import Continuity
+
+
+def receivedContinuities(smartChunk):
+    ''' The continuities of all chunks received in one processing step. '''
+    return [chunk.continuity for chunk in smartChunk.received.values()]
+
+def isLastChunk(smartChunk):
+    ''' True if any of the received chunks closes the stream. '''
+    return Continuity.last in receivedContinuities(smartChunk)
+
+def sourceIdentifier(chunk, sourceProcessor):
+    '''
+        The source_id the input processor sourceProcessor attached to the data
+        in chunk: the wav-file it was read from or the microphone location.
+    '''
+    return chunk.sources[sourceProcessor].source_id
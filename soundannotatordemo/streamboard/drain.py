@@ -0,0 +1,133 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Drain protocol for stopping a board as soon as all processors are done.
+
+    Instead of sleeping a fixed time after the termination condition is
+    spotted on a single processor, a DrainMonitor subscribes to every stage
+    that needs to finish and waits until each of them published a chunk with
+    the termination continuity (Continuity.last for normal runs,
+    Continuity.calibrationChunk for calibration). Processors which do not
+    publish anything themselves, like the FileWriters, acknowledge the last
+    chunk through the DrainingFileOutputProcessor.
+
+    The connections are waited upon with select, so the main process sleeps
+    until a chunk arrives instead of polling. Listeners registered with
+    addListener see every chunk received from the watched stages, which makes
+    the monitor the natural place to hook in timing measurements.
+'''
+import select, time
+
+from libsoundannotator.streamboard.continuity    import Continuity
+from libsoundannotator.streamboard.subscription  import SubscriptionOrder
+
+
+class DrainStage(object):
+    def __init__(self, processorName, key, connection, terminationContinuity, listener=None):
+        self.processorName = processorName
+        self.key = key
+        self.connection = connection
+        self.terminationContinuity = terminationContinuity
+        self.listener = listener
+        self.drainedAt = None
+
+    def fileno(self):
+        return self.connection.fileno()
+
+
+class DrainMonitor(object):
+    '''
+        board:  the Board on which the watched processors have been started
+        logger: logger used to report per stage drain latency
+    '''
+    def __init__(self, board, logger):
+        self.board = board
+        self.logger = logger
+        self.stages = []
+        self.listeners = []
+
+    def watch(self, processorName, key='technicalkey', terminationContinuity=Continuity.last, listener=None):
+        '''
+            Register processor processorName as a stage which needs to drain,
+            it has drained once it published a chunk with terminationContinuity
+            under key. A listener given here is called like those of
+            addListener, but only for the chunks of this stage.
+        '''
+        subscriberName = 'toProbeProcessor-{0}-{1}'.format(processorName, key)
+        connection = self.board.getConnectionToProcessor(SubscriptionOrder(processorName, subscriberName, key, key))
+        connection.riseConnection(self.logger)
+        self.stages.append(DrainStage(processorName, key, connection.connection, terminationContinuity, listener))
+
+    def addListener(self, listener):
+        '''
+            Call listener(processorName, chunk, receivedAt) for every chunk
+            received from a watched stage while waiting.
+        '''
+        self.listeners.append(listener)
+
+    def wait(self, timeout=None):
+        '''
+            Block until every watched stage has drained, or until timeout
+            seconds have passed. Returns True if all stages drained.
+        '''
+        started = time.time()
+        pending = list(self.stages)
+
+        while len(pending) > 0:
+            if timeout is None:
+                remaining = None
+            else:
+                remaining = timeout - (time.time() - started)
+                if remaining <= 0:
+                    self.logger.warning('Drain timeout after {0} s, still waiting for: {1}'.format(
+                        timeout, ', '.join(stage.processorName for stage in pending)))
+                    return False
+
+            readable, _, _ = select.select(pending, [], [], remaining)
+            for stage in readable:
+                while stage.drainedAt is None and stage.connection.poll():
+                    chunk = stage.connection.recv()
+                    receivedAt = time.time()
+                    if stage.listener is not None:
+                        stage.listener(stage.processorName, chunk, receivedAt)
+                    for listener in self.listeners:
+                        listener(stage.processorName, chunk, receivedAt)
+                    if chunk.continuity == stage.terminationContinuity:
+                        stage.drainedAt = receivedAt
+                        pending.remove(stage)
+
+        self.logDrainLatency()
+        return True
+
+    def logDrainLatency(self):
+        ''' Log per stage when it drained, relative to the first stage that drained. '''
+        drained = sorted((stage for stage in self.stages if stage.drainedAt is not None), key=lambda stage: stage.drainedAt)
+        if len(drained) == 0:
+            return
+
+        first = drained[0].drainedAt
+        previous = first
+        for stage in drained:
+            self.logger.info('Drained {0:<28} +{1:7.3f} s (stage latency {2:7.3f} s)'.format(
+                stage.processorName, stage.drainedAt - first, stage.drainedAt - previous))
+            previous = stage.drainedAt
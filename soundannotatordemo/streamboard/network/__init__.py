@@ -0,0 +1,37 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Link between a remote microphone and the server, replacing the network
+    block of MicInputProcessor and NetworkSubscriptionOrder of
+    libsoundannotator for the microphone at a distance use case.
+
+    The library transport sends every chunk as it is produced and receives
+    it straight into the subscription. Neither end exposes a queue to bound
+    or a place to encode the samples. So the microphone stalled or memory
+    grew without limit when the server fell behind, and the sound always
+    went over the wire as complex64. This package has its own framing
+    (framing), byte bounded queues with a policy for a full queue (queues)
+    and negotiated sample codecs (wirecodecs). The processors at the two
+    ends are streamboard.processors.output.networkout and
+    streamboard.processors.input.networkin.
+'''
@@ -0,0 +1,140 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Fan-in of many remote microphones into one server.
+
+    The FanInServer accepts the connections of many NetworkSenderProcessors
+    on one port and demultiplexes their chunks by source_id: every source
+    gets its own multiprocessing queue, drained by a QueueReceiverProcessor
+    at the head of the processing chain of that source. The first time a
+    source connects startSource is called to start this chain; a source
+    which reconnects continues on its existing chain.
+
+    Putting chunks in a full queue blocks the connection of that source
+    only, so TCP pushes back on the one microphone whose chain falls behind.
+'''
+import multiprocessing, socket, threading
+
+from soundannotatordemo.streamboard.network                         import framing, wirecodecs
+
+
+class FanInServer(object):
+    '''
+        interface, port:    address to listen on
+        SampleRate:         sample rate all sources have to use
+        startSource:        called as startSource(source_id, chunkQueue) for every new source,
+                            see also preregister
+        maxsources:         number of sources accepted, later sources are refused
+        queuesize:          number of chunks queued per source
+    '''
+    def __init__(self, interface, port, SampleRate, startSource, maxsources=12, queuesize=64, logger=None):
+        self.address = (interface, port)
+        self.SampleRate = SampleRate
+        self.startSource = startSource
+        self.maxsources = maxsources
+        self.queuesize = queuesize
+        self.logger = logger
+
+        self.lock = threading.Lock()
+        self.queues = dict()
+        self.connected = set()
+
+    def log(self, message):
+        if self.logger is not None:
+            self.logger.info(message)
+
+    def serve(self):
+        ''' Accept connections until the process is stopped. '''
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(self.address)
+        server.listen(self.maxsources)
+        self.log('Fan-in server listening on {0} for at most {1} sources'.format(self.address, self.maxsources))
+
+        while True:
+            connection, address = server.accept()
+            handler = threading.Thread(target=self.handle, args=(connection, address))
+            handler.daemon = True
+            handler.start()
+
+    def preregister(self, source_ids):
+        '''
+            Create the queues of a fixed set of sources, whose processing chains
+            the caller starts itself. Other sources are refused from then on.
+            Returns the queues by source_id.
+        '''
+        with self.lock:
+            for source_id in source_ids:
+                self.queues[source_id] = multiprocessing.Queue(self.queuesize)
+            self.startSource = None
+            return dict(self.queues)
+
+    def register(self, source_id):
+        ''' The queue for source_id, None if the source can not be accepted. '''
+        with self.lock:
+            if source_id in self.connected:
+                self.log('Refused a second connection for source {0}'.format(source_id))
+                return None
+            if source_id not in self.queues:
+                if self.startSource is None:
+                    self.log('Refused unknown source {0}'.format(source_id))
+                    return None
+                if len(self.queues) >= self.maxsources:
+                    self.log('Refused source {0}, already processing {1} sources'.format(source_id, self.maxsources))
+                    return None
+                chunkQueue = multiprocessing.Queue(self.queuesize)
+                self.startSource(source_id, chunkQueue)
+                self.queues[source_id] = chunkQueue
+            self.connected.add(source_id)
+            return self.queues[source_id]
+
+    def handle(self, connection, address):
+        source_id = None
+        try:
+            framing.configureSocket(connection)
+            hello = framing.receiveHello(connection)
+
+            chunkQueue = None
+            if hello['SampleRate'] == self.SampleRate:
+                chunkQueue = self.register(hello['source_id'])
+            if chunkQueue is None:
+                framing.sendHello(connection, {'accepted': False})
+                return
+            source_id = hello['source_id']
+
+            codec = wirecodecs.getCodec(wirecodecs.negotiate(hello.get('codecs', ['raw'])))
+            framing.sendHello(connection, {'accepted': True, 'codec': codec.name})
+            self.log('Receiving source {0} from {1} using codec {2}'.format(source_id, address, codec.name))
+
+            while True:
+                frametype, payload = framing.receiveFrame(connection)
+                if frametype == framing.BYE:
+                    break
+                chunkQueue.put(framing.WireChunk.decode(payload, codec))
+        except (socket.error, framing.ConnectionClosed, ValueError) as e:
+            self.log('Lost the connection to {0}: {1}'.format(address, e))
+        finally:
+            connection.close()
+            if source_id is not None:
+                with self.lock:
+                    self.connected.discard(source_id)
@@ -0,0 +1,141 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Wire format of the link between a remote microphone and the server.
+
+    Every message is a frame: a header with a magic number, the frame type
+    and the payload length, followed by the payload.
+        HELLO:  JSON description of the stream, sent by the microphone on
+                connect and answered by the server
+        CHUNK:  one chunk of sound, see WireChunk, its samples are encoded
+                with the codec agreed on in the HELLO exchange, see wirecodecs
+        BYE:    end of the stream
+'''
+import json, socket, struct
+import numpy as np
+
+from libsoundannotator.streamboard.continuity                       import Continuity
+
+
+MAGIC = b'SAN1'
+HELLO, CHUNK, BYE = 1, 2, 3
+
+frameHeader = struct.Struct('!4sBI')
+
+# Continuities which can be transmitted, by index
+continuityNames = ['withprevious', 'newfile', 'discontinuous', 'last', 'calibrationChunk']
+
+
+class ConnectionClosed(Exception):
+    pass
+
+
+def receiveExactly(sock, nbytes):
+    parts = []
+    while nbytes > 0:
+        part = sock.recv(min(nbytes, 1 << 20))
+        if not part:
+            raise ConnectionClosed('Connection closed by peer')
+        parts.append(part)
+        nbytes -= len(part)
+    return b''.join(parts)
+
+def sendFrame(sock, frametype, payload=b''):
+    sock.sendall(frameHeader.pack(MAGIC, frametype, len(payload)) + payload)
+
+def receiveFrame(sock):
+    ''' The next frame as (frametype, payload). '''
+    magic, frametype, length = frameHeader.unpack(receiveExactly(sock, frameHeader.size))
+    if magic != MAGIC:
+        raise ConnectionClosed('Peer does not speak the soundannotator wire format')
+    return frametype, receiveExactly(sock, length)
+
+def sendHello(sock, description):
+    sendFrame(sock, HELLO, json.dumps(description).encode('utf-8'))
+
+def receiveHello(sock):
+    frametype, payload = receiveFrame(sock)
+    if frametype != HELLO:
+        raise ConnectionClosed('Expected HELLO, received frame type {0}'.format(frametype))
+    return json.loads(payload.decode('utf-8'))
+
+def configureSocket(sock):
+    # Chunks are sent whole, waiting for more data to fill a segment only adds latency
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+def continuityIndex(continuity):
+    for index, name in enumerate(continuityNames):
+        if getattr(Continuity, name) == continuity:
+            return index
+    return continuityNames.index('discontinuous')
+
+
+class WireChunk(object):
+    '''
+        A mono chunk of sound on its way over the network.
+            number:     sequence number assigned by the sender, gaps mean chunks were dropped
+            startTime:  start time of the chunk at the sender
+            continuity: continuity of the chunk at the sender
+            samples:    the (possibly downsampled) samples
+            length:     number of samples before downsampling
+            factor:     downsampling factor, 1 for the original samples
+    '''
+    header = struct.Struct('!IdBHI')
+
+    def __init__(self, number, startTime, continuity, samples, length=None, factor=1):
+        self.number = number
+        self.startTime = startTime
+        self.continuity = continuity
+        self.samples = samples
+        self.length = len(samples) if length is None else length
+        self.factor = factor
+
+    @property
+    def nbytes(self):
+        return self.header.size + self.samples.nbytes
+
+    def downsampled(self):
+        ''' The chunk at half the sample rate, neighbouring samples are averaged. '''
+        samples = self.samples
+        if len(samples) % 2:
+            samples = np.append(samples, samples[-1:])
+        samples = (0.5 * (samples[0::2] + samples[1::2])).astype(self.samples.dtype)
+        return WireChunk(self.number, self.startTime, self.continuity, samples, self.length, 2 * self.factor)
+
+    def restored(self):
+        ''' The samples at the original sample rate. '''
+        if self.factor == 1:
+            return self.samples
+        return np.repeat(self.samples, self.factor)[:self.length]
+
+    def encode(self, encodedSamples):
+        ''' The CHUNK payload given the samples encoded by the agreed codec. '''
+        return self.header.pack(self.number, self.startTime, continuityIndex(self.continuity),
+            self.factor, self.length) + encodedSamples
+
+    @classmethod
+    def decode(cls, payload, codec):
+        number, startTime, continuity, factor, length = cls.header.unpack_from(payload)
+        samples = codec.decode(payload[cls.header.size:])
+        return cls(number, startTime, getattr(Continuity, continuityNames[continuity]), samples, length, factor)
@@ -0,0 +1,124 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Bounded queue between a network link and the board.
+
+    The queue holds WireChunks up to a maximum number of bytes, what happens
+    when a chunk does not fit is set by the policy:
+        block:      wait until the consumer made room, on the receiving side
+                    this stops reading the socket so TCP pushes back on the sender
+        dropoldest: drop the oldest queued chunks until the new chunk fits
+        downsample: halve the sample rate of the new chunk (at most down to
+                    1/maxFactor) until it fits, drop the oldest chunks thereafter
+    A single chunk larger than maxbytes is always accepted into an empty queue.
+'''
+import collections, threading, time
+
+
+policies = ['block', 'dropoldest', 'downsample']
+
+
+class BoundedChunkQueue(object):
+    def __init__(self, maxbytes, policy='block', maxFactor=8):
+        if policy not in policies:
+            raise ValueError('Unknown queue policy {0}, use one of {1}'.format(policy, policies))
+        self.maxbytes = maxbytes
+        self.policy = policy
+        self.maxFactor = maxFactor
+
+        self.chunks = collections.deque()
+        self.condition = threading.Condition()
+        self.closed = False
+
+        self.queuedBytes = 0
+        self.peakBytes = 0
+        self.droppedChunks = 0
+        self.droppedBytes = 0
+        self.downsampledChunks = 0
+
+    def fits(self, nbytes):
+        return len(self.chunks) == 0 or self.queuedBytes + nbytes <= self.maxbytes
+
+    def put(self, chunk):
+        with self.condition:
+            if self.policy == 'block':
+                while not self.fits(chunk.nbytes) and not self.closed:
+                    self.condition.wait(0.1)
+            else:
+                if self.policy == 'downsample':
+                    while not self.fits(chunk.nbytes) and chunk.factor < self.maxFactor:
+                        chunk = chunk.downsampled()
+                    if chunk.factor > 1:
+                        self.downsampledChunks += 1
+                while not self.fits(chunk.nbytes):
+                    dropped = self.chunks.popleft()
+                    self.queuedBytes -= dropped.nbytes
+                    self.droppedChunks += 1
+                    self.droppedBytes += dropped.nbytes
+
+            self.chunks.append(chunk)
+            self.queuedBytes += chunk.nbytes
+            self.peakBytes = max(self.peakBytes, self.queuedBytes)
+            self.condition.notify_all()
+
+    def get(self, timeout=None):
+        ''' The oldest chunk, None on timeout or when the queue is closed and empty. '''
+        deadline = None if timeout is None else time.time() + timeout
+        with self.condition:
+            while len(self.chunks) == 0:
+                if self.closed:
+                    return None
+                if deadline is None:
+                    self.condition.wait(0.1)
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return None
+                    self.condition.wait(remaining)
+
+            chunk = self.chunks.popleft()
+            self.queuedBytes -= chunk.nbytes
+            self.condition.notify_all()
+            return chunk
+
+    def close(self):
+        ''' No more chunks will be put, get returns None once the queue is empty. '''
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def statistics(self):
+        with self.condition:
+            return {
+                'queuedChunks': len(self.chunks),
+                'queuedBytes': self.queuedBytes,
+                'peakBytes': self.peakBytes,
+                'droppedChunks': self.droppedChunks,
+                'droppedBytes': self.droppedBytes,
+                'downsampledChunks': self.downsampledChunks,
+            }
+
+    def __str__(self):
+        return ('{queuedChunks} chunks ({queuedBytes} bytes, peak {peakBytes}) queued, '
+            '{droppedChunks} chunks ({droppedBytes} bytes) dropped, '
+            '{downsampledChunks} chunks downsampled').format(**self.statistics())
@@ -0,0 +1,167 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Codecs for the sound samples in the CHUNK frames of the network link.
+
+        raw:                float32 samples as is
+        int16:              samples quantized to 16 bits, float samples in
+                            [-1, 1) with the fixed step 2**-15 of 16 bit
+                            audio and clipped outside it, integer samples are
+                            sent exactly
+        int16-lz4:          int16 compressed with LZ4, needs python-lz4
+        int16-delta-zlib:   int16 with the differences between neighbouring
+                            samples compressed with zlib, lossless with respect
+                            to int16
+
+    The microphone offers its preferred codec when connecting, the server
+    answers with the codec it will decode, see negotiate.
+'''
+import struct, time, zlib
+import numpy as np
+
+try:
+    import lz4.block as lz4block
+    lz4compress, lz4decompress = lz4block.compress, lz4block.decompress
+except ImportError:
+    try:
+        # python-lz4 before 0.10
+        import lz4
+        lz4compress, lz4decompress = lz4.compress, lz4.decompress
+    except ImportError:
+        lz4compress = lz4decompress = None
+
+
+class RawCodec(object):
+    name = 'raw'
+
+    def encode(self, samples):
+        return np.asarray(samples, dtype='<f4').tobytes()
+
+    def decode(self, payload):
+        return np.frombuffer(payload, dtype='<f4').astype(np.float32)
+
+
+class Int16Codec(object):
+    name = 'int16'
+    scaleHeader = struct.Struct('!f')
+    # ... the same step for every chunk, so the quantization noise does not follow the loudness of the chunk
+    fullScale = 2.0**-15
+
+    def quantize(self, samples):
+        if samples.dtype.kind in 'iu':
+            return 1.0, np.clip(samples, -32768, 32767).astype('<i2')
+        return self.fullScale, np.clip(np.round(samples / self.fullScale), -32768, 32767).astype('<i2')
+
+    def pack(self, quantized):
+        return quantized.tobytes()
+
+    def unpack(self, payload):
+        return np.frombuffer(payload, dtype='<i2')
+
+    def encode(self, samples):
+        scale, quantized = self.quantize(np.asarray(samples))
+        return self.scaleHeader.pack(scale) + self.pack(quantized)
+
+    def decode(self, payload):
+        scale, = self.scaleHeader.unpack_from(payload)
+        quantized = self.unpack(payload[self.scaleHeader.size:])
+        return quantized.astype(np.float32) * np.float32(scale)
+
+
+class Int16LZ4Codec(Int16Codec):
+    name = 'int16-lz4'
+
+    def pack(self, quantized):
+        return lz4compress(quantized.tobytes())
+
+    def unpack(self, payload):
+        return np.frombuffer(lz4decompress(payload), dtype='<i2')
+
+
+class Int16DeltaZlibCodec(Int16Codec):
+    name = 'int16-delta-zlib'
+
+    def __init__(self, level=1):
+        self.level = level
+
+    def pack(self, quantized):
+        # Differences wrap around in int16, the cumulative sum in int16 wraps them back exactly
+        delta = quantized.copy()
+        delta[1:] = quantized[1:] - quantized[:-1]
+        return zlib.compress(delta.tobytes(), self.level)
+
+    def unpack(self, payload):
+        delta = np.frombuffer(zlib.decompress(payload), dtype='<i2')
+        return np.cumsum(delta, dtype='<i2')
+
+
+codecClasses = [RawCodec, Int16Codec, Int16LZ4Codec, Int16DeltaZlibCodec]
+
+
+def availableCodecs():
+    ''' Names of the codecs whose dependencies are installed. '''
+    return [cls.name for cls in codecClasses if cls is not Int16LZ4Codec or lz4compress is not None]
+
+def getCodec(name):
+    if name not in availableCodecs():
+        raise ValueError('Codec {0} is not available, use one of {1}'.format(name, availableCodecs()))
+    for cls in codecClasses:
+        if cls.name == name:
+            return cls()
+
+def offer(preferred):
+    ''' Codecs the microphone offers: the preferred one with raw as fall back. '''
+    return [preferred] if preferred == 'raw' else [preferred, 'raw']
+
+def negotiate(offered):
+    ''' The first of the offered codecs available here. '''
+    for name in offered:
+        if name in availableCodecs():
+            return name
+    raise ValueError('None of the codecs {0} is available'.format(offered))
+
+
+class CodecStatistics(object):
+    ''' Compression ratio and encoding time over the encoded chunks. '''
+    def __init__(self, name):
+        self.name = name
+        self.chunks = 0
+        self.rawBytes = 0
+        self.encodedBytes = 0
+        self.encodeSeconds = 0.0
+
+    def encode(self, codec, samples):
+        started = time.time()
+        payload = codec.encode(samples)
+        self.encodeSeconds += time.time() - started
+        self.chunks += 1
+        # ... compared to float32 samples, so raw has ratio 1
+        self.rawBytes += 4 * samples.size
+        self.encodedBytes += len(payload)
+        return payload
+
+    def __str__(self):
+        if self.chunks == 0:
+            return '{0}: no chunks encoded'.format(self.name)
+        return '{0}: compression ratio {1:.2f}, encoding {2:.2f} ms per chunk'.format(self.name,
+            float(self.rawBytes) / max(self.encodedBytes, 1), 1000 * self.encodeSeconds / self.chunks)
@@ -0,0 +1,133 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Replaying streams stored in the columnar format.
+
+    ColumnarReplayProcessor publishes keys read from files written in the
+    format of soundannotatordemo.storage.columnar, as the processor which
+    computed them would have published them. Started under the name of that
+    processor, the processors downstream of it run unchanged on the stored
+    streams, and the processors upstream of it are not needed.
+'''
+import glob, os, time
+
+from libsoundannotator.streamboard                                  import processor
+from libsoundannotator.streamboard.continuity                       import Continuity
+
+from soundannotatordemo.storage.columnar                            import ColumnarReader, requireH5py, h5py
+
+
+def columnarSources(directory):
+    '''
+        Sources for ColumnarReplayProcessor: the (source_id, filename) pairs
+        of the files ColumnarOutputProcessor wrote to directory, ordered by
+        source_id.
+    '''
+    requireH5py()
+    sources = []
+    for filename in glob.glob(os.path.join(directory, '*.h5')):
+        with h5py.File(filename, 'r') as h5:
+            if 'source_id' in h5.attrs:
+                sources.append((str(h5.attrs['source_id']), filename))
+    if len(sources) == 0:
+        raise ValueError('No files in the columnar format in {0}, only output written with outputformat columnar can be replayed'.format(directory))
+    return sorted(sources)
+
+
+class ColumnarReplayProcessor(processor.InputProcessor):
+    '''
+        Publishes the keys of columnar files in chunks of ChunkFrames frames,
+        every file as one source, with the continuity of the wav input
+        processors: the first chunk of every file is newfile, the last chunk
+        of the last file is last.
+
+            Sources:        list of (source_id, filename) pairs
+            keys:           keys to publish, stored under the same names
+            SampleRate:     expected frames per second, files with another rate are skipped
+            ChunkFrames:    frames per chunk
+            timestep:       seconds to wait before reading a chunk, 0 reads as fast as possible
+    '''
+    def __init__(self, *args, **kwargs):
+        super(ColumnarReplayProcessor, self).__init__(*args, **kwargs)
+        self.requiredParameters('Sources', 'keys', 'SampleRate', 'ChunkFrames')
+        self.requiredParametersWithDefault(timestep=0)
+
+    def prerun(self):
+        super(ColumnarReplayProcessor, self).prerun()
+        self.pending = list(self.config['Sources'])
+        self.openNextFile()
+
+    def openNextFile(self):
+        self.reader = None
+        while self.pending:
+            source_id, filename = self.pending.pop(0)
+            try:
+                reader = ColumnarReader(filename)
+            except (IOError, OSError) as e:
+                self.logger.error('{0} skips {1}: {2}'.format(self.name, filename, e))
+                continue
+            missing = [key for key in self.config['keys'] if key not in reader.keys()]
+            lengths = set(reader.length(key) for key in self.config['keys'] if key not in missing)
+            if missing or len(lengths) != 1 or 0 in lengths or abs(reader.SampleRate - self.config['SampleRate']) > 1e-6 * self.config['SampleRate']:
+                self.logger.error('{0} skips {1}: keys {2} missing, lengths {3} at {4} frames per second'.format(
+                    self.name, filename, missing, sorted(lengths), reader.SampleRate))
+                reader.close()
+                continue
+            self.reader = reader
+            self.source_id = source_id
+            self.length = lengths.pop()
+            self.position = 0
+            self.newfile = True
+            return
+
+    def generateData(self):
+        if self.reader is None:
+            time.sleep(1.0)
+            return None
+
+        if self.config['timestep'] > 0:
+            time.sleep(self.config['timestep'])
+
+        if self.newfile:
+            self.config['source_id'] = self.source_id
+            self.logger.info('{0} replays {1} from {2}'.format(self.name, self.source_id, self.reader.h5.filename))
+
+        stop = min(self.position + self.config['ChunkFrames'], self.length)
+        data = dict((key, self.reader[key][..., self.position:stop]) for key in self.config['keys'])
+        self.position = stop
+
+        if self.newfile:
+            self.continuity = Continuity.newfile
+        else:
+            self.continuity = Continuity.withprevious
+        self.newfile = False
+
+        if stop == self.length:
+            # ... the next file is opened now, to know whether this chunk is the last one
+            self.reader.close()
+            self.openNextFile()
+            if self.reader is None:
+                self.continuity = Continuity.last
+                self.logger.info('{0} replayed all files'.format(self.name))
+
+        return data
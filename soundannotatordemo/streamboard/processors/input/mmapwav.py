@@ -0,0 +1,209 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Memory-mapped wav input for long recordings.
+
+    wav.WavProcessor reads every chunk into fresh sample arrays, which the
+    Resampler converts once more to complex64. MmapWavProcessor maps the
+    data chunk of the wav-file and converts the strided view of one channel
+    directly into a buffer of the outgoing type, allocated once and reused
+    for every chunk. The file is mapped in windows of windowBytes, so
+    resident memory stays flat however long the recording is.
+'''
+import time
+
+import numpy as np
+
+from libsoundannotator.streamboard                                  import processor
+from libsoundannotator.streamboard.continuity                       import Continuity
+
+from soundannotatordemo.storage.wavheader                           import WavHeader, WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT
+
+try:
+    stringTypes = basestring
+except NameError:
+    # ... python 3
+    stringTypes = str
+
+
+class WavFileMap(object):
+    '''
+        Memory map of the samples in a RIFF/WAVE file, located with WavHeader.
+        Supports 8, 16, 24 and 32 bit integer and 32 and 64 bit float samples.
+
+            wavfile = WavFileMap(filename)
+            wavfile.readInto(start, stop, channel, out)     # out[:stop-start] in [-1, 1)
+
+        Only a window of windowBytes is mapped at a time, reading moves the
+        window along the file.
+    '''
+    def __init__(self, filename, windowBytes=64*1024*1024):
+        self.filename = filename
+        header = WavHeader(filename)
+        self.channels, self.SampleRate, self.blockAlign = header.channels, header.SampleRate, header.blockAlign
+        self.dataOffset, self.frames = header.dataOffset, header.frames
+        self.bytesPerSample = header.bits // 8
+        self.kind = {WAVE_FORMAT_PCM: 'i', WAVE_FORMAT_IEEE_FLOAT: 'f'}.get(header.formatTag)
+        if self.kind is None or (self.kind, self.bytesPerSample) not in [('i', 1), ('i', 2), ('i', 3), ('i', 4), ('f', 4), ('f', 8)]:
+            raise ValueError('{0} has unsupported sample format {1} with {2} bits'.format(filename, header.formatTag, header.bits))
+        if self.blockAlign != self.channels * self.bytesPerSample:
+            raise ValueError('{0} has {1} bytes per frame for {2} channels of {3} bits'.format(
+                filename, self.blockAlign, self.channels, header.bits))
+
+        # ... frames x channels, 24 bit samples as 3 bytes each
+        if self.bytesPerSample == 3:
+            self.dtype, self.shape = np.dtype(np.uint8), (self.channels, 3)
+        elif self.kind == 'i' and self.bytesPerSample == 1:
+            self.dtype, self.shape = np.dtype(np.uint8), (self.channels,)
+        else:
+            self.dtype, self.shape = np.dtype('<{0}{1}'.format(self.kind, self.bytesPerSample)), (self.channels,)
+
+        self.windowFrames = max(1, windowBytes // self.blockAlign)
+        self.window = None
+        self.windowStart = 0
+        self.scratch = np.zeros(0, dtype=np.int32)
+
+    def view(self, start, stop):
+        ''' Frames start up to stop of the mapped window, moving the window if needed. '''
+        if self.window is None or start < self.windowStart or stop > self.windowStart + len(self.window):
+            # ... the previous window is unmapped before the next one is mapped
+            self.window = None
+            length = min(max(self.windowFrames, stop - start), self.frames - start)
+            self.window = np.memmap(self.filename, dtype=self.dtype, mode='r',
+                offset=self.dataOffset + start * self.blockAlign, shape=(length,) + self.shape)
+            self.windowStart = start
+        return self.window[start - self.windowStart:stop - self.windowStart]
+
+    def readInto(self, start, stop, channel, out):
+        '''
+            Convert frames start up to stop of channel into out[:stop-start],
+            scaled to [-1, 1). A complex out only gets its real part written.
+        '''
+        column = self.view(start, stop)[:, channel]
+        target = out[:stop - start]
+        if np.iscomplexobj(target):
+            target = target.real
+
+        if self.bytesPerSample == 3:
+            # ... little endian 24 bit samples, assembled in the top of an int32
+            if len(self.scratch) < stop - start:
+                self.scratch = np.zeros(stop - start, dtype=np.int32)
+            scratch = self.scratch[:stop - start]
+            scratch[:] = column[:, 2]
+            scratch <<= 8
+            scratch |= column[:, 1]
+            scratch <<= 8
+            scratch |= column[:, 0]
+            scratch <<= 8
+            np.multiply(scratch, 2.0**-31, out=target, casting='unsafe')
+        elif self.kind == 'f':
+            np.copyto(target, column, casting='unsafe')
+        elif self.bytesPerSample == 1:
+            np.multiply(column, 1 / 128.0, out=target, casting='unsafe')
+            target -= 1.0
+        else:
+            np.multiply(column, 2.0**(1 - 8 * self.bytesPerSample), out=target, casting='unsafe')
+
+    def close(self):
+        self.window = None
+
+
+class MmapWavProcessor(processor.InputProcessor):
+    '''
+        Publishes the sound of SoundFiles under the key 'sound' in chunks of
+        ChunkSize samples, like wav.WavProcessor. The published samples are
+        converted into one buffer reused for every chunk, the board's
+        connections copy them when publishing.
+
+            SoundFiles:     FileAnnotations or paths of the wav-files
+            SampleRate:     expected sample rate, files with another rate are skipped
+            ChunkSize:      samples per chunk
+            timestep:       seconds to wait before reading a chunk, 0 reads as fast as possible
+            channel:        channel to publish of multichannel files
+            dTypeOut:       numerical format of the published samples, complex64 as the Resampler expects
+            windowBytes:    size of the mapped part of a file
+    '''
+    def __init__(self, *args, **kwargs):
+        super(MmapWavProcessor, self).__init__(*args, **kwargs)
+        self.requiredParameters('SoundFiles', 'SampleRate', 'ChunkSize')
+        self.requiredParametersWithDefault(timestep=0.08, channel=0, dTypeOut=np.complex64, windowBytes=64*1024*1024)
+
+    def prerun(self):
+        super(MmapWavProcessor, self).prerun()
+        self.buffer = np.zeros(self.config['ChunkSize'], dtype=self.config['dTypeOut'])
+        self.pending = list(self.config['SoundFiles'])
+        self.wavfile = self.openNextFile()
+        self.position = 0
+        self.newfile = True
+
+    def openNextFile(self):
+        while self.pending:
+            soundfile = self.pending.pop(0)
+            filename = soundfile if isinstance(soundfile, stringTypes) else soundfile.FilePath
+            try:
+                wavfile = WavFileMap(filename, self.config['windowBytes'])
+            except (IOError, OSError, ValueError) as e:
+                self.logger.error('{0} skips {1}: {2}'.format(self.name, filename, e))
+                continue
+            if wavfile.SampleRate != self.config['SampleRate'] or wavfile.frames == 0 or wavfile.channels <= self.config['channel']:
+                self.logger.error('{0} skips {1}: {2} frames of {3} channels at {4} Hz'.format(
+                    self.name, filename, wavfile.frames, wavfile.channels, wavfile.SampleRate))
+                wavfile.close()
+                continue
+            return wavfile
+        return None
+
+    def generateData(self):
+        if self.wavfile is None:
+            time.sleep(1.0)
+            return None
+
+        if self.config['timestep'] > 0:
+            time.sleep(self.config['timestep'])
+
+        if self.newfile:
+            self.config['source_id'] = self.wavfile.filename
+            self.logger.info('{0} reads {1}'.format(self.name, self.wavfile.filename))
+
+        stop = min(self.position + self.config['ChunkSize'], self.wavfile.frames)
+        self.wavfile.readInto(self.position, stop, self.config['channel'], self.buffer)
+        sound = self.buffer[:stop - self.position]
+        self.position = stop
+
+        if self.newfile:
+            self.continuity = Continuity.newfile
+        else:
+            self.continuity = Continuity.withprevious
+        self.newfile = False
+
+        if stop == self.wavfile.frames:
+            # ... the next file is opened now, to know whether this chunk is the last one
+            self.wavfile.close()
+            self.wavfile = self.openNextFile()
+            self.position = 0
+            self.newfile = True
+            if self.wavfile is None:
+                self.continuity = Continuity.last
+                self.logger.info('{0} read all files'.format(self.name))
+
+        return {'sound': sound}
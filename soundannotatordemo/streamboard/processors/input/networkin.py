@@ -0,0 +1,166 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Receiving side of the link between a remote microphone and the server.
+'''
+import socket, threading, time
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+from libsoundannotator.streamboard                                  import processor
+from libsoundannotator.streamboard.continuity                       import Continuity
+
+from soundannotatordemo.streamboard.network                         import framing, wirecodecs
+from soundannotatordemo.streamboard.network.queues                  import BoundedChunkQueue
+
+
+class SequenceCheckingMixin(object):
+    '''
+        Turns received WireChunks into data to publish. A chunk following
+        dropped chunks, recognized by a gap in the numbering, is published as
+        discontinuous. A chunk sent again after a reconnect while it had
+        arrived already is a duplicate and is not published.
+    '''
+    expectedNumber = None
+    missedChunks = 0
+
+    def isDuplicate(self, chunk):
+        return self.expectedNumber is not None and chunk.number < self.expectedNumber
+
+    def publishChunk(self, chunk):
+        continuity = chunk.continuity
+        if self.expectedNumber is not None and chunk.number != self.expectedNumber:
+            self.missedChunks += max(chunk.number - self.expectedNumber, 0)
+            if continuity == Continuity.withprevious:
+                continuity = Continuity.discontinuous
+        self.expectedNumber = chunk.number + 1
+        self.continuity = continuity
+
+        return {'sound': chunk.restored()}
+
+
+class NetworkReceiverProcessor(SequenceCheckingMixin, processor.InputProcessor):
+    '''
+        Publishes the sound sent by a NetworkSenderProcessor under the key
+        'sound'. A separate thread reads the socket into a bounded queue.
+        With the default policy 'block' a full queue stops the reading, so
+        TCP pushes back and the sender's policy decides what to give up.
+        Chunks following dropped chunks are published as discontinuous.
+            port:           port to listen on
+            interface:      address to listen on, all interfaces by default
+            SampleRate:     expected sample rate of the sound
+            maxQueueBytes:  bound on the bytes received but not yet published
+            policy:         'block', 'dropoldest' or 'downsample', see queues
+            reportInterval: seconds between logging the queue counters
+    '''
+    def __init__(self, *args, **kwargs):
+        super(NetworkReceiverProcessor, self).__init__(*args, **kwargs)
+        self.requiredParameters('port', 'SampleRate')
+        self.requiredParametersWithDefault(
+            interface='',
+            source_id='undetermined_recording_location',
+            maxQueueBytes=16*1024*1024,
+            policy='block',
+            reportInterval=60,
+        )
+
+    def prerun(self):
+        super(NetworkReceiverProcessor, self).prerun()
+        self.queue = BoundedChunkQueue(self.config['maxQueueBytes'], self.config['policy'])
+        self.lastReport = time.time()
+        self.receiver = threading.Thread(target=self.receiveLoop, name='{0}-receive'.format(self.name))
+        self.receiver.daemon = True
+        self.receiver.start()
+
+    def receiveLoop(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self.config['interface'], self.config['port']))
+        server.listen(1)
+
+        while True:
+            connection, address = server.accept()
+            try:
+                framing.configureSocket(connection)
+                self.accept(connection, framing.receiveHello(connection))
+                self.logger.info('{0} receives {1} from {2} using codec {3}'.format(self.name, self.config['source_id'], address, self.codec.name))
+
+                while True:
+                    frametype, payload = framing.receiveFrame(connection)
+                    if frametype == framing.BYE:
+                        break
+                    self.queue.put(framing.WireChunk.decode(payload, self.codec))
+            except (socket.error, framing.ConnectionClosed, ValueError) as e:
+                self.logger.warning('{0} lost the connection to {1}: {2}'.format(self.name, address, e))
+            finally:
+                connection.close()
+
+    def accept(self, connection, hello):
+        if hello['SampleRate'] != self.config['SampleRate']:
+            framing.sendHello(connection, {'accepted': False})
+            raise ValueError('Sender uses sample rate {0} instead of {1}'.format(hello['SampleRate'], self.config['SampleRate']))
+        try:
+            codec = wirecodecs.negotiate(hello.get('codecs', ['raw']))
+        except ValueError:
+            framing.sendHello(connection, {'accepted': False})
+            raise
+        self.codec = wirecodecs.getCodec(codec)
+        self.config['source_id'] = hello['source_id']
+        framing.sendHello(connection, {'accepted': True, 'codec': codec})
+
+    def generateData(self):
+        chunk = None
+        while chunk is None or self.isDuplicate(chunk):
+            chunk = self.queue.get(timeout=1.0)
+
+        if time.time() - self.lastReport > self.config['reportInterval']:
+            self.logger.info('{0}: {1}, {2} chunks missed'.format(self.name, self.queue, self.missedChunks))
+            self.lastReport = time.time()
+
+        return self.publishChunk(chunk)
+
+
+class QueueReceiverProcessor(SequenceCheckingMixin, processor.InputProcessor):
+    '''
+        Publishes under the key 'sound' the WireChunks of one source which a
+        FanInServer in the main process receives and puts in chunkQueue.
+            chunkQueue:     multiprocessing.Queue with the WireChunks of the source
+            SampleRate:     sample rate of the sound
+            source_id:      the source
+    '''
+    def __init__(self, *args, **kwargs):
+        super(QueueReceiverProcessor, self).__init__(*args, **kwargs)
+        self.requiredParameters('chunkQueue', 'SampleRate', 'source_id')
+
+    def generateData(self):
+        chunk = None
+        while chunk is None or self.isDuplicate(chunk):
+            try:
+                chunk = self.config['chunkQueue'].get(timeout=1.0)
+            except queue.Empty:
+                pass
+
+        return self.publishChunk(chunk)
@@ -0,0 +1,42 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Reading wav-files as fast as the pipeline accepts the data.
+
+    wav.WavProcessor paces its reads with timestep as if the sound were live.
+    For batch jobs OfflineWavProcessor memory-maps each file and publishes it
+    in large blocks without waiting, so the pipeline runs as fast as disk and
+    CPU allow. The continuity is that of WavProcessor: the first block of
+    every file is newfile, the last block of the last file is last.
+'''
+from soundannotatordemo.streamboard.processors.input.mmapwav        import MmapWavProcessor
+
+
+class OfflineWavProcessor(MmapWavProcessor):
+    '''
+        MmapWavProcessor without pacing, ChunkSize is best set to blocks of
+        many seconds to keep the overhead per chunk low.
+    '''
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('timestep', 0)
+        super(OfflineWavProcessor, self).__init__(*args, **kwargs)
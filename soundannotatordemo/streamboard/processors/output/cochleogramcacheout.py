@@ -0,0 +1,83 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Writer filling the cochleogram cache, see
+    soundannotatordemo.storage.cochleogramcache.
+'''
+import os
+
+from soundannotatordemo.storage.cochleogramcache                    import commitEntry, partSuffix
+from soundannotatordemo.storage.columnar                            import ColumnarWriter
+from soundannotatordemo.streamboard.processors.output.columnarfileout import ColumnarOutputProcessor
+
+
+class CochleogramCacheWriter(ColumnarOutputProcessor):
+    '''
+        Writes the subscribed keys of every source to the cache entry given
+        for it, sources without an entry are not written. Takes the
+        parameters of ColumnarOutputProcessor, outdir is the cache directory,
+        and
+            cacheEntries:   dict from source_id to the path of its entry
+
+        An entry is committed when the writer moves on to the next source or
+        receives the last chunk. The writer does not evict, see
+        CochleogramCache.
+    '''
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('compression', None)
+        super(CochleogramCacheWriter, self).__init__(*args, **kwargs)
+        self.requiredParameters('cacheEntries')
+        self.partPath = None
+
+    def openWriter(self, source_id):
+        self.closeWriter()
+        self.source_id = source_id
+        path = self.config['cacheEntries'].get(source_id)
+        if path is None:
+            self.logger.warning('{0} has no cache entry for {1}'.format(self.name, source_id))
+            self.writer = NullWriter()
+            return
+        self.partPath = path + partSuffix
+        if os.path.isfile(self.partPath):
+            os.remove(self.partPath)
+        self.writer = ColumnarWriter(self.partPath, self.config['SampleRate'],
+            compression=self.config['compression'],
+            chunkframes=self.config['chunkframes'],
+            datatype=self.config['datatype'],
+            attributes={'source_id': str(source_id)})
+
+    def closeWriter(self):
+        super(CochleogramCacheWriter, self).closeWriter()
+        if self.partPath is not None:
+            commitEntry(self.partPath)
+            self.logger.info('{0} cached {1}'.format(self.name, self.source_id))
+            self.partPath = None
+
+
+class NullWriter(object):
+    ''' Stands in for a ColumnarWriter of a source which is not cached. '''
+    def append(self, key, frames, startTime, newSegment=False):
+        pass
+
+    def close(self):
+        pass
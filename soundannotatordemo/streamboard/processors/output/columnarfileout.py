@@ -0,0 +1,118 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Writer storing the subscribed keys in the columnar HDF5 format of
+    soundannotatordemo.storage.columnar, one file per source.
+'''
+import hashlib, os
+
+from libsoundannotator.streamboard                                  import processor
+from libsoundannotator.streamboard.continuity                       import Continuity
+
+from soundannotatordemo.storage.columnar                            import ColumnarWriter
+from soundannotatordemo.streamboard.chunks                          import isLastChunk, sourceIdentifier
+from soundannotatordemo.streamboard.processors.output.drainingfileout import DrainAcknowledgingMixin
+
+
+def sourceFileName(source_id):
+    '''
+        File name for the output of a source: readable, but unique for
+        sources with the same basename in different folders.
+    '''
+    source_id = str(source_id)
+    base = os.path.splitext(os.path.basename(source_id))[0] or 'source'
+    return '{0}-{1}.h5'.format(base, hashlib.sha1(source_id.encode('utf-8')).hexdigest()[:8])
+
+
+class ColumnarOutputProcessor(DrainAcknowledgingMixin, processor.Processor):
+    '''
+        Takes the same parameters as FileOutputProcessor where they apply:
+            outdir:             directory for the output files
+            SampleRate:         frames per second of the subscribed keys
+            requiredKeys:       keys to be written
+            datatype:           numerical format of the stored frames
+            usesource_id:       one file per source_id, otherwise one file for the stream
+            source_processor:   processor that attached the source_id
+        and
+            compression:        'lzf' (default, fast), 'gzip' or None
+            chunkframes:        frames per compressed chunk
+            acknowledgeChunks:  see DrainAcknowledgingMixin
+    '''
+    def __init__(self, *args, **kwargs):
+        super(ColumnarOutputProcessor, self).__init__(*args, **kwargs)
+        self.requiredParameters('outdir', 'SampleRate', 'requiredKeys')
+        self.requiredParametersWithDefault(
+            datatype='float32',
+            usesource_id=True,
+            source_processor='S2S_SoundInput',
+            compression='lzf',
+            chunkframes=1024,
+            acknowledgeChunks=False,
+        )
+        self.writer = None
+        self.source_id = None
+        # ... files written in this run, older output of the same source is replaced
+        self.written = set()
+
+    def prerun(self):
+        super(ColumnarOutputProcessor, self).prerun()
+        if not os.path.isdir(self.config['outdir']):
+            os.makedirs(self.config['outdir'])
+
+    def openWriter(self, source_id):
+        self.closeWriter()
+        filename = os.path.join(self.config['outdir'], sourceFileName(source_id))
+        self.logger.info('{0} writes {1} to {2}'.format(self.name, source_id, filename))
+        self.writer = ColumnarWriter(filename, self.config['SampleRate'],
+            compression=self.config['compression'],
+            chunkframes=self.config['chunkframes'],
+            datatype=self.config['datatype'],
+            attributes={'source_id': str(source_id)},
+            mode='a' if filename in self.written else 'w')
+        self.written.add(filename)
+        self.source_id = source_id
+
+    def closeWriter(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def processData(self, smartChunk):
+        chunks = smartChunk.received
+        first = chunks[self.config['requiredKeys'][0]]
+
+        if self.config['usesource_id']:
+            source_id = sourceIdentifier(first, self.config['source_processor'])
+        else:
+            source_id = self.name
+        if self.writer is None or source_id != self.source_id:
+            self.openWriter(source_id)
+
+        newSegment = first.continuity != Continuity.withprevious
+        for key in self.config['requiredKeys']:
+            self.writer.append(key, chunks[key].data, first.startTime, newSegment)
+
+        if isLastChunk(smartChunk):
+            self.closeWriter()
+
+        return self.acknowledge(smartChunk, None)
@@ -0,0 +1,68 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    FileOutputProcessor acknowledging the end of the stream.
+'''
+import time
+import numpy as np
+
+from libsoundannotator.streamboard.processors.output.oldfileout     import FileOutputProcessor
+
+from soundannotatordemo.streamboard.chunks                          import isLastChunk
+
+
+class DrainAcknowledgingMixin(object):
+    '''
+        Acknowledgements for writers: after writing the chunk carrying
+        Continuity.last the time it finished is published under the key
+        'drained'. A DrainMonitor watching this key knows the writer is done
+        and the board can be stopped.
+
+        With acknowledgeChunks=True every chunk is acknowledged under the key
+        'written' as well, which allows tracing chunks up to the moment they
+        were written.
+    '''
+    def acknowledge(self, smartChunk, result):
+        if self.config['acknowledgeChunks']:
+            if result is None:
+                result = dict()
+            result['written'] = np.array([time.time()])
+
+        if isLastChunk(smartChunk):
+            self.logger.info('{0} wrote the last chunk'.format(self.name))
+            if result is None:
+                result = dict()
+            result['drained'] = np.array([time.time()])
+
+        return result
+
+
+class DrainingFileOutputProcessor(DrainAcknowledgingMixin, FileOutputProcessor):
+    ''' Drop-in replacement for FileOutputProcessor acknowledging written chunks. '''
+    def __init__(self, *args, **kwargs):
+        super(DrainingFileOutputProcessor, self).__init__(*args, **kwargs)
+        self.requiredParametersWithDefault(acknowledgeChunks=False)
+
+    def processData(self, smartChunk):
+        result = super(DrainingFileOutputProcessor, self).processData(smartChunk)
+        return self.acknowledge(smartChunk, result)
@@ -0,0 +1,139 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Sending side of the link between a remote microphone and the server.
+'''
+import socket, threading, time
+import numpy as np
+
+from libsoundannotator.streamboard                                  import processor
+
+from soundannotatordemo.streamboard.chunks                          import isLastChunk
+from soundannotatordemo.streamboard.network                         import framing, wirecodecs
+from soundannotatordemo.streamboard.network.queues                  import BoundedChunkQueue
+
+
+class NetworkSenderProcessor(processor.Processor):
+    '''
+        Sends the subscribed mono sound to a NetworkReceiverProcessor. The
+        board hands chunks to a bounded queue which a separate thread sends,
+        so a slow link or server never stalls the microphone and never
+        buffers more than maxQueueBytes.
+            host, port:     address of the server
+            SampleRate:     sample rate of the sound
+            source_id:      name under which the server processes the sound
+            key:            subscribed key holding the sound
+            codec:          preferred codec for the samples, see wirecodecs
+            maxQueueBytes:  bound on the bytes waiting to be sent
+            policy:         'block', 'dropoldest' or 'downsample', see queues
+            reconnectInterval: seconds between connection attempts
+            reportInterval: seconds between logging the queue counters
+    '''
+    def __init__(self, *args, **kwargs):
+        super(NetworkSenderProcessor, self).__init__(*args, **kwargs)
+        self.requiredParameters('host', 'port', 'SampleRate')
+        self.requiredParametersWithDefault(
+            source_id='undetermined_recording_location',
+            key='sound',
+            codec='raw',
+            maxQueueBytes=4*1024*1024,
+            policy='dropoldest',
+            reconnectInterval=2.0,
+            reportInterval=60,
+        )
+        self.number = 0
+        self.codecStatistics = None
+
+    def prerun(self):
+        super(NetworkSenderProcessor, self).prerun()
+        wirecodecs.getCodec(self.config['codec'])
+        self.queue = BoundedChunkQueue(self.config['maxQueueBytes'], self.config['policy'])
+        self.lastReport = time.time()
+        self.sender = threading.Thread(target=self.sendLoop, name='{0}-send'.format(self.name))
+        self.sender.daemon = True
+        self.sender.start()
+
+    def processData(self, smartChunk):
+        chunk = smartChunk.received[self.config['key']]
+        samples = np.ascontiguousarray(chunk.data).ravel()
+        self.queue.put(framing.WireChunk(self.number, chunk.startTime, chunk.continuity, samples))
+        self.number += 1
+
+        if time.time() - self.lastReport > self.config['reportInterval']:
+            self.logger.info('{0}: {1}'.format(self.name, self.queue))
+            if self.codecStatistics is not None:
+                self.logger.info('{0}: {1}'.format(self.name, self.codecStatistics))
+            self.lastReport = time.time()
+
+        if isLastChunk(smartChunk):
+            self.queue.close()
+            self.sender.join(60)
+            self.logger.info('{0} sent the last chunk: {1}'.format(self.name, self.queue))
+
+        return None
+
+    def hello(self):
+        return {
+            'source_id': self.config['source_id'],
+            'SampleRate': self.config['SampleRate'],
+            'codecs': wirecodecs.offer(self.config['codec']),
+        }
+
+    def sendLoop(self):
+        address = (self.config['host'], self.config['port'])
+        # ... the chunk being sent when a connection fails is sent again on the next one
+        pending = None
+        while True:
+            try:
+                sock = socket.create_connection(address)
+            except socket.error as e:
+                self.logger.warning('{0} can not connect to {1}: {2}'.format(self.name, address, e))
+                time.sleep(self.config['reconnectInterval'])
+                continue
+
+            try:
+                framing.configureSocket(sock)
+                framing.sendHello(sock, self.hello())
+                answer = framing.receiveHello(sock)
+                if not answer.get('accepted'):
+                    raise framing.ConnectionClosed('Server refused the stream')
+                codec = wirecodecs.getCodec(answer['codec'])
+                self.codecStatistics = wirecodecs.CodecStatistics(codec.name)
+                self.logger.info('{0} connected to {1} using codec {2}'.format(self.name, address, codec.name))
+
+                while True:
+                    if pending is None:
+                        pending = self.queue.get(timeout=1.0)
+                    if pending is None:
+                        if self.queue.closed:
+                            framing.sendFrame(sock, framing.BYE)
+                            return
+                        continue
+                    framing.sendFrame(sock, framing.CHUNK, pending.encode(self.codecStatistics.encode(codec, pending.samples)))
+                    pending = None
+            except (socket.error, framing.ConnectionClosed) as e:
+                # A chunk the receiver did get before the failure arrives twice, it skips the copy by its number
+                self.logger.warning('{0} lost the connection to {1}: {2}'.format(self.name, address, e))
+                time.sleep(self.config['reconnectInterval'])
+            finally:
+                sock.close()
@@ -0,0 +1,369 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Shared-memory transport of chunk data between the processes of a board.
+
+    The board pickles every published array once per subscriber and sends it
+    through a pipe. With the shared-memory transport a publisher copies the
+    array once into a ring of slots in a memory-mapped file, by default in
+    /dev/shm. Only a SharedChunk, naming the ring and the slot, is published
+    through the pipe. Subscribers get a read-only view of the slot.
+
+    Every ring has a fixed list of consumers. Each consumer records the last
+    sequence number it released in the ring's control block, and the
+    publisher only reuses a slot once every consumer released the chunk in
+    it. A consumer holds on to the last hold chunks, because processors may
+    keep views of their previous input. A consumer which does not release
+    within timeout seconds is overrun: its slot is overwritten and the
+    consumer counts the chunk as stale when it releases it.
+
+    The counters in the control block are readable from the main process,
+    see SharedMemoryBoard.report.
+
+    A board is switched to the transport by wrapping it:
+
+        b = SharedMemoryBoard(Board(...), layout)
+
+    where layout maps publisher names to {key: [consumer names]}. All
+    processors started through the wrapper understand SharedChunks.
+
+    Slots are twice the size of the first chunk of a key, or the size given
+    for the key in slotBytes when that is larger. A chunk which does not fit
+    goes through the pipe as usual; the first time this happens for a key
+    the publisher logs a warning.
+'''
+import collections, json, os, tempfile, time
+
+import numpy as np
+
+
+# Layout of the int64 control block at the start of a ring file
+SLOTS, SLOTBYTES, CONSUMERS, WRITES, BYTESWRITTEN, OVERRUNS, FALLBACKS, FIRSTWRITE, LASTWRITE = range(9)
+headerFields = 9
+
+
+def defaultDirectory():
+    return '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+class SharedChunk(object):
+    ''' What is published instead of an array: where to find it in which ring. '''
+    def __init__(self, path, sequence, dtype, shape):
+        self.path = path
+        self.sequence = sequence
+        self.dtype = dtype
+        self.shape = shape
+
+
+class ChunkRing(object):
+    '''
+        A ring file with a control block of
+            header:     SLOTS ... LASTWRITE, times in microseconds
+            sequences:  per slot the sequence number of its chunk, -1 while writing
+            released:   per consumer the last sequence number it released
+            stale:      per consumer the number of chunks it found overwritten
+        followed by the slots, each of slotBytes bytes. The consumer names
+        are stored in '<path>.json'.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.map = np.memmap(path, dtype=np.uint8, mode='r+')
+        self.header = self.map[:headerFields * 8].view(np.int64)
+        slots, consumers = int(self.header[SLOTS]), int(self.header[CONSUMERS])
+        self.slots, self.slotBytes = slots, int(self.header[SLOTBYTES])
+        self.sequences = self.map[headerFields * 8:(headerFields + slots) * 8].view(np.int64)
+        offset = (headerFields + slots) * 8
+        self.released = self.map[offset:offset + consumers * 8].view(np.int64)
+        self.stale = self.map[offset + consumers * 8:offset + 2 * consumers * 8].view(np.int64)
+        self.dataOffset = controlBytes(slots, consumers)
+        with open(path + '.json') as f:
+            self.consumers = json.load(f)['consumers']
+
+    @classmethod
+    def create(cls, path, consumers, slots, slotBytes):
+        with open(path + '.json', 'w') as f:
+            json.dump({'consumers': consumers}, f)
+        with open(path, 'wb') as f:
+            f.truncate(controlBytes(slots, len(consumers)) + slots * slotBytes)
+        mapped = np.memmap(path, dtype=np.uint8, mode='r+')
+        control = mapped[:controlBytes(slots, len(consumers))].view(np.int64)
+        control[SLOTS], control[SLOTBYTES], control[CONSUMERS] = slots, slotBytes, len(consumers)
+        # ... no slot holds a chunk and all consumers released everything
+        control[headerFields:headerFields + slots] = -1
+        control[headerFields + slots:headerFields + slots + len(consumers)] = -1
+        del mapped
+        return cls(path)
+
+    def slot(self, sequence, dtype, shape):
+        start = self.dataOffset + (sequence % self.slots) * self.slotBytes
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        return self.map[start:start + nbytes].view(dtype).reshape(shape)
+
+    def statistics(self):
+        return {
+            'writes':           int(self.header[WRITES]),
+            'bytes':            int(self.header[BYTESWRITTEN]),
+            'overruns':         int(self.header[OVERRUNS]),
+            'fallbacks':        int(self.header[FALLBACKS]),
+            'seconds':          float(self.header[LASTWRITE] - self.header[FIRSTWRITE]) / 1e6,
+            'stale':            dict(zip(self.consumers, [int(stale) for stale in self.stale])),
+        }
+
+    def close(self):
+        self.header = self.sequences = self.released = self.stale = None
+        self.map = None
+
+
+def controlBytes(slots, consumers):
+    # ... slots start at a cache line boundary
+    return -(-(headerFields + slots + 2 * consumers) * 8 // 64) * 64
+
+
+class RingWriter(object):
+    '''
+        Publisher side of a ring, created on the first chunk with slots of
+        twice its size or of minimumSlotBytes, whichever is larger.
+    '''
+    def __init__(self, path, consumers, slots, timeout, minimumSlotBytes=0):
+        self.path = path
+        self.consumers = consumers
+        self.noofslots = slots
+        self.timeout = timeout
+        self.minimumSlotBytes = minimumSlotBytes
+        self.ring = None
+        self.sequence = 0
+
+    def write(self, data):
+        ''' A SharedChunk for data, or data itself when it does not fit in a slot. '''
+        if self.ring is None:
+            slotBytes = max(2 * max(data.nbytes, 1), self.minimumSlotBytes)
+            self.ring = ChunkRing.create(self.path, self.consumers, self.noofslots, -(-slotBytes // 64) * 64)
+        header = self.ring.header
+        if data.nbytes > self.ring.slotBytes:
+            header[FALLBACKS] += 1
+            return data
+
+        # ... wait until every consumer released the previous chunk in the slot
+        previous = self.sequence - self.ring.slots
+        if previous >= 0 and np.min(self.ring.released) < previous:
+            deadline = time.time() + self.timeout
+            while np.min(self.ring.released) < previous and time.time() < deadline:
+                time.sleep(0.0005)
+            if np.min(self.ring.released) < previous:
+                header[OVERRUNS] += 1
+
+        slot = self.sequence % self.ring.slots
+        self.ring.sequences[slot] = -1
+        self.ring.slot(self.sequence, data.dtype, data.shape)[...] = data
+        self.ring.sequences[slot] = self.sequence
+
+        now = int(time.time() * 1e6)
+        if header[WRITES] == 0:
+            header[FIRSTWRITE] = now
+        header[LASTWRITE] = now
+        header[WRITES] += 1
+        header[BYTESWRITTEN] += data.nbytes
+
+        chunk = SharedChunk(self.path, self.sequence, data.dtype.str, data.shape)
+        self.sequence += 1
+        return chunk
+
+
+class RingReader(object):
+    ''' Consumer side of a ring, consumer is the index of this consumer in the ring's list. '''
+    def __init__(self, path, name):
+        self.ring = ChunkRing(path)
+        if name not in self.ring.consumers:
+            raise ValueError('{0} is not a consumer of shared memory ring {1}'.format(name, path))
+        self.consumer = self.ring.consumers.index(name)
+
+    def read(self, chunk):
+        ''' Read-only view of the data of chunk. '''
+        view = self.ring.slot(chunk.sequence, chunk.dtype, chunk.shape)
+        view.flags.writeable = False
+        return view
+
+    def release(self, sequence):
+        ''' Release chunk sequence, returns False if it was overwritten while held. '''
+        current = self.ring.sequences[sequence % self.ring.slots] == sequence
+        if not current:
+            self.ring.stale[self.consumer] += 1
+        self.ring.released[self.consumer] = max(sequence, self.ring.released[self.consumer])
+        return current
+
+
+class SharedMemoryMixin(object):
+    '''
+        Mixin for processors taking part in the shared-memory transport.
+        Received SharedChunks are replaced by views before processData sees
+        them, and the keys in sharedMemoryKeys are published as SharedChunks.
+
+            sharedMemoryKeys:       {key: [consumer names]} of the keys to publish through shared memory
+            sharedMemorySlotBytes:  {key: bytes} minimum slot size per key, see SharedMemoryBoard
+            sharedMemoryDir:        directory of the ring files
+            sharedMemorySlots:      slots per ring
+            sharedMemoryHold:       chunks a consumer holds before releasing them
+            sharedMemoryTimeout:    seconds to wait for a consumer before overwriting its slot
+    '''
+    def __init__(self, *args, **kwargs):
+        super(SharedMemoryMixin, self).__init__(*args, **kwargs)
+        self.requiredParametersWithDefault(
+            sharedMemoryKeys=dict(),
+            sharedMemorySlotBytes=dict(),
+            sharedMemoryDir=defaultDirectory(),
+            sharedMemoryPrefix='soundannotator-{0}'.format(os.getpid()),
+            sharedMemorySlots=8,
+            sharedMemoryHold=2,
+            sharedMemoryTimeout=30,
+        )
+
+    def prerun(self):
+        super(SharedMemoryMixin, self).prerun()
+        self.ringWriters = dict((key, RingWriter(ringPath(self.config, self.name, key), consumers,
+            self.config['sharedMemorySlots'], self.config['sharedMemoryTimeout'], self.config['sharedMemorySlotBytes'].get(key, 0)))
+            for key, consumers in self.config['sharedMemoryKeys'].items())
+        self.ringReaders = dict()
+        self.held = collections.deque()
+
+    def processData(self, smartChunk):
+        received = []
+        for chunk in smartChunk.received.values():
+            if isinstance(chunk.data, SharedChunk):
+                reader = self.ringReaders.get(chunk.data.path)
+                if reader is None:
+                    reader = self.ringReaders[chunk.data.path] = RingReader(chunk.data.path, self.name)
+                received.append((reader, chunk.data.sequence))
+                chunk.data = reader.read(chunk.data)
+
+        try:
+            result = super(SharedMemoryMixin, self).processData(smartChunk)
+        finally:
+            self.held.append(received)
+            while len(self.held) > self.config['sharedMemoryHold']:
+                for reader, sequence in self.held.popleft():
+                    if not reader.release(sequence):
+                        self.logger.error('{0} was overrun, chunk {1} of {2} was overwritten while in use'.format(
+                            self.name, sequence, os.path.basename(reader.ring.path)))
+
+        return self.share(result)
+
+    def generateData(self):
+        return self.share(super(SharedMemoryMixin, self).generateData())
+
+    def share(self, result):
+        if not result:
+            return result
+        for key, writer in self.ringWriters.items():
+            if isinstance(result.get(key), np.ndarray):
+                result[key] = writer.write(np.ascontiguousarray(result[key]))
+                if not isinstance(result[key], SharedChunk) and writer.ring.header[FALLBACKS] == 1:
+                    self.logger.warning('{0} publishes {1} through the pipe: a chunk of {2} bytes does not fit in the slots of {3} bytes'.format(
+                        self.name, key, result[key].nbytes, writer.ring.slotBytes))
+        return result
+
+
+def ringPath(config, publisher, key):
+    return os.path.join(config['sharedMemoryDir'], '{0}-{1}-{2}'.format(config['sharedMemoryPrefix'], publisher, key))
+
+
+sharedClasses = dict()
+
+def sharedMemoryClass(cls):
+    '''
+        cls with the SharedMemoryMixin, registered in this module so the
+        class can be pickled when the board starts its process.
+    '''
+    if cls not in sharedClasses:
+        name = 'SharedMemory' + cls.__name__
+        shared = type(name, (SharedMemoryMixin, cls), {'__module__': __name__})
+        globals()[name] = shared
+        sharedClasses[cls] = shared
+    return sharedClasses[cls]
+
+
+class SharedMemoryBoard(object):
+    '''
+        Wraps a Board so processors started on it use the shared-memory
+        transport for the keys in layout, {publisher: {key: [consumers]}}.
+        slotBytes, {key: bytes}, sizes the slots for the largest chunks
+        expected, so larger chunks later in the run do not fall back to the
+        pipes. Anything else is passed on to the board.
+    '''
+    def __init__(self, board, layout, directory=None, slots=8, hold=2, timeout=30, slotBytes=None):
+        self.board = board
+        self.layout = layout
+        self.options = {
+            'sharedMemorySlotBytes': slotBytes or dict(),
+            'sharedMemoryDir':      directory or defaultDirectory(),
+            'sharedMemoryPrefix':   'soundannotator-{0}-{1}'.format(os.getpid(), int(time.time())),
+            'sharedMemorySlots':    slots,
+            'sharedMemoryHold':     hold,
+            'sharedMemoryTimeout':  timeout,
+        }
+
+    def startProcessor(self, name, cls, *subscriptionOrders, **kwargs):
+        kwargs.update(self.options)
+        kwargs['sharedMemoryKeys'] = self.layout.get(name, dict())
+        return self.board.startProcessor(name, sharedMemoryClass(cls), *subscriptionOrders, **kwargs)
+
+    def ringPaths(self):
+        return [(publisher, key, ringPath(self.options, publisher, key))
+            for publisher, keys in sorted(self.layout.items()) for key in sorted(keys)]
+
+    def report(self):
+        '''
+            Per ring '<publisher>.<key>' its counters, with the copies made per
+            chunk compared to the copies pickling through pipes would make.
+        '''
+        report = dict()
+        for publisher, key, path in self.ringPaths():
+            if not os.path.isfile(path):
+                continue
+            ring = ChunkRing(path)
+            statistics = ring.statistics()
+            ring.close()
+            chunks = statistics['writes'] + statistics['fallbacks']
+            statistics['copies_per_chunk'] = (statistics['writes'] + statistics['fallbacks'] * len(self.layout[publisher][key])) / float(max(chunks, 1))
+            statistics['pipe_copies_per_chunk'] = len(self.layout[publisher][key])
+            statistics['MB_per_s'] = statistics['bytes'] / 1e6 / statistics['seconds'] if statistics['seconds'] > 0 else float('nan')
+            report['{0}.{1}'.format(publisher, key)] = statistics
+        return report
+
+    def logReport(self, logger):
+        for ring, statistics in sorted(self.report().items()):
+            logger.info('Shared memory {0:<32} {1:6d} chunks {2:4.2f} copies/chunk (pipes: {3}) {4:8.1f} MB/s, {5} overruns, stale {6}'.format(
+                ring, statistics['writes'] + statistics['fallbacks'], statistics['copies_per_chunk'],
+                statistics['pipe_copies_per_chunk'], statistics['MB_per_s'], statistics['overruns'], statistics['stale']))
+
+    def removeRings(self):
+        for publisher, key, path in self.ringPaths():
+            for filename in [path, path + '.json']:
+                if os.path.isfile(filename):
+                    os.remove(filename)
+
+    def stopallprocessors(self):
+        self.board.stopallprocessors()
+        self.removeRings()
+
+    def __getattr__(self, name):
+        return getattr(self.board, name)
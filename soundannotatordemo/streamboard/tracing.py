@@ -0,0 +1,208 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Per chunk latency tracing through a board.
+
+    A ChunkTracer is a DrainMonitor listener which stamps every chunk
+    published by a watched stage with the time it was received. The stamps go
+    into a preallocated ring buffer, so tracing costs a few array assignments
+    per chunk per stage and memory use does not grow while a microphone
+    deployment keeps running. The buffer can be exported as Chrome
+    trace-event JSON (load it in chrome://tracing or Perfetto) together with
+    a summary of the latency percentiles.
+'''
+import json, time
+import numpy as np
+
+
+# Upstream stages in the processor chains of the use cases. A stage is
+# measured from the latest stamp of its upstream stages that are traced.
+standardUpstreams = {
+    'S2S_Rechunker':            ['S2S_SoundInput'],
+    'S2S_Resampler':            ['S2S_Rechunker', 'S2S_SoundInput'],
+    'S2S_TFProcessor':          ['S2S_Resampler', 'S2S_Rechunker', 'S2S_SoundInput'],
+    'S2S_StructureExtractor_F': ['S2S_TFProcessor'],
+    'S2S_StructureExtractor_S': ['S2S_TFProcessor'],
+    'S2S_StructureExtractor':   ['S2S_TFProcessor'],
+    'S2S_PTNE':                 ['S2S_TFProcessor', 'S2S_StructureExtractor_F', 'S2S_StructureExtractor_S', 'S2S_StructureExtractor', 'S2S_TractReplay'],
+    'S2S_FileWriter-PTNE':      ['S2S_PTNE'],
+    'S2S_FileWriter-Tracts':    ['S2S_TFProcessor', 'S2S_StructureExtractor_F', 'S2S_StructureExtractor_S', 'S2S_StructureExtractor'],
+}
+
+
+def ptneUpstreams(suffixes):
+    ''' standardUpstreams extended with the PTNE processors and writers named with suffixes. '''
+    upstreams = dict(standardUpstreams)
+    for suffix in suffixes:
+        upstreams['S2S_PTNE'+suffix] = standardUpstreams['S2S_PTNE']
+        upstreams['S2S_FileWriter-PTNE'+suffix] = ['S2S_PTNE'+suffix]
+    return upstreams
+
+percentiles = [50, 90, 99]
+
+
+class ChunkTracer(object):
+    '''
+        stages:         names of the traced stages in processing order, the
+                        first is the input stage
+        upstreams:      dict from stage name to its upstream stage names,
+                        defaults to standardUpstreams; stages missing from it
+                        are measured from the stage before them
+        capacity:       number of stamps kept in the ring buffer
+        tracefile:      if given, the trace is exported to this file every
+                        exportInterval seconds and by export()
+        exportInterval: seconds between periodic exports, None disables them
+        logger:         if given, the latency summary is logged on export
+    '''
+    def __init__(self, stages, upstreams=None, capacity=65536, tracefile=None, exportInterval=None, logger=None):
+        self.stages = list(stages)
+        self.stageIndex = dict((name, index) for index, name in enumerate(self.stages))
+
+        upstreams = standardUpstreams if upstreams is None else upstreams
+        self.upstreams = []
+        for index, name in enumerate(self.stages):
+            traced = [upstream for upstream in upstreams.get(name, []) if upstream in self.stageIndex]
+            if len(traced) == 0 and index > 0 and name not in upstreams:
+                traced = [self.stages[index - 1]]
+            self.upstreams.append([self.stageIndex[upstream] for upstream in traced])
+
+        self.capacity = capacity
+        self.stage = np.zeros(capacity, dtype=np.int16)
+        self.number = np.zeros(capacity, dtype=np.int64)
+        self.time = np.zeros(capacity, dtype=np.float64)
+        self.count = 0
+
+        self.tracefile = tracefile
+        self.exportInterval = exportInterval
+        self.logger = logger
+        self.lastExport = time.time()
+
+    def __call__(self, processorName, chunk, receivedAt):
+        index = self.stageIndex.get(processorName)
+        if index is None:
+            return
+
+        slot = self.count % self.capacity
+        self.stage[slot] = index
+        self.number[slot] = -1 if chunk.number is None else chunk.number
+        self.time[slot] = receivedAt
+        self.count += 1
+
+        if self.exportInterval is not None and receivedAt - self.lastExport > self.exportInterval:
+            self.export()
+
+    def records(self):
+        ''' Stage indices, chunk numbers and stamps in the buffer, oldest first. '''
+        if self.count <= self.capacity:
+            order = np.arange(self.count)
+        else:
+            order = np.roll(np.arange(self.capacity), -(self.count % self.capacity))
+        return self.stage[order], self.number[order], self.time[order]
+
+    def stampTable(self):
+        ''' Dict from chunk number to a list with per stage stamp or None. '''
+        table = dict()
+        for stage, number, stamp in zip(*self.records()):
+            if number < 0:
+                continue
+            stamps = table.setdefault(int(number), [None] * len(self.stages))
+            if stamps[stage] is None:
+                stamps[stage] = float(stamp)
+        return table
+
+    def upstreamStamp(self, stamps, stage):
+        available = [stamps[upstream] for upstream in self.upstreams[stage] if stamps[upstream] is not None]
+        return max(available) if len(available) > 0 else None
+
+    def summary(self):
+        '''
+            Per stage latency relative to its upstream stages and end-to-end
+            latency from the input stage to the last stage, as percentiles in ms.
+        '''
+        stageLatencies = [[] for _ in self.stages]
+        endToEnd = []
+        for stamps in self.stampTable().values():
+            for stage, stamp in enumerate(stamps):
+                if stamp is None:
+                    continue
+                upstream = self.upstreamStamp(stamps, stage)
+                if upstream is not None:
+                    stageLatencies[stage].append(stamp - upstream)
+            if stamps[0] is not None and stamps[-1] is not None:
+                endToEnd.append(stamps[-1] - stamps[0])
+
+        summary = {'stages': dict(), 'end_to_end_ms': latencyPercentiles(endToEnd), 'stamps': min(self.count, self.capacity)}
+        for name, latencies in zip(self.stages, stageLatencies):
+            summary['stages'][name] = latencyPercentiles(latencies)
+        return summary
+
+    def chromeTrace(self):
+        '''
+            The buffer as Chrome trace events: one lane (tid) per stage and
+            per chunk a complete event spanning from the upstream stamp to the
+            stamp of the stage.
+        '''
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': index, 'args': {'name': name}}
+                  for index, name in enumerate(self.stages)]
+
+        table = self.stampTable()
+        for number in sorted(table):
+            stamps = table[number]
+            for stage, stamp in enumerate(stamps):
+                if stamp is None:
+                    continue
+                upstream = self.upstreamStamp(stamps, stage)
+                start = stamp if upstream is None else upstream
+                events.append({'name': 'chunk {0}'.format(number), 'cat': self.stages[stage], 'ph': 'X',
+                               'pid': 0, 'tid': stage, 'ts': start * 1e6, 'dur': (stamp - start) * 1e6,
+                               'args': {'number': number}})
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'summary': self.summary()}}
+
+    def export(self, tracefile=None):
+        ''' Write the Chrome trace to tracefile (or self.tracefile) and log the summary. '''
+        self.lastExport = time.time()
+        tracefile = self.tracefile if tracefile is None else tracefile
+        trace = self.chromeTrace()
+
+        if tracefile is not None:
+            with open(tracefile, 'w') as f:
+                json.dump(trace, f)
+
+        if self.logger is not None:
+            endToEnd = trace['otherData']['summary']['end_to_end_ms']
+            if endToEnd is not None:
+                self.logger.info('End-to-end latency over {0} chunks: p50 {1:.1f} ms, p90 {2:.1f} ms, p99 {3:.1f} ms, max {4:.1f} ms'.format(
+                    endToEnd['count'], endToEnd['p50'], endToEnd['p90'], endToEnd['p99'], endToEnd['max']))
+
+        return trace
+
+
+def latencyPercentiles(latencies):
+    if len(latencies) == 0:
+        return None
+    latencies = 1000.0 * np.asarray(latencies)
+    summary = dict(('p{0}'.format(p), float(value)) for p, value in zip(percentiles, np.percentile(latencies, percentiles)))
+    summary['max'] = float(latencies.max())
+    summary['count'] = int(latencies.size)
+    return summary
@@ -0,0 +1,210 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Helpers shared by the use case entry points.
+'''
+import os, re, sys
+
+from soundannotatordemo.calibration     import cache as calibrationcache
+from soundannotatordemo.calibration     import calibrator
+from soundannotatordemo.config          import argparser
+
+from libsoundannotator.streamboard.subscription     import SubscriptionOrder
+from libsoundannotator.cpsp                         import structureProcessor
+
+
+def argumentsFromCommandLine(entrypoint):
+    '''
+        The args dict for the use case module defining entrypoint, defaults
+        come from ~/.sa/<module>_settings.py or else from the
+        <module>_settings.py next to the module.
+    '''
+    return argparser.getArgumentDict(' '.join(sys.argv), pypath=argparser.abspathFromMethod(entrypoint))
+
+def prepareDirectories(args):
+    for key in ['logdir', 'outdir']:
+        if not os.path.isdir(args[key]):
+            os.makedirs(args[key])
+
+def ensureCalibration(args):
+    '''
+        Make sure a calibration cache exists for the parameters in args and
+        set args['cachename']. With args['calibrate'] the calibration is
+        redone even if a cache exists. Exits when calibration fails.
+    '''
+    args['cachename'] = calibrationcache.cacheName(args)
+    if args.get('calibrate') or not calibrationcache.isCalibrated(args):
+        if not calibrator.calibrate(args):
+            sys.exit('Calibration did not finish within {0} seconds'.format(args['draintimeout']))
+
+def chunkMetadata(args):
+    ''' args without None values, fit for propagating along with the chunks. '''
+    return dict((key, value) for key, value in args.items() if value is not None)
+
+def offlineChunkSize(args):
+    '''
+        Samples per block for args['offlineblock'] seconds, a whole number of
+        frames after resampling and the filterbank's decimation.
+    '''
+    frame = args['decimation'] * args['samplesperframe']
+    return max(1, int(args['offlineblock'] * args['inputrate']) // frame) * frame
+
+def adaptiveChunkBounds(args):
+    '''
+        Smallest and largest chunk size in samples for adaptive chunk sizing,
+        from args['minchunksize'] and args['maxchunksize'] or else 0.05 s and
+        2 s, and the quantum they are a multiple of: the input samples of one
+        cochleogram frame.
+    '''
+    quantum = args['decimation'] * args['samplesperframe']
+    minimum = args.get('minchunksize') or int(0.05 * args['inputrate'])
+    maximum = args.get('maxchunksize') or int(2.0 * args['inputrate'])
+    minimum = max(1, int(round(float(minimum) / quantum))) * quantum
+    maximum = max(minimum, int(maximum) // quantum * quantum)
+    return minimum, maximum, quantum
+
+def ptneConfigurations(args):
+    '''
+        The PTNE configurations computed from one cochleogram, as dicts with
+        the suffix of their processor and output directory, blockwidth and
+        split. args['ptneconfigs'] lists them separated by ';', each as
+        name:blockwidth or name:blockwidth:split, e.g.
+            'fine:0.01;coarse:1.0:[5,50,95]'
+        the split defaults to args['ptnsplit']. Without args['ptneconfigs']
+        there is one configuration with suffix '' from args['ptnblockwidth']
+        and args['ptnsplit'].
+    '''
+    if not args.get('ptneconfigs'):
+        return [{'suffix': '', 'blockwidth': args['ptnblockwidth'], 'split': eval(args['ptnsplit'])}]
+
+    configurations = []
+    for description in args['ptneconfigs'].split(';'):
+        fields = description.strip().split(':')
+        if len(fields) not in (2, 3) or re.match(r'^[A-Za-z0-9_.]+$', fields[0]) is None:
+            raise ValueError('Invalid PTNE configuration {0!r}, expected name:blockwidth[:split]'.format(description))
+        configurations.append({
+            'suffix': '-'+fields[0],
+            'blockwidth': float(fields[1]),
+            'split': eval(fields[2] if len(fields) == 3 else args['ptnsplit']),
+        })
+    suffixes = [configuration['suffix'] for configuration in configurations]
+    if len(set(suffixes)) != len(suffixes):
+        raise ValueError('PTNE configuration names should be unique: {0}'.format(args['ptneconfigs']))
+    return configurations
+
+def ptnePyramid(args, configuration):
+    '''
+        The coarser levels of the PTNE pyramid of configuration as dicts with
+        the suffix of their processor and output directory and their
+        blockwidth: args['ptnepyramid'] levels, each args['ptnepyramidfactor']
+        times as wide as the one before. The levels are built from the
+        published blocks by vectorizedptn.PTNEAggregator, for every engine.
+    '''
+    if (args.get('ptnepyramid') or 0) > 0 and args['ptnepyramidfactor'] < 2:
+        raise ValueError('The PTNE pyramid factor should be at least 2, not {0}'.format(args['ptnepyramidfactor']))
+    levels = []
+    factor = 1
+    for level in range(args.get('ptnepyramid') or 0):
+        factor *= args['ptnepyramidfactor']
+        levels.append({
+            'suffix': configuration['suffix']+'-x{0}'.format(factor),
+            'blockwidth': configuration['blockwidth']*factor,
+        })
+    return levels
+
+def checkPTNEArguments(args):
+    ''' Raises ValueError if the PTNE configurations or pyramid can not be started. '''
+    for configuration in ptneConfigurations(args):
+        ptnePyramid(args, configuration)
+
+def sharedMemoryLayout(args, cacheWriter=False):
+    '''
+        The keys of the processing chain with large chunks and their
+        consumers, for streamboard.sharedmemory.SharedMemoryBoard. With
+        cacheWriter the cochleogram is also consumed by the writer filling
+        the cochleogram cache.
+    '''
+    tracts = ['S2S_PTNE'+configuration['suffix'] for configuration in ptneConfigurations(args)] + ['S2S_FileWriter-Tracts']
+    if args['decimation'] > 1:
+        layout = {'S2S_Resampler': {'timeseries': ['S2S_TFProcessor']}}
+    else:
+        layout = {'S2S_SoundInput': {'sound': ['S2S_TFProcessor']}}
+    fExtractor, sExtractor = structureExtractors(args)
+    layout['S2S_TFProcessor'] = {'E': tracts, 'EdB': sorted(set([fExtractor, sExtractor]))}
+    if cacheWriter:
+        layout['S2S_TFProcessor'] = dict((key, consumers + ['S2S_FileWriter-CochleogramCache'])
+            for key, consumers in layout['S2S_TFProcessor'].items())
+    layout.setdefault(fExtractor, dict())['f_tract'] = tracts
+    layout.setdefault(sExtractor, dict())['s_tract'] = tracts
+    return layout
+
+def sharedMemorySlotBytes(args, chunkSize):
+    '''
+        Slot sizes for the keys of sharedMemoryLayout which hold the chunks
+        following from input chunks of at most chunkSize samples, with one
+        sample or frame to spare and at most 8 bytes per value.
+    '''
+    samples = chunkSize // args['decimation'] + 1
+    frames = chunkSize // (args['decimation'] * args['samplesperframe']) + 1
+    slotBytes = {'sound': (chunkSize + 1) * 8, 'timeseries': samples * 8}
+    for key in ['E', 'EdB', 'f_tract', 's_tract']:
+        slotBytes[key] = args['noofscales'] * frames * 8
+    return slotBytes
+
+def structureExtractors(args, suffix=''):
+    ''' The names of the processors publishing 'f_tract' and 's_tract'. '''
+    if args.get('fusedstructure'):
+        return 'S2S_StructureExtractor'+suffix, 'S2S_StructureExtractor'+suffix
+    return 'S2S_StructureExtractor_F'+suffix, 'S2S_StructureExtractor_S'+suffix
+
+def startStructureExtraction(b, args, SampleRate, suffix='', tfProcessor=None, tfKey='EdB'):
+    '''
+        Start structure extraction on the tfKey published by tfProcessor, by
+        default 'S2S_TFProcessor'+suffix, and return the names of the
+        processors publishing 'f_tract' and 's_tract', see structureExtractors.
+    '''
+    if tfProcessor is None:
+        tfProcessor='S2S_TFProcessor'+suffix
+    fExtractor, sExtractor = structureExtractors(args, suffix)
+
+    #   textureTypes=['f']   'f' is oriented center surround ratio's in the frame direction => high for pulses
+    #   textureTypes=['s']   's' is oriented center surround ratio's in the scale direction => high for tones
+    #   SampleRate : sample frequency of incoming signal
+    #   noofscales: number of different frequencies used in incoming TF-representation
+    #   cachename : name of the file containing the calculated calibration parameters 
+    if args.get('fusedstructure'):
+        # One extractor receives and preprocesses every chunk once and publishes both tracts
+        textureTypes=[(fExtractor, ['f','s'])]
+    else:
+        textureTypes=[(fExtractor, ['f']), (sExtractor, ['s'])]
+
+    for name, types in textureTypes:
+        b.startProcessor(name,
+                          structureProcessor.structureProcessor,
+                          SubscriptionOrder(tfProcessor,name,tfKey,'TSRep'),
+                          noofscales=args['noofscales'],
+                          cachename=args['cachename'],
+                          textureTypes=types,
+                          SampleRate=SampleRate)
+
+    return fExtractor, sExtractor
@@ -0,0 +1,315 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Microphone use case of the libsoundannotator software.
+
+    Sound recorded from a microphone is processed into PTNE features. The
+    console script soundannotator-microphone runs it with the parameters
+    from the command line, e.g.
+
+        soundannotator-microphone --microphone USB --location garden
+
+    defaults come from microphone_settings.py, which can be overridden by a
+    copy in ~/.sa.
+'''
+import multiprocessing
+import numpy as np
+
+# signal is used to handle keyboard interrupts, in this case ^C^C which is used to stop the board using sys.exit.
+import signal, sys
+import time,  os, glob
+
+# Streamboard architecture
+from libsoundannotator.streamboard.board                            import Board
+from libsoundannotator.streamboard.continuity                       import Continuity
+from libsoundannotator.streamboard.subscription                     import SubscriptionOrder
+
+# Streamboard processors
+from libsoundannotator.streamboard.processors.input                 import mic_callback as mic
+from libsoundannotator.cpsp                                         import tfprocessor               
+
+from soundannotatordemo.streamboard.processors.output.drainingfileout import DrainingFileOutputProcessor
+from soundannotatordemo.cpsp.batchedtf                              import BatchedGCFBProcessor
+from soundannotatordemo.cpsp.fastresampler                          import resamplerFor
+from soundannotatordemo.cpsp.vectorizedptn                          import ptneFor
+from soundannotatordemo.streamboard                                 import drain
+from soundannotatordemo.streamboard                                 import tracing
+from soundannotatordemo.streamboard.adaptive                        import AdaptiveRechunker, LagProbe
+
+
+# Version info generated for this build
+from  soundannotatordemo.config import runtimeMetaData
+
+# File information management
+from libsoundannotator.io.annotations                   import FileAnnotation
+
+# Command line handling and calibration shared between use cases
+from soundannotatordemo.usecases                        import common
+
+def run(args):
+    '''
+        Process the sound recorded by args['microphone'] until stopped with ^C.
+        The structure extractors need a calibration cache, see
+        common.ensureCalibration.
+    '''
+    # Main should initialize logging for multiprocessing package
+    logger = multiprocessing.log_to_stderr()
+    logger.setLevel(args['loglevel'])
+    
+    # Create the board from which all processes will be created
+    b = Board(loglevel=args['loglevel'], logdir=args['logdir'], logfile='soundAnnotator') 
+
+    # ... and add the ability to stop it manually in a neat way.
+    def stopallboards(dummy1='1',dummy2='2'):
+        b.stopallprocessors()
+        time.sleep(1)
+        sys.exit('')
+
+    signal.signal(signal.SIGINT, stopallboards)
+
+
+    # In adaptive mode the microphone is read in small chunks, which the rechunker joins into chunks 
+    # of a size adapted to the lag measured at S2S_PTNE.
+    if args['adaptivechunks']:
+        minChunkSize, maxChunkSize, quantum = common.adaptiveChunkBounds(args)
+        sharedLag = multiprocessing.Value('d', 0.0)
+
+    # Generate input from the microphone
+    b.startProcessor('S2S_SoundInput', mic.MicInputProcessor,
+        SampleRate=args['inputrate'],
+        ChunkSize=minChunkSize if args['adaptivechunks'] else args['chunksize'],
+        Microphone=args['microphone'],
+        nChannels = 1,
+        source_id=args['location'],
+    )
+
+    if args['adaptivechunks']:
+        b.startProcessor('S2S_Rechunker', AdaptiveRechunker,
+            SubscriptionOrder('S2S_SoundInput','S2S_Rechunker','sound','sound'),
+            SampleRate=args['inputrate'],
+            ChunkSize=args['chunksize'],
+            sharedLag=sharedLag,
+            target=args['latencytarget'],
+            minimum=minChunkSize,
+            maximum=maxChunkSize,
+            quantum=quantum,
+        )
+        soundProcessor='S2S_Rechunker'
+    else:
+        soundProcessor='S2S_SoundInput'
+
+    if args['decimation'] > 1:
+        
+        # Start resampling. 
+        #   KaiserBeta=5      : Kaiser window beta
+        #   FilterLength=60   : Length lowpass filter
+        #   DecimateFactor=5  : Target decimation factor
+        #   SampleRate:         sampling frequency
+        #   dTypeIn:            numerical format incoming samples
+        #   dTypeOut:           numerical format outgoing samples
+        
+        myOrder=SubscriptionOrder(soundProcessor,'S2S_Resampler','sound','timeseries')
+       
+        resamplerClass, resamplerOptions=resamplerFor(args)
+        b.startProcessor('S2S_Resampler', resamplerClass, myOrder,
+            SampleRate=args['inputrate'],
+            FilterLength=1000,
+            DecimateFactor = args['decimation'],
+            dTypeIn=np.complex64,
+            dTypeOut=np.complex64,
+            **resamplerOptions
+        )
+        myTFProcessorSubscriptionOrder=SubscriptionOrder('S2S_Resampler','S2S_TFProcessor','timeseries','timeseries')
+    else:
+        myTFProcessorSubscriptionOrder=SubscriptionOrder(soundProcessor,'S2S_TFProcessor', 'sound','timeseries')
+        
+
+    # Resampling changed the sampling frequency, so processor taking data from the Resampler need to use the following sampling frequency
+    InternalRate=args['inputrate']/args['decimation']
+
+    # The gammachirp filterbank will do a further decimation. As we only keep the complex amplitude we effectively
+    # do a kind of conversion to a lower frequency. This is not fully developed theoretically but it seems to work 
+    # for small decimations. (Note "frame" is not proper terminology, but used here for historical reason.)  
+    samplesPerFrame=args['samplesperframe']
+    InternalRate2=InternalRate/samplesPerFrame
+
+    
+    # Start cochleogram calculation 
+    #   Input parameters:
+    #       SampleRate:         sampling frequency
+    #       dTypeIn:            numerical format incoming samples
+    #   Output parameters:
+    #       dTypeOut:           numerical format outgoing samples
+    #       samplesPerFrame=samplesPerFrame  : decimation factor 
+    #   TF-Processing parameters
+    #       fmin=40,            : lowest frequency used in TF analysis
+    #       fmax=InternalRate/2 : highest frequency used in TF analysis
+    #       nseg=args['noofscales']    : number of different frequenccies used
+    #       scale='ERBScale':  'loglin' or 'ERB' equivalent rectangular bandwidth
+    #   Parameter storage (obsolete but working):
+    #       baseOutputDir=args['outdir'] : location where GCFBProcessor parameters will be saved
+    #       globalOutputPathModifier : modifies location where GCFBProcessor parameters will be saved based on GIT commit sha
+    #   metadata:   anything the developer deems relevant to propagate      
+    if args.get('batchedtf'):
+        # The batched gammachirp filterbank, here for a single source, publishes the same keys
+        b.startProcessor('S2S_TFProcessor', BatchedGCFBProcessor, myTFProcessorSubscriptionOrder,
+            sources=[''],
+            SampleRate=InternalRate,
+            fmin=40,
+            fmax=InternalRate/2,
+            nseg=args['noofscales'],
+            samplesPerFrame=samplesPerFrame,
+        )
+    else:
+        b.startProcessor('S2S_TFProcessor', tfprocessor.GCFBProcessor, myTFProcessorSubscriptionOrder,
+            SampleRate=InternalRate,
+            fmin=40,
+            fmax=InternalRate/2,
+            nseg=args['noofscales'],
+            samplesPerFrame=samplesPerFrame,
+            scale='ERBScale',
+            baseOutputDir=args['outdir'],
+            globalOutputPathModifier=runtimeMetaData.outputPathModifier,
+            dTypeIn=np.complex64,
+            dTypeOut=np.complex64,
+            metadata=common.chunkMetadata(args),
+        )
+
+
+    # Streamboard feature extraction, pulses ('f_tract') and tones ('s_tract')
+    fExtractor, sExtractor = common.startStructureExtraction(b, args, InternalRate2)
+
+    # Start calculation of PTNE featuress 
+    #       featurenames        : subset of ['pulse','tone','noise','energy'],
+    #       noofscales          : number of frequencies in incoming TF -representation
+    #       split               : string specifying boundary between frequency bands used in creating blocks
+    #       SampleRate          : input sampling frequency
+    #       blockwidth          : timeinterval included in calculation of a block
+    #       ptnreferencevalue   : value subtracted from the range compressed E before publishing
+    ptneClass, ptneOptions=ptneFor(args)
+    b.startProcessor('S2S_PTNE',ptneClass,
+            SubscriptionOrder('S2S_TFProcessor','S2S_PTNE','E','E'),
+            SubscriptionOrder(fExtractor,'S2S_PTNE','f_tract','f_tract'),
+            SubscriptionOrder(sExtractor,'S2S_PTNE','s_tract','s_tract'),
+            featurenames=['pulse','tone','noise','energy'],
+            noofscales=args['noofscales'],
+            split=eval(args['ptnsplit']),
+            SampleRate=InternalRate2,
+            blockwidth=args['ptnblockwidth'],
+            ptnreferencevalue = args['ptnreferencevalue'],
+            **ptneOptions
+        )
+
+
+
+    # Start writing PTNE  features to file
+    b.startProcessor("S2S_FileWriter-PTNE", DrainingFileOutputProcessor,
+            SubscriptionOrder('S2S_PTNE','S2S_FileWriter-PTNE','energy','energy'),
+            SubscriptionOrder('S2S_PTNE','S2S_FileWriter-PTNE','pulse','pulse'),
+            SubscriptionOrder('S2S_PTNE','S2S_FileWriter-PTNE','noise','noise'),
+            SubscriptionOrder('S2S_PTNE','S2S_FileWriter-PTNE','tone','tone'),
+            outdir=os.path.join(args['outdir'],runtimeMetaData.outputPathModifier+'-'+args['runname'],'ptne'),
+            SampleRate=1.0/args['ptnblockwidth'],
+            maxFileSize=args['maxFileSize'],
+            datatype = 'float32',
+            requiredKeys=['pulse','tone','noise','energy'],
+            usesource_id=True,
+            source_processor='S2S_SoundInput',
+            acknowledgeChunks=args['tracing'],
+            #location='undetermined location',
+        )
+
+    # Start writing tract features and cochleogram to file
+    # ... a second file writer is needed because PTNE publishes at another rate then the preceding processors.
+    '''
+    b.startProcessor("S2S_FileWriter-Tracts", DrainingFileOutputProcessor,
+            SubscriptionOrder('S2S_TFProcessor','S2S_FileWriter-Tracts','E','E'),
+            SubscriptionOrder(fExtractor,'S2S_FileWriter-Tracts','f_tract','f_tract'),
+            SubscriptionOrder(sExtractor,'S2S_FileWriter-Tracts','s_tract','s_tract'),
+            outdir=os.path.join(args['outdir'],runtimeMetaData.outputPathModifier+'-'+args['runname'],'tracts'),
+            SampleRate=InternalRate2,
+            maxFileSize=args['maxFileSize'],
+            datatype = 'float32',
+            requiredKeys=['E','f_tract','s_tract'],
+            usesource_id=False,
+            source_processor='S2S_SoundInput',
+            metadata=args,
+        )
+    '''
+       
+
+    # ========= Code monitoring for spotting the termination condition and initiating subsequent clean-up =======
+    
+    # Every stage acknowledges the chunk with the termination continuity, the drain monitor 
+    # waits until all of them did so, and logs how long each stage took to drain.
+    monitor=drain.DrainMonitor(b, logger)
+    # With tracing on, stages are also watched for the sole purpose of stamping their chunks
+    if args['tracing']:
+        monitor.watch('S2S_SoundInput')
+        if args['adaptivechunks']:
+            monitor.watch('S2S_Rechunker')
+        if args['decimation'] > 1:
+            monitor.watch('S2S_Resampler')
+    monitor.watch('S2S_TFProcessor')
+    for extractor in sorted(set(common.structureExtractors(args))):
+        monitor.watch(extractor)
+    monitor.watch('S2S_PTNE')
+    monitor.watch('S2S_FileWriter-PTNE','written' if args['tracing'] else 'drained')
+
+    # Stamp every chunk seen by the monitor, the trace is exported periodically and once more at the end.
+    if args['tracing']:
+        tracer=tracing.ChunkTracer([stage.processorName for stage in monitor.stages],
+            tracefile=args['tracefile'],
+            exportInterval=60,
+            logger=logger)
+        monitor.addListener(tracer)
+    else:
+        tracer=None
+
+    # The lag of the chunks arriving at S2S_PTNE steers the chunk size of the rechunker
+    if args['adaptivechunks']:
+        monitor.addListener(LagProbe(['S2S_PTNE'], sharedLag))
+
+    # Wait until all processors finished their business and stop them all.
+    print('====================Let processors finish unfinished business====================')
+    monitor.wait(timeout=args['draintimeout'])
+    if tracer is not None:
+        tracer.export()
+    print('====================Wake up and exit====================')
+    b.stopallprocessors()
+    
+
+
+def main():
+    # Console entry point soundannotator-microphone, all parameters come from the command line and settings files.
+    args = common.argumentsFromCommandLine(main)
+    common.prepareDirectories(args)
+    common.ensureCalibration(args)
+    if args['calibrate']:
+        return
+
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
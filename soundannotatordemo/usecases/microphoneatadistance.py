@@ -0,0 +1,446 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Microphone at a distance use case of the libsoundannotator software.
+
+    The microphone machine sends its sound over the network to a server,
+    which processes it into PTNE features. The console script
+    soundannotator-remote runs either side with the parameters from the
+    command line, e.g.
+
+        soundannotator-remote --role server --server 192.168.1.10:5000
+        soundannotator-remote --role microphone --server 192.168.1.10:5000 --location garden
+
+    With --role fanin the server accepts up to --maxsources microphones on
+    the same port, each processed by its own chain writing to its own
+    directory.
+
+    Defaults come from microphoneatadistance_settings.py, which can be
+    overridden by a copy in ~/.sa.
+'''
+import multiprocessing
+import numpy as np
+
+# signal is used to handle keyboard interrupts, in this case ^C^C which is used to stop the board using sys.exit.
+import signal, sys
+import time,  os, glob, re
+
+# Streamboard architecture
+from libsoundannotator.streamboard.board                            import Board
+from libsoundannotator.streamboard.continuity                       import Continuity
+from libsoundannotator.streamboard.subscription                     import SubscriptionOrder
+
+# Streamboard processors
+from libsoundannotator.streamboard.processors.input                 import mic_callback as mic
+
+from libsoundannotator.cpsp                                         import tfprocessor               
+
+from soundannotatordemo.streamboard.processors.output.drainingfileout import DrainingFileOutputProcessor
+from soundannotatordemo.streamboard.processors.output.networkout    import NetworkSenderProcessor
+from soundannotatordemo.streamboard.processors.input.networkin      import NetworkReceiverProcessor, QueueReceiverProcessor
+from soundannotatordemo.streamboard.network.fanin                   import FanInServer
+from soundannotatordemo.cpsp.batchedtf                              import BatchedGCFBProcessor
+from soundannotatordemo.cpsp.fastresampler                          import resamplerFor
+from soundannotatordemo.cpsp.vectorizedptn                          import ptneFor
+from soundannotatordemo.streamboard                                 import drain
+from soundannotatordemo.streamboard                                 import tracing
+
+
+# Version info generated for this build
+from  soundannotatordemo.config import runtimeMetaData
+
+# File information management
+from libsoundannotator.io.annotations                   import FileAnnotation
+
+# Command line handling and calibration shared between use cases
+from soundannotatordemo.usecases                        import common
+
+def startResampler(b, args, suffix=''):
+    '''
+        Start resampling the sound published by 'S2S_SoundInput'+suffix, returns
+        the processor and key publishing the timeseries for the TF-processor.
+    '''
+    if args['decimation'] > 1:
+        
+        # Start resampling. 
+        #   KaiserBeta=5      : Kaiser window beta
+        #   FilterLength=60   : Length lowpass filter
+        #   DecimateFactor=5  : Target decimation factor
+        #   SampleRate:         sampling frequency
+        #   dTypeIn:            numerical format incoming samples
+        #   dTypeOut:           numerical format outgoing samples
+        myOrder=SubscriptionOrder('S2S_SoundInput'+suffix,'S2S_Resampler'+suffix,'sound','timeseries')
+        
+        resamplerClass, resamplerOptions=resamplerFor(args)
+        b.startProcessor('S2S_Resampler'+suffix, resamplerClass, myOrder,
+            SampleRate=args['inputrate'],
+            FilterLength=1000,
+            DecimateFactor = args['decimation'],
+            dTypeIn=np.complex64,
+            dTypeOut=np.complex64,
+            **resamplerOptions
+        )
+        return 'S2S_Resampler'+suffix, 'timeseries'
+    else:
+        return 'S2S_SoundInput'+suffix, 'sound'
+
+
+def startProcessingChain(b, args, suffix='', location=None):
+    '''
+        Start the processing of the sound published by 'S2S_SoundInput'+suffix,
+        all processors started are named with the same suffix. With location
+        given the results are written to a subdirectory for that location.
+    '''
+    sender, senderKey = startResampler(b, args, suffix)
+    myTFProcessorSubscriptionOrder=SubscriptionOrder(sender,'S2S_TFProcessor'+suffix,senderKey,'timeseries')
+
+    # Resampling changed the sampling frequency, so processor taking data from the Resampler need to use the following sampling frequency
+    InternalRate=args['inputrate']/args['decimation']
+
+    # The gammachirp filterbank will do a further decimation. As we only keep the complex amplitude we effectively
+    # do a kind of conversion to a lower frequency. This is not fully developed theoretically but it seems to work 
+    # for small decimations. (Note "frame" is not proper terminology, but used here for historical reason.)  
+    samplesPerFrame=args['samplesperframe']
+
+    
+    # Start cochleogram calculation 
+    #   Input parameters:
+    #       SampleRate:         sampling frequency
+    #       dTypeIn:            numerical format incoming samples
+    #   Output parameters:
+    #       dTypeOut:           numerical format outgoing samples
+    #       samplesPerFrame=samplesPerFrame  : decimation factor 
+    #   TF-Processing parameters
+    #       fmin=40,            : lowest frequency used in TF analysis
+    #       fmax=InternalRate/2 : highest frequency used in TF analysis
+    #       nseg=args['noofscales']    : number of different frequenccies used
+    #       scale='ERBScale':  'loglin' or 'ERB' equivalent rectangular bandwidth
+    #   Parameter storage (obsolete but working):
+    #       baseOutputDir=args['outdir'] : location where GCFBProcessor parameters will be saved
+    #       globalOutputPathModifier : modifies location where GCFBProcessor parameters will be saved based on GIT commit sha
+    if args.get('batchedtf'):
+        # The batched gammachirp filterbank, here for a single source, publishes the same keys
+        b.startProcessor('S2S_TFProcessor'+suffix, BatchedGCFBProcessor, myTFProcessorSubscriptionOrder,
+            sources=[''],
+            SampleRate=InternalRate,
+            fmin=40,
+            fmax=InternalRate/2,
+            nseg=args['noofscales'],
+            samplesPerFrame=samplesPerFrame,
+        )
+    else:
+        b.startProcessor('S2S_TFProcessor'+suffix, tfprocessor.GCFBProcessor, myTFProcessorSubscriptionOrder,
+            SampleRate=InternalRate,
+            fmin=40,
+            fmax=InternalRate/2,
+            nseg=args['noofscales'],
+            samplesPerFrame=samplesPerFrame,
+            scale='ERBScale',
+            baseOutputDir=args['outdir'],
+            globalOutputPathModifier=runtimeMetaData.outputPathModifier,
+            dTypeIn=np.complex64,
+            dTypeOut=np.complex64,
+        )
+
+    startFeatureExtraction(b, args, suffix, location)
+
+
+def startFeatureExtraction(b, args, suffix='', location=None, tfProcessor=None, tfKeySuffix=''):
+    '''
+        Start structure extraction, PTNE and the writers on the cochleogram 
+        published under 'E'+tfKeySuffix and 'EdB'+tfKeySuffix by tfProcessor,
+        by default 'S2S_TFProcessor'+suffix.
+    '''
+    if tfProcessor is None:
+        tfProcessor='S2S_TFProcessor'+suffix
+
+    resultsdir=os.path.join(args['outdir'],runtimeMetaData.outputPathModifier+'-'+args['runname'])
+    if location is not None:
+        resultsdir=os.path.join(resultsdir,location)
+
+    InternalRate2=args['inputrate']/args['decimation']/args['samplesperframe']
+
+    # Streamboard feature extraction, pulses ('f_tract') and tones ('s_tract')
+    fExtractor, sExtractor = common.startStructureExtraction(b, args, InternalRate2, suffix, tfProcessor, 'EdB'+tfKeySuffix)
+
+    # Start calculation of PTNE featuress 
+    #       featurenames        : subset of ['pulse','tone','noise','energy'],
+    #       noofscales          : number of frequencies in incoming TF -representation
+    #       split               : string specifying boundary between frequency bands used in creating blocks
+    #       SampleRate          : input sampling frequency
+    #       blockwidth          : timeinterval included in calculation of a block
+    #       ptnreferencevalue   : value subtracted from the range compressed E before publishing
+    ptneClass, ptneOptions=ptneFor(args)
+    b.startProcessor('S2S_PTNE'+suffix,ptneClass,
+            SubscriptionOrder(tfProcessor,'S2S_PTNE'+suffix,'E'+tfKeySuffix,'E'),
+            SubscriptionOrder(fExtractor,'S2S_PTNE'+suffix,'f_tract','f_tract'),
+            SubscriptionOrder(sExtractor,'S2S_PTNE'+suffix,'s_tract','s_tract'),
+            featurenames=['pulse','tone','noise','energy'],
+            noofscales=args['noofscales'],
+            split=eval(args['ptnsplit']),
+            SampleRate=InternalRate2,
+            blockwidth=args['ptnblockwidth'],
+            ptnreferencevalue = args['ptnreferencevalue'],
+            **ptneOptions
+        )
+
+
+
+    # Start writing PTNE  features to file
+    b.startProcessor("S2S_FileWriter-PTNE"+suffix, DrainingFileOutputProcessor,
+            SubscriptionOrder('S2S_PTNE'+suffix,'S2S_FileWriter-PTNE'+suffix,'energy','energy'),
+            SubscriptionOrder('S2S_PTNE'+suffix,'S2S_FileWriter-PTNE'+suffix,'pulse','pulse'),
+            SubscriptionOrder('S2S_PTNE'+suffix,'S2S_FileWriter-PTNE'+suffix,'noise','noise'),
+            SubscriptionOrder('S2S_PTNE'+suffix,'S2S_FileWriter-PTNE'+suffix,'tone','tone'),
+            outdir=os.path.join(resultsdir,'ptne'),
+            SampleRate=1.0/args['ptnblockwidth'],
+            maxFileSize=args['maxFileSize'],
+            datatype = 'float32',
+            requiredKeys=['pulse','tone','noise','energy'],
+            usesource_id=True,
+            source_processor='S2S_SoundInput'+suffix,
+            acknowledgeChunks=args['tracing'],
+        )
+
+    # Start writing tract features and cochleogram to file
+    # ... a second file writer is needed because PTNE publishes at another rate then the preceding processors.
+    '''
+    b.startProcessor("S2S_FileWriter-Tracts"+suffix, DrainingFileOutputProcessor,
+            SubscriptionOrder(tfProcessor,'S2S_FileWriter-Tracts'+suffix,'E'+tfKeySuffix,'E'),
+            SubscriptionOrder(fExtractor,'S2S_FileWriter-Tracts'+suffix,'f_tract','f_tract'),
+            SubscriptionOrder(sExtractor,'S2S_FileWriter-Tracts'+suffix,'s_tract','s_tract'),
+            outdir=os.path.join(resultsdir,'tracts'),
+            SampleRate=InternalRate2,
+            maxFileSize=args['maxFileSize'],
+            datatype = 'float32',
+            requiredKeys=['E','f_tract','s_tract'],
+            usesource_id=False,
+            source_processor='S2S_SoundInput'+suffix,
+            location='undetermined location',
+        )
+    '''
+
+
+def run(args, isMicrophone=False):
+    '''
+        Run the microphone side (isMicrophone=True) which sends its sound to
+        args['network-connection-ip'] and args['network-connection-port'],
+        or the server side which processes it. The structure extractors on
+        the server need a calibration cache, see common.ensureCalibration.
+    '''
+    # Main should initialize logging for multiprocessing package
+    logger = multiprocessing.log_to_stderr()
+    logger.setLevel(args['loglevel'])
+    
+    # Create the board from which all processes will be created
+    b = Board(loglevel=args['loglevel'], logdir=args['logdir'], logfile='soundAnnotator') 
+
+    # ... and add the ability to stop it manually in a neat way.
+    def stopallboards(dummy1='1',dummy2='2'):
+        b.stopallprocessors()
+        time.sleep(1)
+        sys.exit('')
+
+    signal.signal(signal.SIGINT, stopallboards)
+
+
+    # Generate input from the microphone, which is sent to the server
+    if isMicrophone:
+        b.startProcessor('S2S_SoundInput', mic.MicInputProcessor,
+            SampleRate=args['inputrate'],
+            ChunkSize=args['chunksize'],
+            Microphone=args['microphone'],
+            nChannels = 1,
+            source_id=args['location'],
+        )
+
+        # Send the sound to the server
+        #   maxQueueBytes:  at most this many bytes wait for the network, a slow link or server never 
+        #                   makes the microphone machine run out of memory
+        #   policy:         what gives when the queue is full, 'block', 'dropoldest' or 'downsample'
+        #   codec:          preferred encoding of the samples on the wire, 'int16' halves the bandwidth 
+        #                   of raw float32 samples, 'int16-lz4' and 'int16-delta-zlib' compress further
+        b.startProcessor('S2S_NetworkSender', NetworkSenderProcessor,
+            SubscriptionOrder('S2S_SoundInput','S2S_NetworkSender','sound','sound'),
+            host=args['network-connection-ip'],
+            port=args['network-connection-port'],
+            SampleRate=args['inputrate'],
+            source_id=args['location'],
+            maxQueueBytes=args['sendbuffer'],
+            policy=args['sendpolicy'],
+            codec=args['codec'],
+        )
+
+    if not isMicrophone:
+        # Receive the sound from the microphone machine
+        #   maxQueueBytes:  at most this many bytes are received ahead of processing, when full 
+        #                   reading stops and the sender's policy applies
+        b.startProcessor('S2S_SoundInput', NetworkReceiverProcessor,
+            interface=args['network-connection-ip'],
+            port=args['network-connection-port'],
+            SampleRate=args['inputrate'],
+            maxQueueBytes=args['receivebuffer'],
+        )
+
+        startProcessingChain(b, args)
+       
+
+    # ========= Code monitoring for spotting the termination condition and initiating subsequent clean-up =======
+    
+    # Every stage acknowledges the chunk with the termination continuity, the drain monitor 
+    # waits until all of them did so, and logs how long each stage took to drain.
+    monitor=drain.DrainMonitor(b, logger)
+    if isMicrophone:
+        monitor.watch('S2S_SoundInput')
+    else:
+        # With tracing on, stages are also watched for the sole purpose of stamping their chunks
+        if args['tracing'] and args['decimation'] > 1:
+            monitor.watch('S2S_Resampler')
+        monitor.watch('S2S_TFProcessor')
+        for extractor in sorted(set(common.structureExtractors(args))):
+            monitor.watch(extractor)
+        monitor.watch('S2S_PTNE')
+        monitor.watch('S2S_FileWriter-PTNE','written' if args['tracing'] else 'drained')
+
+    # Stamp every chunk seen by the monitor, the trace is exported periodically and once more at the end.
+    if args['tracing']:
+        tracer=tracing.ChunkTracer([stage.processorName for stage in monitor.stages],
+            tracefile=args['tracefile'],
+            exportInterval=60,
+            logger=logger)
+        monitor.addListener(tracer)
+    else:
+        tracer=None
+
+    # Wait until all processors finished their business and stop them all.
+    print('====================Let processors finish unfinished business====================')
+    monitor.wait(timeout=args['draintimeout'])
+    if tracer is not None:
+        tracer.export()
+    print('====================Wake up and exit====================')
+    b.stopallprocessors()
+    
+
+
+def locationSuffix(source_id):
+    ''' Suffix for the names of the processors handling source_id. '''
+    return '-' + re.sub('[^A-Za-z0-9_]+', '_', str(source_id))
+
+def runFanIn(args):
+    '''
+        Server processing the sound of many microphones sending to the same
+        address, at most args['maxsources']. Every microphone gets its own
+        processing chain, named after its location, and its own results
+        directory. Runs until stopped with ^C.
+    '''
+    # Main should initialize logging for multiprocessing package
+    logger = multiprocessing.log_to_stderr()
+    logger.setLevel(args['loglevel'])
+
+    # Create the board from which all processes will be created
+    b = Board(loglevel=args['loglevel'], logdir=args['logdir'], logfile='soundAnnotator')
+
+    # ... and add the ability to stop it manually in a neat way.
+    def stopallboards(dummy1='1',dummy2='2'):
+        b.stopallprocessors()
+        time.sleep(1)
+        sys.exit('')
+
+    signal.signal(signal.SIGINT, stopallboards)
+
+    # Start the processing chain of a microphone the first time it connects
+    def startSource(source_id, chunkQueue):
+        suffix=locationSuffix(source_id)
+        logger.info('Starting processing chain for source {0}'.format(source_id))
+        b.startProcessor('S2S_SoundInput'+suffix, QueueReceiverProcessor,
+            chunkQueue=chunkQueue,
+            SampleRate=args['inputrate'],
+            source_id=source_id,
+        )
+        startProcessingChain(b, args, suffix=suffix, location=suffix[1:])
+
+    # Receive the sound of all microphones on one port
+    #   queuesize:  chunks queued per microphone, as many as fit in args['receivebuffer']
+    server=FanInServer(args['network-connection-ip'], args['network-connection-port'], args['inputrate'], startSource,
+        maxsources=args['maxsources'],
+        queuesize=max(1, args['receivebuffer']//(4*args['chunksize'])),
+        logger=logger)
+
+    # With the microphones known beforehand their cochleograms are calculated by one batched TF-processor,
+    # only these microphones are accepted.
+    if args['batchedtf'] and args['sources']:
+        sources=args['sources'].split(',')
+        queues=server.preregister(sources)
+        subscriptions=[]
+        for source_id in sources:
+            suffix=locationSuffix(source_id)
+            b.startProcessor('S2S_SoundInput'+suffix, QueueReceiverProcessor,
+                chunkQueue=queues[source_id],
+                SampleRate=args['inputrate'],
+                source_id=source_id,
+            )
+            sender, senderKey=startResampler(b, args, suffix)
+            subscriptions.append(SubscriptionOrder(sender,'S2S_TFProcessor-batched',senderKey,'timeseries'+suffix))
+
+        # Start cochleogram calculation for all microphones at once
+        #   sources:    suffixes of the keys under which the microphones are received and published
+        InternalRate=args['inputrate']/args['decimation']
+        b.startProcessor('S2S_TFProcessor-batched', BatchedGCFBProcessor, *subscriptions,
+            sources=[locationSuffix(source_id) for source_id in sources],
+            SampleRate=InternalRate,
+            fmin=40,
+            fmax=InternalRate/2,
+            nseg=args['noofscales'],
+            samplesPerFrame=args['samplesperframe']
+        )
+
+        for source_id in sources:
+            suffix=locationSuffix(source_id)
+            startFeatureExtraction(b, args, suffix, suffix[1:], tfProcessor='S2S_TFProcessor-batched', tfKeySuffix=suffix)
+
+    print('====================Serving microphones====================')
+    server.serve()
+
+
+def main():
+    # Console entry point soundannotator-remote, all parameters come from the command line and settings files.
+    args = common.argumentsFromCommandLine(main)
+    if args['role'] is None or args['server'] is None:
+        sys.exit('Specify the --role (microphone, server or fanin) and the --server address:port')
+    print('Server address: {0} and port: {1}'.format(args['network-connection-ip'],args['network-connection-port']))
+
+    common.prepareDirectories(args)
+    isMicrophone = args['role'] == 'microphone'
+    if not isMicrophone:
+        common.ensureCalibration(args)
+        if args['calibrate']:
+            return
+
+    if args['role'] == 'fanin':
+        runFanIn(args)
+    else:
+        run(args, isMicrophone=isMicrophone)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Defaults of soundannotator-remote, copy to ~/.sa/microphoneatadistance_settings.py to change them.
+'''
+import os, socket
+
+basedir = os.path.join(os.path.expanduser('~'), '.libsoundannotator')
+
+settings = {
+	'hostname': socket.gethostname(),
+	'logdir': os.path.join(basedir, 'log'),
+	'outdir': os.path.join(basedir, 'results'),
+	'inputrate': 44100,
+	'decimation': 5,
+	'noofscales': 100,
+	'samplesperframe': 5,
+	'ptnsplit': '[5,20,35,50,65,80,95]',
+	'ptnblockwidth': 0.1,
+	'maxFileSize': 104857600,
+	'draintimeout': 600,
+	'chunksize': 8820,
+	'microphone': 'default',
+	'location': 'testmicrophone',
+}
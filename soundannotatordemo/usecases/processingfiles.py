@@ -0,0 +1,601 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Processing Files use case of the libsoundannotator software.
+
+    A directory with wav-files or a single wav-file is processed into
+    cochleograms, tract features and PTNE features. The console script
+    soundannotator-files runs it with the parameters from the command line,
+    e.g.
+
+        soundannotator-files --wav ~/demodata/dares_g1 --noofshards 4
+
+    defaults come from processingfiles_settings.py, which can be overridden
+    by a copy in ~/.sa.
+'''
+import multiprocessing
+import numpy as np
+
+# signal is used to handle keyboard interrupts, in this case ^C^C which is used to stop the board using sys.exit.
+import signal, sys
+
+
+import time,  os, glob
+
+# Streamboard architecture
+from libsoundannotator.streamboard.board                            import Board
+from libsoundannotator.streamboard.continuity                       import Continuity
+from libsoundannotator.streamboard.subscription                     import SubscriptionOrder
+
+# Streamboard processors
+from libsoundannotator.streamboard.processors.input                 import wav 
+from libsoundannotator.cpsp                                         import tfprocessor               
+
+from soundannotatordemo.streamboard.processors.output.drainingfileout import DrainingFileOutputProcessor
+from soundannotatordemo.streamboard.processors.output.columnarfileout import ColumnarOutputProcessor
+from soundannotatordemo.cpsp.batchedtf                              import BatchedGCFBProcessor
+from soundannotatordemo.cpsp.fastresampler                          import resamplerFor
+from soundannotatordemo.cpsp.vectorizedptn                          import ptneFor, PTNEAggregator
+from soundannotatordemo.streamboard.processors.input.mmapwav       import MmapWavProcessor
+from soundannotatordemo.streamboard.processors.input.offlinewav    import OfflineWavProcessor
+from soundannotatordemo.streamboard.processors.input.columnarreplay import ColumnarReplayProcessor
+from soundannotatordemo.streamboard.processors.output.cochleogramcacheout import CochleogramCacheWriter
+from soundannotatordemo.storage                                     import cochleogramcache
+from soundannotatordemo.streamboard                                 import drain
+from soundannotatordemo.streamboard                                 import tracing
+from soundannotatordemo.streamboard.sharedmemory                    import SharedMemoryBoard
+
+
+# Version info generated for this build
+from  soundannotatordemo.config import runtimeMetaData
+
+# File information management
+from libsoundannotator.io.annotations                   import FileAnnotation
+
+# Batch processing over several independent boards
+from soundannotatordemo.batch                           import parallel, sharding
+from soundannotatordemo.batch.manifest                  import Manifest
+
+# Command line handling and calibration shared between use cases
+from soundannotatordemo.usecases                        import common
+
+def collectWavFiles(args, logger):
+    # Interpret args['wav'] as either a folder with wav-files or a single wav-file 
+    if os.path.isdir(args['wav']):
+        logger.info("WAV argument points to wav folder {0}".format(args['wav']))
+        wavfiles = glob.glob("{0}/*.wav".format(args['wav']))
+        if len(wavfiles) == 0:
+            raise Exception("Found no wav files in indicated folder")
+        logger.info("Found {0} wav files in folder".format(len(wavfiles)))
+    elif os.path.isfile(args['wav']):
+        logger.info("WAV argument points to single wav file")
+        wavfiles = [args['wav']]
+    else:
+        logger.error('Invalid specification of wav-file location')
+        exit()
+        
+    return wavfiles
+
+def run(args, wavfiles=None, logfile='soundAnnotator'):
+    '''
+        Process the wav-files (by default those indicated by args['wav']) and
+        return True if all stages drained. The structure extractors need a
+        calibration cache, see common.ensureCalibration.
+
+        With args['cochleogramcache'] the cochleograms of the wav-files found
+        in the cochleogram cache are replayed from it on a board of their own,
+        the other wav-files are processed on a board which adds their
+        cochleograms to the cache. The cache is not evicted here but by
+        runBatch once all shards are done, so no shard removes entries
+        another shard still replays.
+    '''
+    if not args.get('cochleogramcache') or args['wav'] == None:
+        return runBoard(args, wavfiles, logfile)
+
+    logger = multiprocessing.log_to_stderr()
+    logger.setLevel(args['loglevel'])
+    if wavfiles is None:
+        wavfiles = collectWavFiles(args, logger)
+
+    cache = cochleogramcache.cacheFor(args)
+    cached, uncached = cache.partition(wavfiles, cochleogramcache.tfParameters(args))
+    logger.info("Cochleogram cache {0}: {1} of {2} wav files cached".format(cache.directory, len(cached), len(wavfiles)))
+
+    drained = True
+    if len(cached) > 0:
+        drained = runBoard(args, logfile=logfile+'-replay', replay=cached) and drained
+    if len(uncached) > 0:
+        drained = runBoard(args, [wavfile for wavfile, entry in uncached], logfile, cache=cache, cacheEntries=dict(uncached)) and drained
+    return drained
+
+def startSoundInput(b, args, wavfiles, logger, timestep=0.08):
+    '''
+        Start S2S_SoundInput reading the wav-files, by default those indicated
+        by args['wav'], publishing a chunk every timestep seconds. In offline
+        mode the wav-files are read without pacing.
+    '''
+    # Generate input from a directory with wav-files or an individual wav-file
+    if args['wav'] != None:
+        # Batch mode hands every board its own shard of wav-files
+        if wavfiles is None:
+            wavfiles = collectWavFiles(args, logger)
+
+        soundfiles = []
+
+        # The soundfile path is wrapped in a FileAnnotation object,
+        # this allows for recombining libsoundannotator output with 
+        # annotations.
+        for wavfile in wavfiles:
+            soundfiles.append( FileAnnotation(wavfile, wavfile) )
+
+        # Start reading wav-files. 
+        #   chunksize:  the number of samples read from file.
+        #   soundfiles: list with references to wav-files
+        #   timestep:   publication interval in seconds
+        #   metadata:   anything the developer deems relevant to propagate  
+        #   AddWhiteNoise=None   : some wav-files contain ling silence, this breaks log energy 
+        #   newFileContinuity=Continuity.newfile  : default continuity for newfiles
+        #   startLatency=1.0   : delay first read to allow board to build other processors
+        if args.get('offline'):
+            # Offline: memory-mapped blocks of args['offlineblock'] seconds without pacing
+            b.startProcessor('S2S_SoundInput', OfflineWavProcessor,
+                ChunkSize=common.offlineChunkSize(args),
+                SampleRate=args['inputrate'],
+                SoundFiles=soundfiles,
+            )
+        elif args.get('mmapwav'):
+            b.startProcessor('S2S_SoundInput', MmapWavProcessor,
+                ChunkSize=args['chunksize'],
+                SampleRate=args['inputrate'],
+                SoundFiles=soundfiles,
+                timestep=timestep,
+            )
+        else:
+            b.startProcessor('S2S_SoundInput', wav.WavProcessor,
+                ChunkSize=args['chunksize'],
+                SampleRate=args['inputrate'],
+                SoundFiles=soundfiles,
+                timestep=timestep,
+                #newFileContinuity=Continuity.discontinuous
+            )
+    else:
+        logger.info("Nothing to process: leaving script!")
+        sys.exit("Nothing to process: leaving script!")
+
+def startCochleogram(b, args, InternalRate, samplesPerFrame):
+    '''
+        Start the processors computing the cochleogram of S2S_SoundInput, up
+        to and including S2S_TFProcessor.
+    '''
+    if args['decimation'] > 1:
+        
+        # Start resampling. 
+        #   KaiserBeta=5      : Kaiser window beta
+        #   FilterLength=60   : Length lowpass filter
+        #   DecimateFactor=5  : Target decimation factor
+        #   SampleRate:         sampling frequency
+        #   dTypeIn:            numerical format incoming samples
+        #   dTypeOut:           numerical format outgoing samples
+        resamplerClass, resamplerOptions=resamplerFor(args)
+        b.startProcessor('S2S_Resampler', resamplerClass, SubscriptionOrder('S2S_SoundInput','S2S_Resampler','sound','timeseries'),
+            SampleRate=args['inputrate'],
+            FilterLength=1000,
+            DecimateFactor = args['decimation'],
+            dTypeIn=np.complex64,
+            dTypeOut=np.complex64,
+            **resamplerOptions
+        )
+        myTFProcessorSubscriptionOrder=SubscriptionOrder('S2S_Resampler','S2S_TFProcessor','timeseries','timeseries')
+    else:
+        myTFProcessorSubscriptionOrder=SubscriptionOrder('S2S_SoundInput','S2S_TFProcessor', 'sound','timeseries')
+
+    
+    # Start cochleogram calculation 
+    #   Input parameters:
+    #       SampleRate:         sampling frequency
+    #       dTypeIn:            numerical format incoming samples
+    #   Output parameters:
+    #       dTypeOut:           numerical format outgoing samples
+    #       samplesPerFrame=samplesPerFrame  : decimation factor 
+    #   TF-Processing parameters
+    #       fmin=40,            : lowest frequency used in TF analysis
+    #       fmax=InternalRate/2 : highest frequency used in TF analysis
+    #       nseg=args['noofscales']    : number of different frequenccies used
+    #       scale='ERBScale':  'loglin' or 'ERB' equivalent rectangular bandwidth
+    #   Parameter storage (obsolete but working):
+    #       baseOutputDir=args['outdir'] : location where GCFBProcessor parameters will be saved
+    #       globalOutputPathModifier : modifies location where GCFBProcessor parameters will be saved based on GIT commit sha
+    #   metadata:   anything the developer deems relevant to propagate      
+    if args.get('batchedtf'):
+        # The batched gammachirp filterbank, here for a single source, publishes the same keys
+        b.startProcessor('S2S_TFProcessor', BatchedGCFBProcessor, myTFProcessorSubscriptionOrder,
+            sources=[''],
+            SampleRate=InternalRate,
+            fmin=40,
+            fmax=InternalRate/2,
+            nseg=args['noofscales'],
+            samplesPerFrame=samplesPerFrame,
+        )
+    else:
+        b.startProcessor('S2S_TFProcessor', tfprocessor.GCFBProcessor, myTFProcessorSubscriptionOrder,
+            SampleRate=InternalRate,
+            fmin=40,
+            fmax=InternalRate/2,
+            nseg=args['noofscales'],
+            samplesPerFrame=samplesPerFrame,
+            scale='ERBScale',
+            baseOutputDir=args['outdir'],
+            globalOutputPathModifier=runtimeMetaData.outputPathModifier,
+            dTypeIn=np.complex64,
+            dTypeOut=np.complex64,
+        )
+
+def fileWriterFor(args):
+    '''
+        The FileWriter class for args['outputformat'] and the parameters it
+        needs besides those shared by both:
+            'float32'   : float32 files rolled over at maxFileSize
+            'columnar'  : one HDF5 file per source with every key stored as a chunked, compressed array
+                          with a time index, see soundannotatordemo.storage.columnar for reading time ranges
+    '''
+    if args['outputformat']=='columnar':
+        return ColumnarOutputProcessor, {'compression':'lzf'}
+    return DrainingFileOutputProcessor, {'maxFileSize':args['maxFileSize']}
+
+def startPTNE(b, args, SampleRate, tfProcessor, fExtractor, sExtractor, FileWriter, fileWriterOptions, outdir, sourceProcessor):
+    '''
+        Start a PTNE processor for every configuration in
+        common.ptneConfigurations on 'E' of tfProcessor and the tracts of
+        fExtractor and sExtractor, the levels of its pyramid and their writers
+        to outdir. Returns the suffixes of the started PTNE processors and
+        writers, and their upstreams for tracing.ChunkTracer.
+    '''
+    # Start calculation of PTNE featuress, for every configuration in common.ptneConfigurations 
+    # a PTNE processor sharing the cochleogram and the tracts
+    #       featurenames        : subset of ['pulse','tone','noise','energy'],
+    #       noofscales          : number of frequencies in incoming TF -representation
+    #       split               : string specifying boundary between frequency bands used in creating blocks
+    #       SampleRate          : input sampling frequency
+    #       blockwidth          : timeinterval included in calculation of a block
+    #       ptnreferencevalue   : value subtracted from the range compressed E before publishing
+    ptneConfigurations=common.ptneConfigurations(args)
+    ptneClass, ptneOptions=ptneFor(args)
+    for configuration in ptneConfigurations:
+        ptneProcessor='S2S_PTNE'+configuration['suffix']
+        b.startProcessor(ptneProcessor,ptneClass,
+                SubscriptionOrder(tfProcessor,ptneProcessor,'E','E'),
+                SubscriptionOrder(fExtractor,ptneProcessor,'f_tract','f_tract'),
+                SubscriptionOrder(sExtractor,ptneProcessor,'s_tract','s_tract'),
+                featurenames=['pulse','tone','noise','energy'],
+                noofscales=args['noofscales'],
+                split=configuration['split'],
+                SampleRate=SampleRate,
+                blockwidth=configuration['blockwidth'],
+                ptnreferencevalue = args['ptnreferencevalue'],
+                **ptneOptions
+            )
+
+    # Start writing PTNE  features to file, every configuration to its own directory
+    for configuration in ptneConfigurations:
+        ptneProcessor='S2S_PTNE'+configuration['suffix']
+        ptneWriter='S2S_FileWriter-PTNE'+configuration['suffix']
+        b.startProcessor(ptneWriter, FileWriter,
+                SubscriptionOrder(ptneProcessor,ptneWriter,'energy','energy'),
+                SubscriptionOrder(ptneProcessor,ptneWriter,'pulse','pulse'),
+                SubscriptionOrder(ptneProcessor,ptneWriter,'noise','noise'),
+                SubscriptionOrder(ptneProcessor,ptneWriter,'tone','tone'),
+                outdir=os.path.join(outdir,'ptne'+configuration['suffix']),
+                SampleRate=1.0/configuration['blockwidth'],
+                datatype = 'float32',
+                requiredKeys=['pulse','tone','noise','energy'],
+                usesource_id=True,
+                source_processor=sourceProcessor,
+                acknowledgeChunks=args['tracing'],
+                **fileWriterOptions
+            )
+
+    # Start the coarser levels of the PTNE pyramids, every level combines the blocks of the level before it
+    ptneUpstreams=tracing.ptneUpstreams([configuration['suffix'] for configuration in ptneConfigurations])
+    ptneSuffixes=[configuration['suffix'] for configuration in ptneConfigurations]
+    for configuration in ptneConfigurations:
+        previous='S2S_PTNE'+configuration['suffix']
+        previousBlockwidth=configuration['blockwidth']
+        for level in common.ptnePyramid(args, configuration):
+            ptneProcessor='S2S_PTNE'+level['suffix']
+            ptneWriter='S2S_FileWriter-PTNE'+level['suffix']
+            b.startProcessor(ptneProcessor, PTNEAggregator,
+                    SubscriptionOrder(previous,ptneProcessor,'energy','energy'),
+                    SubscriptionOrder(previous,ptneProcessor,'pulse','pulse'),
+                    SubscriptionOrder(previous,ptneProcessor,'noise','noise'),
+                    SubscriptionOrder(previous,ptneProcessor,'tone','tone'),
+                    factor=args['ptnepyramidfactor'],
+                    framesPerBlock=previousBlockwidth*SampleRate,
+                )
+            b.startProcessor(ptneWriter, FileWriter,
+                    SubscriptionOrder(ptneProcessor,ptneWriter,'energy','energy'),
+                    SubscriptionOrder(ptneProcessor,ptneWriter,'pulse','pulse'),
+                    SubscriptionOrder(ptneProcessor,ptneWriter,'noise','noise'),
+                    SubscriptionOrder(ptneProcessor,ptneWriter,'tone','tone'),
+                    outdir=os.path.join(outdir,'ptne'+level['suffix']),
+                    SampleRate=1.0/level['blockwidth'],
+                    datatype = 'float32',
+                    requiredKeys=['pulse','tone','noise','energy'],
+                    usesource_id=True,
+                    source_processor=sourceProcessor,
+                    acknowledgeChunks=args['tracing'],
+                    **fileWriterOptions
+                )
+            ptneUpstreams[ptneProcessor]=[previous]
+            ptneUpstreams[ptneWriter]=[ptneProcessor]
+            ptneSuffixes.append(level['suffix'])
+            previous=ptneProcessor
+            previousBlockwidth=level['blockwidth']
+
+    return ptneSuffixes, ptneUpstreams
+
+def startTractWriter(b, args, SampleRate, fExtractor, sExtractor, FileWriter, fileWriterOptions, outdir, sourceProcessor):
+    '''
+        Start S2S_FileWriter-Tracts, writing 'E' of S2S_TFProcessor and the
+        tracts of fExtractor and sExtractor to the tracts folder of outdir.
+    '''
+    # ... a second file writer is needed because PTNE publishes at another rate then the preceding processors.
+    b.startProcessor("S2S_FileWriter-Tracts", FileWriter,
+            SubscriptionOrder('S2S_TFProcessor','S2S_FileWriter-Tracts','E','E'),
+            SubscriptionOrder(fExtractor,'S2S_FileWriter-Tracts','f_tract','f_tract'),
+            SubscriptionOrder(sExtractor,'S2S_FileWriter-Tracts','s_tract','s_tract'),
+            outdir=os.path.join(outdir,'tracts'),
+            SampleRate=SampleRate,
+            datatype = 'float32',
+            requiredKeys=['E','f_tract','s_tract'],
+            usesource_id=True,
+            source_processor=sourceProcessor,
+            acknowledgeChunks=args['tracing'],
+            **fileWriterOptions
+        )
+
+def runBoard(args, wavfiles=None, logfile='soundAnnotator', replay=None, cache=None, cacheEntries=None):
+    '''
+        Process the wav-files (by default those indicated by args['wav']) on
+        one board and return True if all stages drained.
+            replay:         (wavfile, cache entry) pairs, replayed in place of
+                            the wav-files and the front of the pipeline up to the TF-processor
+            cache:          CochleogramCache to which the cochleograms of the
+                            wav-files with an entry in cacheEntries are written
+    '''
+
+    # Main should initialize logging for multiprocessing package
+    logger = multiprocessing.log_to_stderr()
+    logger.setLevel(args['loglevel'])
+    
+    # Create the board from which all processes will be created
+    b = Board(loglevel=args['loglevel'], logdir=args['logdir'], logfile=logfile) 
+    # ... optionally moving the large chunks through shared memory instead of pipes
+    if args.get('sharedmemory'):
+        # ... with slots for the largest chunks, the offline blocks also when replaying cochleograms
+        chunkSize = common.offlineChunkSize(args) if args.get('offline') or replay is not None else args['chunksize']
+        b = SharedMemoryBoard(b, common.sharedMemoryLayout(args, cacheWriter=cache is not None),
+            slotBytes=common.sharedMemorySlotBytes(args, chunkSize))
+
+    # ... and add the ability to stop it manually in a neat way.
+    def stopallboards(dummy1='1',dummy2='2'):
+        b.stopallprocessors()
+        time.sleep(1)
+        sys.exit('')
+
+    signal.signal(signal.SIGINT, stopallboards)
+
+
+    # Resampling changed the sampling frequency, so processor taking data from the Resampler need to use the following sampling frequency
+    InternalRate=args['inputrate']/args['decimation']
+
+    # The gammachirp filterbank will do a further decimation. As we only keep the complex amplitude we effectively
+    # do a kind of conversion to a lower frequency. This is not fully developed theoretically but it seems to work 
+    # for small decimations. (Note "frame" is not proper terminology, but used here for historical reason.)  
+    samplesPerFrame=args['samplesperframe']
+    InternalRate2=InternalRate/samplesPerFrame
+
+    if replay is None:
+        startSoundInput(b, args, wavfiles, logger)
+        startCochleogram(b, args, InternalRate, samplesPerFrame)
+        sourceProcessor='S2S_SoundInput'
+    else:
+        # The cached cochleograms are replayed under the name of the TF-processor, so the processors 
+        # downstream of it run unchanged. Without pacing, in chunks of the offline block size.
+        b.startProcessor('S2S_TFProcessor', ColumnarReplayProcessor,
+            Sources=replay,
+            keys=cochleogramcache.cochleogramKeys,
+            SampleRate=InternalRate2,
+            ChunkFrames=common.offlineChunkSize(args)//(args['decimation']*samplesPerFrame),
+        )
+        sourceProcessor='S2S_TFProcessor'
+
+
+    # Streamboard feature extraction, pulses ('f_tract') and tones ('s_tract')
+    fExtractor, sExtractor = common.startStructureExtraction(b, args, InternalRate2)
+
+    # Output format of the file writers, see fileWriterFor
+    FileWriter, fileWriterOptions=fileWriterFor(args)
+    resultsdir=os.path.join(args['outdir'],runtimeMetaData.outputPathModifier+'-'+args['runname'])
+
+    # Start calculation of PTNE features and writing them to file
+    ptneSuffixes, ptneUpstreams=startPTNE(b, args, InternalRate2, 'S2S_TFProcessor', fExtractor, sExtractor, 
+        FileWriter, fileWriterOptions, resultsdir, sourceProcessor)
+
+    # Start writing tract features and cochleogram to file
+    startTractWriter(b, args, InternalRate2, fExtractor, sExtractor, FileWriter, fileWriterOptions, resultsdir, sourceProcessor)
+
+    # Fill the cochleogram cache, see soundannotatordemo.storage.cochleogramcache
+    if cache is not None:
+        b.startProcessor("S2S_FileWriter-CochleogramCache", CochleogramCacheWriter,
+            SubscriptionOrder('S2S_TFProcessor','S2S_FileWriter-CochleogramCache','E','E'),
+            SubscriptionOrder('S2S_TFProcessor','S2S_FileWriter-CochleogramCache','EdB','EdB'),
+            outdir=cache.directory,
+            SampleRate=InternalRate2,
+            datatype = 'float32',
+            requiredKeys=cochleogramcache.cochleogramKeys,
+            usesource_id=True,
+            source_processor='S2S_SoundInput',
+            acknowledgeChunks=args['tracing'],
+            cacheEntries=cacheEntries,
+        )
+        
+    # Start writing sound to file
+    # ... a second file writer is needed because PTNE publishes at another rate then the preceding processors.
+    '''b.startProcessor("S2S_FileWriter-Sounds", DrainingFileOutputProcessor,
+            #SubscriptionOrder('S2S_Resampler','S2S_FileWriter-Sounds','timeseries','timeseries'),
+            SubscriptionOrder('S2S_SoundInput','S2S_FileWriter-Sounds','sound','sound'),
+            outdir=os.path.join(args['outdir'],runtimeMetaData.outputPathModifier+'-'+args['runname'],'sounds'),
+            maxFileSize=args['maxFileSize'],
+            SampleRate=InternalRate,
+            datatype = 'float32',
+            requiredKeys=['sound',],
+            usesource_id=True,
+            source_processor='S2S_SoundInput',
+            acknowledgeChunks=args['tracing'],
+        )'''
+    
+   
+
+    # ========= Code monitoring for spotting the termination condition and initiating subsequent clean-up =======
+    
+    # Every stage acknowledges the chunk with the termination continuity, the drain monitor 
+    # waits until all of them did so, and logs how long each stage took to drain.
+    monitor=drain.DrainMonitor(b, logger)
+    # With tracing on, stages are also watched for the sole purpose of stamping their chunks
+    if args['tracing'] and replay is None:
+        monitor.watch('S2S_SoundInput')
+        if args['decimation'] > 1:
+            monitor.watch('S2S_Resampler')
+    monitor.watch('S2S_TFProcessor')
+    for extractor in sorted(set(common.structureExtractors(args))):
+        monitor.watch(extractor)
+    for suffix in ptneSuffixes:
+        monitor.watch('S2S_PTNE'+suffix)
+        monitor.watch('S2S_FileWriter-PTNE'+suffix,'written' if args['tracing'] else 'drained')
+    monitor.watch('S2S_FileWriter-Tracts','written' if args['tracing'] else 'drained')
+    if cache is not None:
+        monitor.watch('S2S_FileWriter-CochleogramCache','written' if args['tracing'] else 'drained')
+
+    # Stamp every chunk seen by the monitor, the trace is exported periodically and once more at the end.
+    if args['tracing']:
+        # ... shards trace to their own file
+        tracefile=args['tracefile'] if logfile=='soundAnnotator' else args['tracefile'].replace('.json','-{0}.json'.format(logfile))
+        tracer=tracing.ChunkTracer([stage.processorName for stage in monitor.stages],
+            upstreams=ptneUpstreams,
+            tracefile=tracefile,
+            exportInterval=60,
+            logger=logger)
+        monitor.addListener(tracer)
+    else:
+        tracer=None
+
+    # Wait until all processors finished their business and stop them all.
+    print('====================Let processors finish unfinished business====================')
+    drained=monitor.wait(timeout=args['draintimeout'])
+    if tracer is not None:
+        tracer.export()
+    print('====================Wake up and exit====================')
+    if args.get('sharedmemory'):
+        b.logReport(logger)
+    b.stopallprocessors()
+    
+    return drained
+
+
+def runShard(args, shardindex, wavfiles):
+    # Entry point of the process running one shard, each shard gets its own board and log file.
+    if not run(args, wavfiles=wavfiles, logfile='soundAnnotator-shard{0}'.format(shardindex)):
+        sys.exit(1)
+
+def runBatch(args):
+    # Split the wav-files over args['noofshards'] independent boards which run in parallel.
+    # All boards write to the same outdir, the FileWriters name their output after the 
+    # source_id (the wav-file) so the per-shard outputs merge into the usual layout.
+    logger = multiprocessing.log_to_stderr()
+    logger.setLevel(args['loglevel'])
+
+    wavfiles = collectWavFiles(args, logger)
+
+    # In incremental mode only files which are new or changed since the last run are processed,
+    # the manifest lives next to the results which all runs with the same parameters share.
+    if args['incremental']:
+        manifest = Manifest(os.path.join(args['outdir'],runtimeMetaData.outputPathModifier+'-'+args['runname'],'manifest.json'), args)
+        noofwavfiles = len(wavfiles)
+        wavfiles = manifest.pending(wavfiles)
+        logger.info("Incremental mode: {0} of {1} wav files are new or changed".format(len(wavfiles), noofwavfiles))
+        if len(wavfiles) == 0:
+            manifest.save()
+            print('====================Nothing new to process====================')
+            return
+
+    shards = sharding.shardFiles(wavfiles, args['noofshards'])
+    logger.info("Processing {0} wav files in {1} shard(s)".format(len(wavfiles), len(shards)))
+
+    started = time.time()
+    if len(shards) == 1:
+        succeeded = [run(args, wavfiles=shards[0])]
+    else:
+        exitcodes = parallel.runInParallel(runShard, [(args, index, shard) for index, shard in enumerate(shards)], len(shards), logger=logger)
+        succeeded = [exitcode == 0 for exitcode in exitcodes]
+        failed = [index for index, exitcode in enumerate(exitcodes) if exitcode != 0]
+        if len(failed) > 0:
+            logger.error("Shard(s) {0} did not finish cleanly".format(failed))
+
+    # Evict only now, while shards run their entries may be replayed by any of them
+    if args.get('cochleogramcache'):
+        removed = cochleogramcache.cacheFor(args).evict()
+        logger.info("Cochleogram cache: evicted {0} entries".format(len(removed)))
+
+    # Only shards which drained completely count as processed, in the manifest and in the summary
+    processed = [wavfile for shard, ok in zip(shards, succeeded) if ok for wavfile in shard]
+    if args['incremental']:
+        for shard, ok in zip(shards, succeeded):
+            if ok:
+                manifest.record(shard)
+        manifest.save()
+
+    print('====================Batch summary====================')
+    print(str(sharding.BatchSummary(processed, time.time() - started)))
+    if len(processed) < len(wavfiles):
+        print('{0} of {1} wav files were in shards that did not finish cleanly'.format(len(wavfiles) - len(processed), len(wavfiles)))
+
+
+def main():
+    # Console entry point soundannotator-files, all parameters come from the command line and settings files.
+    args = common.argumentsFromCommandLine(main)
+    try:
+        common.checkPTNEArguments(args)
+    except ValueError as e:
+        sys.exit(str(e))
+    common.prepareDirectories(args)
+    common.ensureCalibration(args)
+    if args['calibrate']:
+        return
+
+    if args['wav'] is None:
+        sys.exit('Specify the wav-file or folder with wav-files to process with --wav')
+    runBatch(args)
+
+
+if __name__ == '__main__':
+    main()
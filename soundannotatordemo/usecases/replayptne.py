@@ -0,0 +1,148 @@
+'''
+This file is part of soundannotatordemo. The soundannotatordemo repository
+provides democode and documentation accompanying the libsoundannotator 
+repository, available from https://github.com/soundappraisal/libsoundannotator.
+The library libsoundannotator is designed for processing sound using 
+time-frequency representations.
+
+Copyright 2011-2014 Sensory Cognition Group, University of Groningen
+Copyright 2014-2017 SoundAppraisal BV
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+'''
+'''
+    Replaying tracts use case of the libsoundannotator software.
+
+    The cochleogram and tracts written by soundannotator-files (in the
+    columnar output format) are read back and streamed into the PTNE
+    processors as fast as the disk allows, so PTNE can be recomputed with
+    other settings or benchmarked without recomputing the cochleogram and
+    the tracts. The console script soundannotator-replay-ptne runs it, e.g.
+
+        soundannotator-replay-ptne --tracts ~/.libsoundannotator/results/<run>/tracts --ptneconfigs 'coarse:1.0'
+
+    defaults come from replayptne_settings.py, which can be overridden by a
+    copy in ~/.sa.
+'''
+import multiprocessing
+
+# signal is used to handle keyboard interrupts, in this case ^C^C which is used to stop the board using sys.exit.
+import signal, sys
+import time,  os
+
+# Streamboard architecture
+from libsoundannotator.streamboard.board                            import Board
+
+# Streamboard processors
+from soundannotatordemo.streamboard.processors.input.columnarreplay import ColumnarReplayProcessor, columnarSources
+from soundannotatordemo.streamboard                                 import drain
+from soundannotatordemo.streamboard                                 import tracing
+
+# Version info generated for this build
+from  soundannotatordemo.config import runtimeMetaData
+
+# Command line handling and the PTNE stages shared with soundannotator-files
+from soundannotatordemo.usecases                        import common, processingfiles
+
+# Keys written by S2S_FileWriter-Tracts, replayed under the same names
+tractKeys=['E','f_tract','s_tract']
+
+def run(args, logfile='soundAnnotator-replay'):
+    '''
+        Recompute the PTNE features of the sources in args['tracts'] and
+        return True if all stages drained.
+    '''
+    # Main should initialize logging for multiprocessing package
+    logger = multiprocessing.log_to_stderr()
+    logger.setLevel(args['loglevel'])
+
+    # Fails early, and not in the replay processor, if there is nothing to replay
+    sources=columnarSources(args['tracts'])
+    logger.info("Replaying the tracts of {0} sources from {1}".format(len(sources), args['tracts']))
+
+    # Create the board from which all processes will be created
+    b = Board(loglevel=args['loglevel'], logdir=args['logdir'], logfile=logfile) 
+
+    # ... and add the ability to stop it manually in a neat way.
+    def stopallboards(dummy1='1',dummy2='2'):
+        b.stopallprocessors()
+        time.sleep(1)
+        sys.exit('')
+
+    signal.signal(signal.SIGINT, stopallboards)
+
+    # Rate of the cochleogram and the tracts, files written at another rate are skipped by the replay processor
+    samplesPerFrame=args['samplesperframe']
+    InternalRate2=args['inputrate']/args['decimation']/samplesPerFrame
+
+    # The stored streams are published by one processor standing in for the TF-processor and both 
+    # structure extractors. Without pacing, in chunks of the offline block size.
+    b.startProcessor('S2S_TractReplay', ColumnarReplayProcessor,
+        Sources=sources,
+        keys=tractKeys,
+        SampleRate=InternalRate2,
+        ChunkFrames=common.offlineChunkSize(args)//(args['decimation']*samplesPerFrame),
+    )
+
+    # Start calculation of PTNE features and writing them to file, as soundannotator-files would
+    FileWriter, fileWriterOptions=processingfiles.fileWriterFor(args)
+    ptneSuffixes, ptneUpstreams=processingfiles.startPTNE(b, args, InternalRate2, 'S2S_TractReplay', 'S2S_TractReplay', 'S2S_TractReplay',
+        FileWriter, fileWriterOptions, os.path.join(args['outdir'],runtimeMetaData.outputPathModifier+'-'+args['runname']), 'S2S_TractReplay')
+
+    # ========= Code monitoring for spotting the termination condition and initiating subsequent clean-up =======
+    monitor=drain.DrainMonitor(b, logger)
+    monitor.watch('S2S_TractReplay')
+    for suffix in ptneSuffixes:
+        monitor.watch('S2S_PTNE'+suffix)
+        monitor.watch('S2S_FileWriter-PTNE'+suffix,'written' if args['tracing'] else 'drained')
+
+    # Stamp every chunk seen by the monitor, the trace is exported periodically and once more at the end.
+    if args['tracing']:
+        tracer=tracing.ChunkTracer([stage.processorName for stage in monitor.stages],
+            upstreams=ptneUpstreams,
+            tracefile=args['tracefile'].replace('.json','-replay.json'),
+            exportInterval=60,
+            logger=logger)
+        monitor.addListener(tracer)
+    else:
+        tracer=None
+
+    # Wait until all processors finished their business and stop them all.
+    print('====================Let processors finish unfinished business====================')
+    drained=monitor.wait(timeout=args['draintimeout'])
+    if tracer is not None:
+        tracer.export()
+    print('====================Wake up and exit====================')
+    b.stopallprocessors()
+
+    return drained
+
+
+def main():
+    # Console entry point soundannotator-replay-ptne, all parameters come from the command line and settings files.
+    args = common.argumentsFromCommandLine(main)
+    common.prepareDirectories(args)
+
+    if args['tracts'] is None or not os.path.isdir(args['tracts']):
+        sys.exit('Specify the tracts folder written by soundannotator-files with --tracts')
+    try:
+        common.checkPTNEArguments(args)
+        drained=run(args)
+    except ValueError as e:
+        sys.exit(str(e))
+    if not drained:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()